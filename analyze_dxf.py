@@ -1,60 +1,339 @@
 """
 This script analyzes DXF files to report the number of entities on each layer within the modelspace.
-It can process a single DXF file or all DXF files within a specified directory.
+It can process a single DXF file or all DXF files within a specified directory tree.
+
+The files are streamed tag by tag instead of being loaded into an ezdxf document, and
+directories are analyzed with a pool of worker processes. For every file it reports the
+entities per layer and type, their bounding box and the holes (CIRCLE entities outside
+the drill mark and deleted layers) per layer and diameter, followed by a summary across all analyzed files.
 
 Usage:
-    python analyze_dxf.py <file_or_directory>
+    python analyze_dxf.py <file_or_directory> [<file_or_directory> ...] [--format text|json|csv] [--output <file>] [--jobs N]
 
 Arguments:
     <file_or_directory>: Path to a DXF file or a directory containing DXF files.
+    --format: text (default) prints a human readable report, json and csv write machine-readable output.
+    --output: File to write the report to (default: standard output).
+    --jobs: Number of worker processes (default: number of CPUs).
 
 Example:
     python analyze_dxf.py my_drawing.dxf
     python analyze_dxf.py ./dxf_files/
+    python analyze_dxf.py export/SK-1800x900x400 --format json --output inventory.json
 """
 
-import ezdxf
-import sys
+import argparse
+import csv
+import json
 import os
+import sys
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from ezdxf.lldxf.const import DXFStructureError
+from ezdxf.lldxf.tagger import ascii_tags_loader
+
+# OpenSCAD writes plain ASCII, split_layers.py saves cp1252; both decode as cp1252
+DXF_ENCODING = "cp1252"
+
+# Decimal places used when grouping holes by diameter
+HOLE_DIAMETER_DECIMALS = 1
+
+# Group codes of the X coordinates of the points an entity is made of (10..18);
+# the matching Y coordinate uses the code + Y_CODE_OFFSET
+POINT_X_CODES = range(10, 19)
+Y_CODE_OFFSET = 10
+
+# Group codes in the point range (and the extrusion 210) that hold direction or size
+# vectors rather than points, per entity type; they do not count towards the extents
+EXTRUSION_CODE = 210
+VECTOR_X_CODES = {
+    "ELLIPSE": {11},  # major axis, relative to the center
+    "MTEXT": {11},  # text direction
+    "XLINE": {11},  # direction
+    "RAY": {11},  # direction
+    "SPLINE": {12, 13},  # start and end tangents
+    "MLINE": {12, 13},  # segment and miter directions
+    "TOLERANCE": {11},  # text direction
+    "IMAGE": {11, 12, 13},  # U and V vectors, size in pixels
+    "WIPEOUT": {11, 12, 13},  # U and V vectors, size in pixels
+}
+RADIUS_CODE = 40
+LAYER_CODE = 8
+PAPERSPACE_CODE = 67
+
+# Structure tags and entity types that are not counted as entities on their own
+SKIPPED_TYPES = {"SECTION", "VERTEX", "SEQEND", "ATTRIB"}
+
+# Entity types that may be followed by VERTEX/ATTRIB entities and a SEQEND
+VERTEX_PARENT_TYPES = {"POLYLINE", "INSERT"}
+
+# Entity types whose own location point is a placeholder; their VERTEX entities carry the geometry
+DUMMY_POINT_TYPES = {"POLYLINE"}
+
+# Entity types whose extents are the center point extended by the radius
+RADIUS_TYPES = {"CIRCLE", "ARC"}
+
+# Layers whose circles are symbols or removed geometry rather than holes
+NON_HOLE_LAYERS = {"DRILL_MARKS", "DELETED"}
+
+# Label used for the aggregate summary rows
+SUMMARY_FILE = "TOTAL"
+
+CSV_HEADER = ["file", "layer", "type", "diameter", "count", "min_x", "min_y", "max_x", "max_y"]
+
+
+def merge_bbox(bbox, other):
+    """Return the union of two (min_x, min_y, max_x, max_y) boxes, either of which may be None."""
+    if bbox is None:
+        return other
+    if other is None:
+        return bbox
+    return (min(bbox[0], other[0]), min(bbox[1], other[1]), max(bbox[2], other[2]), max(bbox[3], other[3]))
+
+
+def entity_bbox(entity):
+    """Return the extents of a streamed entity record, or None if it has no points."""
+    points = entity['points']
+    if not points:
+        return None
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    radius = entity['radius'] if entity['type'] in RADIUS_TYPES and entity['radius'] is not None else 0.0
+    return (min(xs) - radius, min(ys) - radius, max(xs) + radius, max(ys) + radius)
+
+
+def new_entity(entity_type):
+    """Return an empty record for an entity being streamed."""
+    return {'type': entity_type, 'layer': "0", 'points': [], 'radius': None, 'paperspace': False}
+
+
+def scan_dxf(filepath):
+    """Stream the ENTITIES section of a DXF file and return its modelspace inventory.
+
+    The result is a dict with the file path, a list of per-layer/type rows
+    (layer, type, count, bbox) and a list of hole rows (layer, diameter, count).
+    VERTEX entities are folded into their POLYLINE so its extents are complete.
+    """
+    counts = Counter()
+    bboxes = {}
+    holes = Counter()
+
+    section = None
+    expect_section_name = False
+    entity = new_entity(None)
+    parent = None
+    pending_x = {}
+
+    def finish(record):
+        if record['type'] in SKIPPED_TYPES or record['type'] is None or record['paperspace']:
+            return
+        key = (record['layer'], record['type'])
+        counts[key] += 1
+        bboxes[key] = merge_bbox(bboxes.get(key), entity_bbox(record))
+        if record['type'] == "CIRCLE" and record['radius'] is not None and record['layer'] not in NON_HOLE_LAYERS:
+            holes[(record['layer'], round(2 * record['radius'], HOLE_DIAMETER_DECIMALS))] += 1
+
+    with open(filepath, mode='r', encoding=DXF_ENCODING, errors='replace') as stream:
+        for tag in ascii_tags_loader(stream):
+            code, value = tag.code, tag.value
+            if code == 0:
+                if section == "ENTITIES":
+                    if entity['type'] == "VERTEX" and parent is not None:
+                        parent['points'].extend(entity['points'])
+                    elif entity['type'] in VERTEX_PARENT_TYPES:
+                        # Wait for the SEQEND (or the next entity) before counting it
+                        if parent is not None:
+                            finish(parent)
+                        parent = entity
+                    else:
+                        if parent is not None and entity['type'] != "ATTRIB":
+                            finish(parent)
+                            parent = None
+                        finish(entity)
+                expect_section_name = value == "SECTION"
+                if value == "ENDSEC":
+                    section = None
+                entity = new_entity(value)
+                pending_x = {}
+            elif code == 2 and expect_section_name:
+                section = value
+                expect_section_name = False
+            elif section != "ENTITIES":
+                continue
+            elif code == LAYER_CODE:
+                entity['layer'] = value
+            elif code == PAPERSPACE_CODE:
+                entity['paperspace'] = value.strip() == "1"
+            elif code == RADIUS_CODE:
+                entity['radius'] = float(value)
+            elif code == EXTRUSION_CODE or code in VECTOR_X_CODES.get(entity['type'], ()):
+                # Its Y (code + Y_CODE_OFFSET) finds no pending X and is skipped as well
+                continue
+            elif code in POINT_X_CODES:
+                pending_x[code] = float(value)
+            elif code - Y_CODE_OFFSET in pending_x:
+                x = pending_x.pop(code - Y_CODE_OFFSET)
+                # The location point of a POLYLINE is a dummy, its vertices follow
+                if entity['type'] not in DUMMY_POINT_TYPES:
+                    entity['points'].append((x, float(value)))
+
+    if parent is not None:
+        finish(parent)
+
+    return {
+        'file': filepath,
+        'layers': [
+            {'layer': layer, 'type': entity_type, 'count': count, 'bbox': bboxes[(layer, entity_type)]}
+            for (layer, entity_type), count in sorted(counts.items())
+        ],
+        'holes': [
+            {'layer': layer, 'diameter': diameter, 'count': count}
+            for (layer, diameter), count in sorted(holes.items())
+        ],
+    }
+
 
 def analyze_dxf(filepath):
+    """Return the inventory of one DXF file, or None if it is not a readable DXF file."""
     try:
-        doc = ezdxf.readfile(filepath)
-    except IOError:
-        print(f"Not a DXF file or a generic I/O error: {filepath}")
-        return
-    except ezdxf.DXFStructureError:
-        print(f"Invalid or corrupted DXF file: {filepath}")
-        return
-
-    print(f"Analyzing file: {filepath}")
-    msp = doc.modelspace()
-    layer_count = Counter(entity.dxf.layer for entity in msp)
-
-    print("Layers found in modelspace and number of entities on each layer:")
-    for layer, count in layer_count.items():
-        print(f"  - Layer: {layer}, Entities: {count}")
-    print("-" * 20)
+        return scan_dxf(filepath)
+    except (IOError, UnicodeError):
+        print(f"Not a DXF file or a generic I/O error: {filepath}", file=sys.stderr)
+        return None
+    except (DXFStructureError, ValueError):
+        print(f"Invalid or corrupted DXF file: {filepath}", file=sys.stderr)
+        return None
+
+
+def summarize(results):
+    """Aggregate per-file inventories into one summary with the same layout."""
+    counts = Counter()
+    bboxes = {}
+    holes = Counter()
+    for result in results:
+        for row in result['layers']:
+            key = (row['layer'], row['type'])
+            counts[key] += row['count']
+            bboxes[key] = merge_bbox(bboxes.get(key), row['bbox'])
+        for row in result['holes']:
+            holes[(row['layer'], row['diameter'])] += row['count']
+    return {
+        'file': SUMMARY_FILE,
+        'files': len(results),
+        'layers': [
+            {'layer': layer, 'type': entity_type, 'count': count, 'bbox': bboxes[(layer, entity_type)]}
+            for (layer, entity_type), count in sorted(counts.items())
+        ],
+        'holes': [
+            {'layer': layer, 'diameter': diameter, 'count': count}
+            for (layer, diameter), count in sorted(holes.items())
+        ],
+    }
+
+
+def find_dxf_files(paths):
+    """Expand files and directories into a list of DXF files, largest first."""
+    dxf_files = []
+    for path in paths:
+        if os.path.isfile(path):
+            dxf_files.append(path)
+        elif os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for file in files:
+                    if file.lower().endswith(".dxf"):
+                        dxf_files.append(os.path.join(root, file))
+        else:
+            raise FileNotFoundError(f"Invalid path '{path}'")
+    # Schedule the largest files first so they do not end up as the tail of the run
+    dxf_files.sort(key=lambda f: (-os.path.getsize(f), f))
+    return dxf_files
+
+
+def analyze_files(dxf_files, jobs=None):
+    """Analyze the files in a process pool and return the inventories sorted by path."""
+    if len(dxf_files) == 1:
+        results = [analyze_dxf(dxf_files[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(analyze_dxf, dxf_files))
+    return sorted((r for r in results if r is not None), key=lambda r: r['file'])
+
+
+def format_bbox(bbox):
+    if bbox is None:
+        return "-"
+    return f"({bbox[0]:.1f}, {bbox[1]:.1f}) - ({bbox[2]:.1f}, {bbox[3]:.1f})"
+
+
+def write_text(results, summary, stream):
+    for result in results + [summary]:
+        if result is summary:
+            print(f"Summary of {summary['files']} files:", file=stream)
+        else:
+            print(f"Analyzing file: {result['file']}", file=stream)
+        print("Layers found in modelspace and number of entities on each layer:", file=stream)
+        layer_count = Counter()
+        for row in result['layers']:
+            layer_count[row['layer']] += row['count']
+        for layer, count in layer_count.items():
+            print(f"  - Layer: {layer}, Entities: {count}", file=stream)
+            for row in result['layers']:
+                if row['layer'] == layer:
+                    print(f"      {row['type']}: {row['count']}  {format_bbox(row['bbox'])}", file=stream)
+        if result['holes']:
+            print("Holes by diameter:", file=stream)
+            for row in result['holes']:
+                print(f"  - Layer: {row['layer']}, Diameter: {row['diameter']}, Holes: {row['count']}", file=stream)
+        print("-" * 20, file=stream)
+
+
+def write_json(results, summary, stream):
+    json.dump({'files': results, 'summary': summary}, stream, indent=2)
+    stream.write("\n")
+
+
+def write_csv(results, summary, stream):
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    for result in results + [summary]:
+        for row in result['layers']:
+            bbox = row['bbox'] if row['bbox'] is not None else ("", "", "", "")
+            writer.writerow([result['file'], row['layer'], row['type'], "", row['count'], *bbox])
+        for row in result['holes']:
+            writer.writerow([result['file'], row['layer'], "HOLE", row['diameter'], row['count'], "", "", "", ""])
+
+
+WRITERS = {
+    'text': write_text,
+    'json': write_json,
+    'csv': write_csv,
+}
+
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python analyze_dxf.py <file_or_directory>")
+    parser = argparse.ArgumentParser(description='Report the entities per layer, their extents and holes in DXF files.')
+    parser.add_argument('paths', nargs='+', help='DXF files or directories containing DXF files.')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='text', help='Report format.')
+    parser.add_argument('--output', help='File to write the report to (default: standard output).')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes (default: number of CPUs).')
+    args = parser.parse_args()
+
+    try:
+        dxf_files = find_dxf_files(args.paths)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
         sys.exit(1)
 
-    path = sys.argv[1]
+    results = analyze_files(dxf_files, jobs=args.jobs)
+    summary = summarize(results)
 
-    if os.path.isfile(path):
-        analyze_dxf(path)
-    elif os.path.isdir(path):
-        for root, _, files in os.walk(path):
-            for file in files:
-                if file.lower().endswith(".dxf"):
-                    filepath = os.path.join(root, file)
-                    analyze_dxf(filepath)
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8', newline='') as stream:
+            WRITERS[args.format](results, summary, stream)
     else:
-        print(f"Error: Invalid path '{path}'")
-        sys.exit(1)
+        WRITERS[args.format](results, summary, sys.stdout)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,10 @@
+"""
+Benchmarks for the Python tools of the DXF and order pipeline.
+
+    synthetic_panels.py  Generates raw panel DXFs and hole CSVs in the style OpenSCAD exports.
+    run_benchmarks.py    Times split_layers, line grouping, circle detection, dimensions and
+                         analyze_dxf on synthetic panels and stores the results as JSON.
+    nesting_benchmark.py Times the nesting.py packers on consolidated model.scad cut lists.
+
+Run the modules from the repository root, e.g. python -m benchmark.run_benchmarks
+"""
@@ -0,0 +1,129 @@
+"""
+Times nesting.py on consolidated cut lists of growing size.
+
+Every order is the cut list of model.scad as evaluated by scad_params.py with its
+default parameters; --orders N consolidates N such orders into one part list per
+material. With --random-parts, orders of random parts (fixed seed) are timed as
+well, which gives many distinct part sizes instead of a few repeated ones.
+
+For every order count and algorithm the best of --repeat packing runs is kept
+together with the parts, boards and waste per material. The results are written
+to a JSON file like run_benchmarks.py does.
+
+Usage:
+    python -m benchmark.nesting_benchmark [--orders 1 10 50 200] [--algorithm guillotine maxrects]
+                                          [--random-parts N] [--repeat N] [--output <results.json>]
+
+Example:
+    python -m benchmark.nesting_benchmark --orders 1 10 50 --output benchmark/results/nesting.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+
+import nesting
+import scad_params
+from benchmark.run_benchmarks import RESULTS_DIR, time_best
+from cut_list import CutListRow, parse_cut_list_row
+
+DEFAULT_ORDER_COUNTS = [1, 10, 50, 200]
+
+DEFAULT_REPEAT = 3
+
+# Random parts: materials, and the range of their sizes (mm)
+RANDOM_MATERIALS = [("MEL-19", "18"), ("MEL-12", "10"), ("HDF-3", "3")]
+RANDOM_PART_SIZE = (60, 1200)
+RANDOM_SEED = 1
+
+
+def model_order_rows(model_file=scad_params.DEFAULT_MODEL_FILE):
+    """The cut list rows of model.scad with its default parameters."""
+    header, *rows = scad_params.cut_list_rows(scad_params.load_model(model_file))
+    return [parse_cut_list_row(row) for row in rows]
+
+
+def random_order_rows(part_count, seed=RANDOM_SEED):
+    generator = random.Random(seed)
+    rows = []
+    for index in range(part_count):
+        material, thickness = RANDOM_MATERIALS[index % len(RANDOM_MATERIALS)]
+        rows.append(CutListRow(material, thickness, float(generator.randint(*RANDOM_PART_SIZE)), float(generator.randint(*RANDOM_PART_SIZE)),
+                               1, 0, 0, 0, 0, f"Random{index}", "", "", ""))
+    return rows
+
+
+def by_material(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.material_code, row.thickness), []).append(row)
+    return groups
+
+
+def bench_nesting(label, rows, algorithms, repeat):
+    results = []
+    groups = by_material(rows)
+    part_count = sum(row.count for row in rows)
+    for algorithm in algorithms:
+        packed = {}
+
+        def run():
+            for key, material_rows in groups.items():
+                packed[key] = nesting.nest_material(material_rows, nesting.DEFAULT_BOARD_SIZE, algorithm)
+        seconds, runs = time_best(run, repeat)
+        results.append({
+            'input': label,
+            'algorithm': algorithm,
+            'parts': part_count,
+            'seconds': seconds,
+            'runs': runs,
+            'materials': [
+                {'material': material, 'thickness': thickness, 'parts': result['parts'], 'boards': result['boards'], 'waste_percent': result['waste_percent']}
+                for (material, thickness), result in packed.items()
+            ],
+        })
+        boards = sum(result['boards'] for result in packed.values())
+        print(f"{label:20s} {algorithm:10s} {part_count:>7d} parts  {boards:>5d} boards  {seconds:10.4f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the nesting heuristics on consolidated cut lists.')
+    parser.add_argument('--orders', type=int, nargs='+', default=DEFAULT_ORDER_COUNTS, help='Numbers of model.scad orders consolidated into one cut list.')
+    parser.add_argument('--algorithm', nargs='+', choices=list(nesting.PACKERS), default=list(nesting.PACKERS), help='Heuristics to time.')
+    parser.add_argument('--random-parts', type=int, nargs='*', default=[], help='Also time lists of this many random parts.')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f'Runs per measurement, the best one is kept (default: {DEFAULT_REPEAT}).')
+    parser.add_argument('--output', help='Result JSON file (default: benchmark/results/nesting-<timestamp>.json).')
+    args = parser.parse_args()
+
+    started = datetime.datetime.now()
+    order_rows = model_order_rows()
+    results = []
+    for order_count in args.orders:
+        results.extend(bench_nesting(f"{order_count} orders", order_rows * order_count, args.algorithm, args.repeat))
+    for part_count in args.random_parts:
+        results.extend(bench_nesting(f"{part_count} random", random_order_rows(part_count), args.algorithm, args.repeat))
+
+    output_file = args.output or os.path.join(RESULTS_DIR, f"nesting-{started.strftime('%Y%m%d-%H%M%S')}.json")
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': started.isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'board_size': nesting.DEFAULT_BOARD_SIZE,
+            'kerf': nesting.DEFAULT_KERF,
+            'trim': nesting.DEFAULT_TRIM,
+            'repeat': args.repeat,
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults written to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
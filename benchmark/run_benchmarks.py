@@ -0,0 +1,240 @@
+"""
+Times the Python DXF tools on synthetic panels of growing size.
+
+For every hole style and hole count a panel is generated with synthetic_panels.py
+and the following steps are timed (best of --repeat runs):
+
+    split_layers                 Full run writing the drawing and the drilling template.
+    group_lines_into_polylines   Welding the LINE soup of the holes into loops (line style only).
+    circle_detection             Fitting circles to the tessellated holes with fit_circles().
+    add_dimensions               Adding the rendered linear dimensions of the panel and its holes.
+    analyze_dxf                  Streaming inventory of the raw DXF.
+
+The results are written to a JSON file together with a scaling exponent per step:
+the slope of log(time) over log(holes), which is about 1 for linear and 2 for
+quadratic behaviour. Pass an earlier result file with --compare to print the
+speedup of every measurement.
+
+Usage:
+    python -m benchmark.run_benchmarks [--holes 10 100 1000 10000 100000] [--style line lwpolyline]
+                                       [--steps ...] [--repeat N] [--output <results.json>] [--compare <results.json>]
+
+Example:
+    python -m benchmark.run_benchmarks --holes 10 100 1000 --output benchmark/results/baseline.json
+    python -m benchmark.run_benchmarks --holes 10 100 1000 --compare benchmark/results/baseline.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import ezdxf
+
+import analyze_dxf
+import split_layers
+from benchmark import synthetic_panels
+
+DEFAULT_HOLE_COUNTS = [10, 100, 1000, 10000, 100000]
+
+DEFAULT_REPEAT = 3
+
+# split_layers loads the whole drawing with ezdxf; above this many holes a run
+# takes minutes and gigabytes, so it is skipped unless the limit is raised
+DEFAULT_SPLIT_LAYERS_MAX_HOLES = 10000
+
+# Timings shorter than this are dominated by noise and left out of the scaling fit (s)
+SCALING_MIN_SECONDS = 0.001
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def time_best(function, repeat):
+    """Run function repeat times and return the best and all wall times."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return min(runs), runs
+
+
+def bench_split_layers(panel, work_dir):
+    output_file = os.path.join(work_dir, "out", os.path.basename(panel['dxf_file']))
+    template_file = os.path.join(work_dir, "tpl", os.path.basename(panel['dxf_file']))
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    os.makedirs(os.path.dirname(template_file), exist_ok=True)
+
+    def run():
+        # The per-entity progress output would dominate the measurement
+        with contextlib.redirect_stdout(io.StringIO()):
+            split_layers.split_layers(panel['dxf_file'], output_file, template_file=template_file)
+    return run
+
+
+def bench_group_lines(panel, segments):
+    lines = synthetic_panels.hole_lines(panel['holes'], segments)
+    return lambda: split_layers.group_lines_into_polylines(lines)
+
+
+def bench_circle_detection(panel, segments):
+    point_lists = [synthetic_panels.circle_points(x, y, diameter, segments) for x, y, diameter in panel['holes']]
+    return lambda: split_layers.fit_circles(point_lists)
+
+
+def bench_add_dimensions(panel):
+    holes = [{'x': x, 'y': y} for x, y, _ in panel['holes']]
+    bounding_box = (0.0, 0.0, panel['width'], panel['height'])
+
+    def run():
+        doc = ezdxf.new('R2000')
+        msp = split_layers.ExtentsTracker(doc.modelspace())
+        split_layers.add_dimensions(msp, holes, bounding_box, doc)
+    return run
+
+
+def bench_analyze_dxf(panel):
+    return lambda: analyze_dxf.scan_dxf(panel['dxf_file'])
+
+
+STEPS = ["split_layers", "group_lines_into_polylines", "circle_detection", "add_dimensions", "analyze_dxf"]
+
+
+def make_step(step, panel, style, segments, work_dir):
+    """Return the callable timing step on panel, or None if the step does not apply."""
+    if step == "split_layers":
+        return bench_split_layers(panel, work_dir)
+    if step == "group_lines_into_polylines":
+        return bench_group_lines(panel, segments) if style == "line" else None
+    if step == "circle_detection":
+        return bench_circle_detection(panel, segments)
+    if step == "add_dimensions":
+        return bench_add_dimensions(panel)
+    if step == "analyze_dxf":
+        return bench_analyze_dxf(panel)
+    raise ValueError(f"Unknown benchmark step: {step}")
+
+
+def scaling_exponent(measurements):
+    """Least squares slope of log(seconds) over log(holes)."""
+    points = [(math.log(m['holes']), math.log(m['seconds'])) for m in measurements if m['seconds'] >= SCALING_MIN_SECONDS]
+    if len(points) < 2:
+        return None
+    mean_x = sum(p[0] for p in points) / len(points)
+    mean_y = sum(p[1] for p in points) / len(points)
+    variance = sum((p[0] - mean_x) ** 2 for p in points)
+    if variance == 0:
+        return None
+    return sum((p[0] - mean_x) * (p[1] - mean_y) for p in points) / variance
+
+
+def summarize_scaling(results):
+    scaling = []
+    keys = sorted({(r['step'], r['style']) for r in results})
+    for step, style in keys:
+        measurements = sorted((r for r in results if r['step'] == step and r['style'] == style), key=lambda r: r['holes'])
+        scaling.append({'step': step, 'style': style, 'exponent': scaling_exponent(measurements)})
+    return scaling
+
+
+def run_benchmarks(hole_counts, styles, steps, repeat, segments, split_layers_max_holes, work_dir):
+    results = []
+    for style in styles:
+        for hole_count in hole_counts:
+            panel_dir = os.path.join(work_dir, style)
+            panel = synthetic_panels.generate_panel(panel_dir, hole_count, style=style, segments=segments)
+            dxf_size = os.path.getsize(panel['dxf_file'])
+            for step in steps:
+                if step == "split_layers" and split_layers_max_holes and hole_count > split_layers_max_holes:
+                    print(f"{step:28s} {style:10s} {hole_count:>7d} holes  skipped (above --split-layers-max-holes)")
+                    continue
+                function = make_step(step, panel, style, segments, work_dir)
+                if function is None:
+                    continue
+                seconds, runs = time_best(function, repeat)
+                results.append({
+                    'step': step,
+                    'style': style,
+                    'holes': hole_count,
+                    'entities': panel['entities'],
+                    'dxf_bytes': dxf_size,
+                    'seconds': seconds,
+                    'runs': runs,
+                })
+                print(f"{step:28s} {style:10s} {hole_count:>7d} holes  {seconds:10.4f}s")
+    return results
+
+
+def print_scaling(scaling):
+    print("\n--- Scaling (slope of log time over log holes; 1 = linear, 2 = quadratic) ---")
+    for entry in scaling:
+        exponent = "n/a" if entry['exponent'] is None else f"{entry['exponent']:.2f}"
+        print(f"{entry['step']:28s} {entry['style']:10s} {exponent}")
+
+
+def print_comparison(results, previous_file):
+    with open(previous_file, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    previous_seconds = {(r['step'], r['style'], r['holes']): r['seconds'] for r in previous['results']}
+    print(f"\n--- Comparison with {previous_file} (speedup > 1 is faster now) ---")
+    for r in results:
+        before = previous_seconds.get((r['step'], r['style'], r['holes']))
+        if before is None:
+            continue
+        print(f"{r['step']:28s} {r['style']:10s} {r['holes']:>7d} holes  {before:10.4f}s -> {r['seconds']:10.4f}s  x{before / r['seconds']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the DXF tools on synthetic panels.')
+    parser.add_argument('--holes', type=int, nargs='+', default=DEFAULT_HOLE_COUNTS, help='Hole counts of the generated panels.')
+    parser.add_argument('--style', nargs='+', choices=synthetic_panels.HOLE_STYLES, default=synthetic_panels.HOLE_STYLES, help='Hole styles to generate.')
+    parser.add_argument('--steps', nargs='+', choices=STEPS, default=STEPS, help='Steps to time.')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f'Runs per measurement, the best one is kept (default: {DEFAULT_REPEAT}).')
+    parser.add_argument('--segments', type=int, default=synthetic_panels.DEFAULT_SEGMENTS, help=f'Segments per hole (default: {synthetic_panels.DEFAULT_SEGMENTS}).')
+    parser.add_argument('--split-layers-max-holes', type=int, default=DEFAULT_SPLIT_LAYERS_MAX_HOLES, help=f'Skip split_layers above this many holes, 0 for no limit (default: {DEFAULT_SPLIT_LAYERS_MAX_HOLES}).')
+    parser.add_argument('--work-dir', help='Keep the generated panels and outputs in this directory instead of a temporary one.')
+    parser.add_argument('--output', help='Result JSON file (default: benchmark/results/<timestamp>.json).')
+    parser.add_argument('--compare', help='Earlier result JSON file to compare against.')
+    args = parser.parse_args()
+
+    started = datetime.datetime.now()
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_benchmarks(args.holes, args.style, args.steps, args.repeat, args.segments, args.split_layers_max_holes, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="dxf-benchmark-") as work_dir:
+            results = run_benchmarks(args.holes, args.style, args.steps, args.repeat, args.segments, args.split_layers_max_holes, work_dir)
+
+    scaling = summarize_scaling(results)
+    print_scaling(scaling)
+
+    output_file = args.output or os.path.join(RESULTS_DIR, f"{started.strftime('%Y%m%d-%H%M%S')}.json")
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': started.isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'ezdxf': ezdxf.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'segments': args.segments,
+            'repeat': args.repeat,
+            'results': results,
+            'scaling': scaling,
+        }, f, indent=2)
+    print(f"\nResults written to {output_file}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Generates synthetic raw panel DXF files and matching hole CSV files.
+
+The DXF files mimic what OpenSCAD exports for a projected panel: an R12 (AC1006)
+file with a rectangular LWPOLYLINE outline and every hole tessellated into FN
+segments, written either as a soup of LINE entities or as closed LWPOLYLINEs,
+all on layer 0. The holes are laid out on a 32 mm grid and the panel grows with
+the number of holes. The hole CSV has the header split_layers.py expects.
+
+Usage:
+    python -m benchmark.synthetic_panels <output_dir> --holes 10 100 1000 [--style line|lwpolyline] [--segments N]
+
+Example:
+    python -m benchmark.synthetic_panels build/synthetic --holes 10 1000 100000 --style line
+"""
+import argparse
+import csv
+import math
+import os
+
+# Hole grid pitch and distance of the outer holes from the panel edge (mm)
+HOLE_SPACING = 32.0
+PANEL_MARGIN = 37.0
+
+# Hole diameters used in turn, all below the slot size split_layers treats as a hole
+HOLE_DIAMETERS = [4.0, 5.0, 8.0]
+
+# Drilling depth written to the hole CSV (mm)
+HOLE_DEPTH = 12.0
+
+# Tessellation of the holes, same as FN in model.scad
+DEFAULT_SEGMENTS = 16
+
+HOLE_STYLES = ["line", "lwpolyline"]
+
+CSV_HEADER = ["PanelName", "HoleName", "X", "Y", "Z", "Diameter", "Depth", "Nx", "Ny", "Nz"]
+
+# Header and tables of an OpenSCAD DXF export; the extents are filled in
+DXF_HEAD = """999
+DXF from OpenSCAD
+  0
+SECTION
+  2
+HEADER
+  9
+$ACADVER
+  1
+AC1006
+  9
+$INSBASE
+ 10
+0.0
+ 20
+0.0
+ 30
+0.0
+  9
+$EXTMIN
+ 10
+0
+ 20
+0
+  9
+$EXTMAX
+ 10
+{width}
+ 20
+{height}
+  9
+$LINMIN
+ 10
+0
+ 20
+0
+  9
+$LINMAX
+ 10
+{width}
+ 20
+{height}
+  0
+ENDSEC
+  0
+SECTION
+  2
+TABLES
+  0
+TABLE
+  2
+LTYPE
+ 70
+1
+  0
+LTYPE
+  2
+CONTINUOUS
+ 70
+64
+  3
+Solid line
+ 72
+65
+ 73
+0
+ 40
+0.000000
+  0
+ENDTAB
+  0
+TABLE
+  2
+LAYER
+ 70
+6
+  0
+LAYER
+  2
+0
+ 70
+64
+ 62
+7
+  6
+CONTINUOUS
+  0
+ENDTAB
+  0
+TABLE
+  2
+STYLE
+ 70
+0
+  0
+ENDTAB
+  0
+ENDSEC
+  0
+SECTION
+  2
+BLOCKS
+  0
+ENDSEC
+  0
+SECTION
+  2
+ENTITIES
+"""
+
+DXF_TAIL = """  0
+ENDSEC
+  0
+EOF
+"""
+
+
+def format_number(value):
+    return "%.10g" % value
+
+
+def hole_layout(hole_count, spacing=HOLE_SPACING, margin=PANEL_MARGIN):
+    """Place hole_count holes on a square-ish grid.
+
+    Returns the panel width and height and a list of (x, y, diameter) tuples.
+    """
+    columns = max(1, math.ceil(math.sqrt(hole_count)))
+    rows = max(1, math.ceil(hole_count / columns))
+    width = 2 * margin + (columns - 1) * spacing
+    height = 2 * margin + (rows - 1) * spacing
+    holes = []
+    for i in range(hole_count):
+        row, column = divmod(i, columns)
+        diameter = HOLE_DIAMETERS[i % len(HOLE_DIAMETERS)]
+        holes.append((margin + column * spacing, margin + row * spacing, diameter))
+    return width, height, holes
+
+
+def circle_points(x, y, diameter, segments=DEFAULT_SEGMENTS):
+    """Vertices of a hole tessellated the way OpenSCAD does for $fn=segments."""
+    radius = diameter / 2
+    return [
+        (x + radius * math.cos(2 * math.pi * i / segments), y + radius * math.sin(2 * math.pi * i / segments))
+        for i in range(segments)
+    ]
+
+
+def hole_lines(holes, segments=DEFAULT_SEGMENTS):
+    """LINE data of all tessellated holes, as produced by extract_entity_data()."""
+    lines = []
+    for x, y, diameter in holes:
+        points = circle_points(x, y, diameter, segments)
+        for i, start in enumerate(points):
+            lines.append({'type': 'LINE', 'start': start, 'end': points[(i + 1) % segments], 'handle': str(len(lines))})
+    return lines
+
+
+def lwpolyline_tags(points, closed=True):
+    tags = ["  0", "LWPOLYLINE", "100", "AcDbEntity", "  8", "0", "100", "AcDbPolyline", " 90", str(len(points)), " 70", "1" if closed else "0"]
+    for x, y in points:
+        tags.extend([" 10", format_number(x), " 20", format_number(y)])
+    return tags
+
+
+def line_tags(start, end):
+    return ["  0", "LINE", "  8", "0",
+            " 10", format_number(start[0]), " 20", format_number(start[1]),
+            " 11", format_number(end[0]), " 21", format_number(end[1])]
+
+
+def write_panel_dxf(path, width, height, holes, style="line", segments=DEFAULT_SEGMENTS):
+    """Write the raw panel DXF and return the number of entities in it."""
+    if style not in HOLE_STYLES:
+        raise ValueError(f"Unknown hole style: {style}. Expected one of {HOLE_STYLES}")
+    entity_count = 1
+    with open(path, 'w', encoding='ascii', newline='\n') as f:
+        f.write(DXF_HEAD.format(width=format_number(width), height=format_number(height)))
+        outline = [(0, 0), (width, 0), (width, height), (0, height)]
+        f.write("\n".join(lwpolyline_tags(outline)) + "\n")
+        for x, y, diameter in holes:
+            points = circle_points(x, y, diameter, segments)
+            if style == "line":
+                tags = []
+                for i, start in enumerate(points):
+                    tags.extend(line_tags(start, points[(i + 1) % segments]))
+                entity_count += segments
+            else:
+                tags = lwpolyline_tags(points)
+                entity_count += 1
+            f.write("\n".join(tags) + "\n")
+        f.write(DXF_TAIL)
+    return entity_count
+
+
+def write_hole_csv(path, panel_name, holes):
+    """Write the hole metadata CSV that export-panels.ps1 extracts from the OpenSCAD log."""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for i, (x, y, diameter) in enumerate(holes):
+            writer.writerow([panel_name, f"hole_{i + 1}", format_number(x), format_number(y), 0, format_number(diameter), format_number(HOLE_DEPTH), 0, 0, 1])
+
+
+def generate_panel(output_dir, hole_count, style="line", segments=DEFAULT_SEGMENTS, panel_name=None):
+    """Write a synthetic panel DXF and its hole CSV.
+
+    Returns a dict with the paths, the panel size, the holes and the number of
+    DXF entities written.
+    """
+    if panel_name is None:
+        panel_name = f"Synthetic_{style}_{hole_count}"
+    os.makedirs(output_dir, exist_ok=True)
+    width, height, holes = hole_layout(hole_count)
+    dxf_file = os.path.join(output_dir, f"{panel_name}.dxf")
+    csv_file = os.path.join(output_dir, f"{panel_name}.csv")
+    entity_count = write_panel_dxf(dxf_file, width, height, holes, style=style, segments=segments)
+    write_hole_csv(csv_file, panel_name, holes)
+    return {
+        'dxf_file': dxf_file,
+        'csv_file': csv_file,
+        'width': width,
+        'height': height,
+        'holes': holes,
+        'entities': entity_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic raw panel DXF files and hole CSV files.')
+    parser.add_argument('output_dir', help='Directory for the generated files.')
+    parser.add_argument('--holes', type=int, nargs='+', required=True, help='Number of holes of each generated panel.')
+    parser.add_argument('--style', choices=HOLE_STYLES, default='line', help='Write holes as LINE soup or closed LWPOLYLINEs.')
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS, help=f'Segments per hole (default: {DEFAULT_SEGMENTS}).')
+    args = parser.parse_args()
+
+    for hole_count in args.holes:
+        panel = generate_panel(args.output_dir, hole_count, style=args.style, segments=args.segments)
+        print(f"Generated {panel['dxf_file']}: {hole_count} holes, {panel['entities']} entities, {panel['width']:.0f} x {panel['height']:.0f} mm")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,68 @@
 import openpyxl
-import csv
 import argparse
 import datetime
+import glob
+import hashlib
 import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import profiling
+from cut_list import load_cut_list, verify_header
 from order.PII import CUSTOMER_NAME, CUSTOMER_PHONE, CUSTOMER_EMAIL, CUSTOMER_ADDRESS
 
 
 """
-Creates an Iverpan order document from a CSV cut list.
+Creates cutting service order documents from a CSV cut list.
 
 This script reads a CSV file containing a cut list and populates an Excel template
-with the data to create an order document for the Iverpan cutting service.
+with the data to create an order document for a cutting service (Iverpan, Elgrad,
+Furnir or Sizekupres).
+
+Several services (or "all", i.e. iverpan, elgrad and sizekupres) and several model
+identifiers can be given at once. The template of every service is then taken
+from order/template/<service>_tablica_za_narudzbu.xlsx and the workbooks of all
+service and model combinations are filled in a pool of worker processes, so the
+run takes about as long as the slowest service. --template is only allowed
+together with a single service.
 
 Example:
 python create_order.py --model-id "H2300xW600xD230_Mm19_Ms12" --service iverpan --template "order/template/iverpan_tablica_za_narudzbu.xlsx"
 python create_order.py --model-id "H2300xW600xD230_Mm19_Ms12" --service elgrad --template "order/template/elgrad_tablica_za_narudzbu.xlsx"
 python create_order.py --model-id "H2300xW600xD230_Mm18_Ms12" --service furnir --template "order/template/furnir_tablica_za_narudzbu.xlsx"
 python create_order.py --model-id "H2300xW600xD230_Mm18_Ms12" --service sizekupres --template "order/template/sizekupres_tablica_za_narudzbu.xlsx"
+python create_order.py --model-id "H2300xW600xD230_Mm19_Ms12" "H2300xW600xD230_Mm18_Ms12" --service all [--jobs N]
+
+The cut list is parsed and validated once per run (load_cut_list) and every
+order writer fills its workbook from the parsed rows.
+
+Every template is parsed and its header verified once per process; each order
+file is filled in an in-memory copy. With --template-cache <dir> the parsed
+templates are also kept as pickled snapshots, keyed by the template's content
+hash and mtime, so later runs skip parsing the XLSX files.
+
+Use --profile <path.json> to record the wall time and tracemalloc peak of the cut list
+load and of the template load, row fill and save phases of every order file written.
 """
 
-# Set up argument parser
-parser = argparse.ArgumentParser(description='Create an Iverpan order document from a CSV cut list.')
-parser.add_argument('--model-id', required=True, help='Model identifier.')
-parser.add_argument('--service', required=True, help='Service id: iverpan | elgrad')
-parser.add_argument('--template', required=True, help='Path to the Excel template file.')
-args = parser.parse_args()
+# Output directory of the order files of a model
+ORDER_DIR_PATTERN = 'order/export/{model_id}'
+
+# Order template of a service, used when no --template is given
+TEMPLATE_PATTERN = 'order/template/{service}_tablica_za_narudzbu.xlsx'
+
+# Services generated by --service all; the furnir order is still created by hand
+ALL_SERVICES = ['iverpan', 'elgrad', 'sizekupres']
+
+# File extension of the pickled template snapshots written with --template-cache
+TEMPLATE_SNAPSHOT_EXTENSION = '.pickle'
+
+# Pickled template workbooks of this process: absolute template path -> ((mtime_ns, size), snapshot)
+_template_cache = {}
 
-ORDER_DIR = f'order/export/{args.model_id}'
+# Directory of the on-disk template snapshots; None keeps them in memory only
+_snapshot_dir = None
 
 MATERIAL = {
     'iverpan': {
@@ -87,316 +123,425 @@ MATERIAL = {
     },
 }
 
-CSV_HEADER = "material code,material thickness,dimension A (along wood grain),dimension B,count,edge banding A-1,edge banding A-2,edge banding B-1,edge banding B-2,panel name,panel description,cnc face holes,cnc side holes".split(',')
+def enable_template_snapshots(directory):
+    """Keep pickled template snapshots in directory so later runs skip parsing the XLSX files."""
+    global _snapshot_dir
+    _snapshot_dir = directory
+
+
+def template_snapshot_path(workbook_file, directory):
+    """Snapshot file of a template, keyed by its content hash, its mtime and the openpyxl version."""
+    with open(workbook_file, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    mtime_ns = os.stat(workbook_file).st_mtime_ns
+    stem = os.path.splitext(os.path.basename(workbook_file))[0]
+    return os.path.join(directory, f"{stem}-{digest}-{mtime_ns}-openpyxl{openpyxl.__version__}{TEMPLATE_SNAPSHOT_EXTENSION}")
+
+
+def write_template_snapshot(snapshot_path, snapshot):
+    """Atomically write a template snapshot and remove the outdated ones of the same template."""
+    directory = os.path.dirname(snapshot_path)
+    os.makedirs(directory, exist_ok=True)
+    # Parallel workers (processes or threads) may write the same snapshot; each
+    # writes its own uniquely named file and renames it into place
+    handle, temp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(snapshot_path)}.", suffix='.tmp')
+    with os.fdopen(handle, 'wb') as f:
+        f.write(snapshot)
+    os.replace(temp_path, snapshot_path)
+    print(f"Template snapshot written: {snapshot_path}")
+
+    stem = os.path.basename(snapshot_path).rsplit('-', 3)[0]
+    for outdated in glob.glob(os.path.join(glob.escape(directory), f"{glob.escape(stem)}-*{TEMPLATE_SNAPSHOT_EXTENSION}")):
+        if os.path.basename(outdated) == os.path.basename(snapshot_path):
+            continue
+        # Another worker may have removed it already
+        try:
+            os.remove(outdated)
+        except FileNotFoundError:
+            pass
+
+
+def load_template(workbook_file, sheet_name, header_row, expected_header):
+    """Return a workbook of the template that can be filled and saved as an order.
+
+    The first request in a process parses the XLSX file, or unpickles its
+    snapshot when template snapshots are enabled and one matches the file,
+    and verifies the header row of sheet_name. The workbook is kept pickled in
+    memory and every later request gets an independent copy unpickled from it,
+    until the modification time or size of the file changes; the template is
+    then loaded again. Snapshots are trusted local cache files: only point --template-cache at
+    a directory written by this script.
+    """
+    key = os.path.abspath(workbook_file)
+    stat = os.stat(workbook_file)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return pickle.loads(cached[1])
+
+    snapshot_path = template_snapshot_path(workbook_file, _snapshot_dir) if _snapshot_dir else None
+    if snapshot_path and os.path.exists(snapshot_path):
+        with open(snapshot_path, 'rb') as f:
+            snapshot = f.read()
+        workbook = pickle.loads(snapshot)
+        print(f"Template loaded from snapshot: {snapshot_path}")
+    else:
+        workbook = openpyxl.load_workbook(workbook_file)
+        snapshot = pickle.dumps(workbook, protocol=pickle.HIGHEST_PROTOCOL)
 
+    # Verify header
+    header_values = [cell.value for cell in workbook[sheet_name][header_row]]
+    verify_header(header_values, expected_header)
 
-def verify_header(header, expected_header):
-    # Check if the header starts with the expected header
-    if not all(h_found == h_expected for h_found, h_expected in zip(header, expected_header)):
-        print("Warning: headers do not match; there might be some additional columns beyond the expected header.")
-        print("Expected prefix:", expected_header)
-        print("Found:", header)
-        exit(1)
-    return True
+    if snapshot_path and not os.path.exists(snapshot_path):
+        write_template_snapshot(snapshot_path, snapshot)
+    # Replaces the entry of an outdated version of the template
+    _template_cache[key] = (version, snapshot)
+    return workbook
 
 
-def process_elgrad_order_with_material(service, material_code, thickness, workbook_file, csv_file, output_file):
-    print(f"Creating order file: {output_file}")
+def order_dir(model_id):
+    return ORDER_DIR_PATTERN.format(model_id=model_id)
 
-    workbook = openpyxl.load_workbook(workbook_file)
-    # Select the 'Elementi' worksheet
-    sheet = workbook['Elementi']
 
-    # Verify header
-    header_row = sheet[3]
-    header_values = [cell.value for cell in header_row]
-    expected_header = ['R.B.',	'DULJINA', 'ŠIRINA', 'BR.KOM.',	'DUŽA MJERA',  'KRAĆA MJERA', 'DUŽA MJERA', 'KRAĆA MJERA', None]
-    verify_header(header_values, expected_header)
+def material_name(row, material):
+    return material['iveral'][row.material_code]
 
-    sheet.cell(row=1, column=2).value = f"{MATERIAL[service]['iveral'][material_code]} {thickness}mm"
-    sheet.cell(row=1, column=7).value = f"{MATERIAL[service]['iveral'][material_code]}"
-    sheet.cell(row=2, column=2).value = "da" if material_code != 'HDF-3' else "ne"
-
-    # Read data from CSV and populate the Excel sheet
-    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        
-        # Read header row
-        header_row = next(reader)
-        verify_header(header_row, CSV_HEADER)
-
-        # Start writing from row 14
-        row_num = 4
-        for row in reader:
-            material_code2 = row[0]
-            thickness2 = row[1]
-            if material_code != material_code2 or thickness != thickness2:
-                continue
-
-            print(f"{row_num}. material {material_code} thickness {thickness}")
-            dim_A = float(row[2])
-            dim_B = float(row[3])
-            count = int(row[4])
-            edge_A1 = int(row[5])
-            edge_A2 = int(row[6])
-            edge_B1 = int(row[7])
-            edge_B2 = int(row[8])
-            panel_name = row[9]
-            panel_desc = row[10]
-            cnc_face_holes = row[11]
-            cnc_side_holes = row[12]
-
-            sheet.cell(row=row_num, column=2).value = dim_A
-            sheet.cell(row=row_num, column=3).value = dim_B
-            sheet.cell(row=row_num, column=4).value = count
-            sheet.cell(row=row_num, column=5).value = None
-            sheet.cell(row=row_num, column=6).value = None
-            sheet.cell(row=row_num, column=7).value = 2 if edge_A1 == 1 and edge_A2 == 1 else 1 if edge_A1 == 1 or edge_A2 == 1 else 0
-            sheet.cell(row=row_num, column=8).value = 2 if edge_B1 == 1 and edge_B2 == 1 else 1 if edge_B1 == 1 or edge_B2 == 1 else 0
-            sheet.cell(row=row_num, column=9).value = f"{panel_name}; {panel_desc}; {cnc_face_holes}; {cnc_side_holes}"
-
-            row_num += 1
 
-    # Save the new Excel file
-    workbook.save(output_file)
-    print(f"Successfully created order file: {output_file}")
+def edge_banding(edge):
+    """Column value: the banding code of the row's material if the edge is banded, else empty."""
+    def value(row, material):
+        return None if getattr(row, edge) == 0 else material['edge_banding'][row.material_code]
+    return value
 
 
-def process_elgrad_order(workbook_file, csv_file, service, model_id):
-    materials = set()
-    # Read data from CSV and collect all materials and their thicknesses
-    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        
-        # Read header row
-        header_row = next(reader)
-        verify_header(header_row, CSV_HEADER)
+def banded_edge_count(first_edge, second_edge):
+    """Column value: how many of two opposite edges are banded (0, 1 or 2)."""
+    def value(row, material):
+        return int(getattr(row, first_edge) == 1) + int(getattr(row, second_edge) == 1)
+    return value
 
-        for row in reader:
-            material_code = row[0]
-            thickness = row[1]
-            materials.add((material_code, thickness))
 
-    for material_code, thickness in materials:
-        material = MATERIAL[service]['iveral'][material_code]
-        date_str = datetime.datetime.now().strftime("%Y%m%d")
-        output_file = os.path.join(ORDER_DIR, f"{service}_{model_id}_{date_str}_{material}_{thickness}mm.xlsx")
-        process_elgrad_order_with_material(service, material_code, thickness, workbook_file, csv_file, output_file)
+def sizekupres_banding_code(row, material):
+    # 'MEL-19': ABS 34140 RV 23/0,8 ; ABS 34140 RV 23/2
+    # 'MEL-12': ABS 1615 SF 23/0,45 ; ABS 1615 SF 23/2
+    # Calculate banding (hack based on the thickness value; 19 -> 1 and 2, 12 -> 3 and 4)
+    code = 3 if int(row.thickness) <= 12 else 2
+    return "".join(str(code if edge != 0 else 0) for edge in (row.edge_a1, row.edge_a2, row.edge_b1, row.edge_b2))
 
 
-def process_iverpan_order(workbook_file, csv_file, service, model_id):
-    date_str = datetime.datetime.now().strftime("%Y%m%d")
-    output_file = os.path.join(ORDER_DIR, f"{service}_{model_id}_{date_str}.xlsx")
-    print(f"Creating order file: {output_file}")
-    workbook = openpyxl.load_workbook(workbook_file)
-    # Select the 'Narudžba' worksheet
-    sheet = workbook['Narudžba']
+def panel_note(row, material):
+    return f"{row.panel_name}; {row.panel_desc}; {row.cnc_face_holes}; {row.cnc_side_holes}"
 
-    # Verify header
-    header_row = sheet[12]
-    header_values = [cell.value for cell in header_row]
-    expected_header = ['R.b', 'Šifra materijala', 'Deb.', '1.Mjera ', '2. Mjera ', 'Br.', None, None, 'R.P. kantiranje desno', ' R.P. kantiranje lijevo', 'Napomena ', 'Napomena ', 'Napomena ', 'Napomena ', 'Napomena ', None]
-    verify_header(header_values, expected_header)
 
-    sheet.cell(row=2, column=8).value = CUSTOMER_NAME
-    sheet.cell(row=3, column=8).value = CUSTOMER_PHONE
-    sheet.cell(row=4, column=8).value = CUSTOMER_EMAIL
-    sheet.cell(row=5, column=8).value = CUSTOMER_ADDRESS
-
-    # Read data from CSV and populate the Excel sheet
-    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        
-        # Read header row
-        header_row = next(reader)
-        verify_header(header_row, CSV_HEADER)
-
-        # Start writing from row 14
-        row_num = 14
-        for row in reader:
-            material_code = row[0]
-            thickness = row[1]
-            dim_A = float(row[2])
-            dim_B = float(row[3])
-            count = int(row[4])
-            edge_A1 = int(row[5])
-            edge_A2 = int(row[6])
-            edge_B1 = int(row[7])
-            edge_B2 = int(row[8])
-            panel_name = row[9]
-            panel_desc = row[10]
-            cnc_face_holes = row[11]
-            cnc_side_holes = row[12]
-
-            sheet.cell(row=row_num, column=2).value = MATERIAL[service]['iveral'][material_code]
-            sheet.cell(row=row_num, column=3).value = thickness
-            sheet.cell(row=row_num, column=4).value = dim_A
-            sheet.cell(row=row_num, column=5).value = dim_B
-            sheet.cell(row=row_num, column=6).value = count
-            sheet.cell(row=row_num, column=7).value = None if edge_A1 == 0 else MATERIAL[service]['edge_banding'][material_code]
-            sheet.cell(row=row_num, column=8).value = None if edge_A2 == 0 else MATERIAL[service]['edge_banding'][material_code]
-            sheet.cell(row=row_num, column=9).value = None if edge_B1 == 0 else MATERIAL[service]['edge_banding'][material_code]
-            sheet.cell(row=row_num, column=10).value = None if edge_B2 == 0 else MATERIAL[service]['edge_banding'][material_code]
-            
-            sheet.cell(row=row_num, column=11).value = panel_name
-            sheet.cell(row=row_num, column=12).value = panel_desc
-            sheet.cell(row=row_num, column=13).value = cnc_face_holes
-            sheet.cell(row=row_num, column=14).value = cnc_side_holes
-
-            row_num += 1
+# Order template layout of every service:
+#   sheet, header_row, expected_header: worksheet to fill and its verified header row
+#   first_row: first row of the cut list
+#   split_by_material: write one order file per material and thickness
+#   cells: fixed cells (row, column) -> function of the order, a dict with the
+#          service's MATERIAL entry and, when split by material, the material code and thickness
+#   columns: column -> CutListRow field name, function of (row, material) or None for an empty cell
+# Adding a service only takes a new entry here, in MATERIAL and in order/template.
+ORDER_SPECS = {
+    'iverpan': {
+        'sheet': 'Narudžba',
+        'header_row': 12,
+        'expected_header': ['R.b', 'Šifra materijala', 'Deb.', '1.Mjera ', '2. Mjera ', 'Br.', None, None, 'R.P. kantiranje desno', ' R.P. kantiranje lijevo', 'Napomena ', 'Napomena ', 'Napomena ', 'Napomena ', 'Napomena ', None],
+        'first_row': 14,
+        'split_by_material': False,
+        'cells': {
+            (2, 8): lambda order: CUSTOMER_NAME,
+            (3, 8): lambda order: CUSTOMER_PHONE,
+            (4, 8): lambda order: CUSTOMER_EMAIL,
+            (5, 8): lambda order: CUSTOMER_ADDRESS,
+        },
+        'columns': {
+            2: material_name,
+            3: 'thickness',
+            4: 'dim_a',
+            5: 'dim_b',
+            6: 'count',
+            7: edge_banding('edge_a1'),
+            8: edge_banding('edge_a2'),
+            9: edge_banding('edge_b1'),
+            10: edge_banding('edge_b2'),
+            11: 'panel_name',
+            12: 'panel_desc',
+            13: 'cnc_face_holes',
+            14: 'cnc_side_holes',
+        },
+    },
+    'elgrad': {
+        'sheet': 'Elementi',
+        'header_row': 3,
+        'expected_header': ['R.B.',	'DULJINA', 'ŠIRINA', 'BR.KOM.',	'DUŽA MJERA',  'KRAĆA MJERA', 'DUŽA MJERA', 'KRAĆA MJERA', None],
+        'first_row': 4,
+        'split_by_material': True,
+        'cells': {
+            (1, 2): lambda order: f"{order['material']['iveral'][order['material_code']]} {order['thickness']}mm",
+            (1, 7): lambda order: f"{order['material']['iveral'][order['material_code']]}",
+            (2, 2): lambda order: "da" if order['material_code'] != 'HDF-3' else "ne",
+        },
+        'columns': {
+            2: 'dim_a',
+            3: 'dim_b',
+            4: 'count',
+            5: None,
+            6: None,
+            7: banded_edge_count('edge_a1', 'edge_a2'),
+            8: banded_edge_count('edge_b1', 'edge_b2'),
+            9: panel_note,
+        },
+    },
+    'furnir': {
+        'sheet': 'ELEMENTI',
+        'header_row': 9,
+        'expected_header': ['Red.br.:', 'šifra1', 'šifra2', 'šifra3', 'Naziv elementa', 'CNC_PROG_1', 'CNC_PROG_2', 'NAZIV DASKE', 'Duljina  mm', 'Širina  mm', 'Debljina   mm', 'Komada', 'Materijal', 'DULJINA STRAGA', 'ŠIRINA GORE', 'DULJINA PREDNJA', 'ŠIRINA DOLJE', 'NAPOMENE'] + [None] * 56,
+        'first_row': 10,
+        'split_by_material': False,
+        'cells': {
+            (1, 14): lambda order: CUSTOMER_NAME,
+            (3, 14): lambda order: CUSTOMER_EMAIL,
+            (4, 14): lambda order: CUSTOMER_PHONE,
+        },
+        'columns': {
+            2: material_name,
+            5: 'panel_name',
+            6: 'cnc_face_holes',
+            7: 'cnc_side_holes',
+            9: 'dim_a',
+            10: 'dim_b',
+            11: 'thickness',
+            12: 'count',
+            13: material_name,
+            14: edge_banding('edge_a1'),
+            15: edge_banding('edge_a2'),
+            16: edge_banding('edge_b1'),
+            17: edge_banding('edge_b2'),
+            18: 'panel_desc',
+        },
+    },
+    'sizekupres': {
+        'sheet': 'Iverali',
+        'header_row': 2,
+        'expected_header': ['Iverali, iverice, lesomali, medijapan, metakrilat', 'Dužina', 'Širina', 'Količina', 'Kant', 'Napomena', None],
+        'first_row': 3,
+        'split_by_material': False,
+        'cells': {},
+        'columns': {
+            1: material_name,
+            2: 'dim_a',
+            3: 'dim_b',
+            4: 'count',
+            5: sizekupres_banding_code,
+            6: panel_note,
+        },
+    },
+}
 
-    # Save the new Excel file
-    workbook.save(output_file)
-    print(f"Successfully created order file: {output_file}")
 
+def column_getter(source):
+    """Turn a column source of an order spec into a function of (row, material)."""
+    if source is None:
+        return lambda row, material: None
+    if isinstance(source, str):
+        return lambda row, material: getattr(row, source)
+    return source
 
-def process_furnir_order(workbook_file, csv_file, service, model_id):
-    date_str = datetime.datetime.now().strftime("%Y%m%d")
-    output_file = os.path.join(ORDER_DIR, f"{service}_{model_id}_{date_str}.xlsx")
-    print(f"Creating order file: {output_file}")
-    workbook = openpyxl.load_workbook(workbook_file)
-    # Select the 'Narudžba' worksheet
-    sheet = workbook['ELEMENTI']
 
-    # Verify header
-    header_row = sheet[9]
-    header_values = [cell.value for cell in header_row]
-    expected_header = ['Red.br.:', 'šifra1', 'šifra2', 'šifra3', 'Naziv elementa', 'CNC_PROG_1', 'CNC_PROG_2', 'NAZIV DASKE', 'Duljina  mm', 'Širina  mm', 'Debljina   mm', 'Komada', 'Materijal', 'DULJINA STRAGA', 'ŠIRINA GORE', 'DULJINA PREDNJA', 'ŠIRINA DOLJE', 'NAPOMENE', None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None]
-    verify_header(header_values, expected_header)
+def build_order_rows(columns, rows, material):
+    """Return the cell values of every cut list row as a tuple in the order of columns."""
+    getters = [column_getter(source) for source in columns.values()]
+    return [tuple(get(row, material) for get in getters) for row in rows]
 
-    sheet.cell(row=1, column=14).value = CUSTOMER_NAME
-    sheet.cell(row=3, column=14).value = CUSTOMER_EMAIL
-    sheet.cell(row=4, column=14).value = CUSTOMER_PHONE
-
-    # Read data from CSV and populate the Excel sheet
-    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        
-        # Read header row
-        header_row = next(reader)
-        verify_header(header_row, CSV_HEADER)
-
-        # Start writing from row 14
-        row_num = 10
-        for row in reader:
-            material_code = row[0]
-            thickness = row[1]
-            dim_A = float(row[2])
-            dim_B = float(row[3])
-            count = int(row[4])
-            edge_A1 = int(row[5])
-            edge_A2 = int(row[6])
-            edge_B1 = int(row[7])
-            edge_B2 = int(row[8])
-            panel_name = row[9]
-            panel_desc = row[10]
-            cnc_face_holes = row[11]
-            cnc_side_holes = row[12]
-
-            sheet.cell(row=row_num, column=2).value = MATERIAL[service]['iveral'][material_code]
-            sheet.cell(row=row_num, column=5).value = panel_name
-            sheet.cell(row=row_num, column=6).value = cnc_face_holes
-            sheet.cell(row=row_num, column=7).value = cnc_side_holes
-
-            sheet.cell(row=row_num, column=9).value = dim_A
-            sheet.cell(row=row_num, column=10).value = dim_B
-            sheet.cell(row=row_num, column=11).value = thickness
-            sheet.cell(row=row_num, column=12).value = count
-
-            sheet.cell(row=row_num, column=13).value = MATERIAL[service]['iveral'][material_code]
-            sheet.cell(row=row_num, column=14).value = None if edge_A1 == 0 else MATERIAL[service]['edge_banding'][material_code]
-            sheet.cell(row=row_num, column=15).value = None if edge_A2 == 0 else MATERIAL[service]['edge_banding'][material_code]
-            sheet.cell(row=row_num, column=16).value = None if edge_B1 == 0 else MATERIAL[service]['edge_banding'][material_code]
-            sheet.cell(row=row_num, column=17).value = None if edge_B2 == 0 else MATERIAL[service]['edge_banding'][material_code]
-            
-            sheet.cell(row=row_num, column=18).value = panel_desc
-
-            row_num += 1
 
-    # Save the new Excel file
-    workbook.save(output_file)
-    print(f"Successfully created order file: {output_file}")
+def write_rows(sheet, first_row, columns, values):
+    """Write row tuples to the given columns, one sheet row per tuple from first_row on.
 
+    Only the mapped columns are touched, so the template's other cells and the
+    cell styles are kept.
+    """
+    cell = sheet.cell
+    column_numbers = list(columns)
+    for row_num, row_values in enumerate(values, start=first_row):
+        for column, value in zip(column_numbers, row_values):
+            cell(row=row_num, column=column).value = value
 
-def process_sizekupres_order(workbook_file, csv_file, service, model_id):
-    date_str = datetime.datetime.now().strftime("%Y%m%d")
-    output_file = os.path.join(ORDER_DIR, f"{service}_{model_id}_{date_str}.xlsx")
+
+def write_order(spec, service, model_id, workbook_file, rows, output_file, material_code=None, thickness=None):
+    """Fill one order file of a service from cut list rows following its spec."""
+    if material_code is None:
+        profiling.begin_record(output_file, service=service, model_id=model_id)
+    else:
+        profiling.begin_record(output_file, service=service, model_id=model_id, material_code=material_code, thickness=thickness)
     print(f"Creating order file: {output_file}")
-    workbook = openpyxl.load_workbook(workbook_file)
-    # Select the 'Narudžba' worksheet
-    sheet = workbook['Iverali']
 
-    # Verify header
-    header_row = sheet[2]
-    header_values = [cell.value for cell in header_row]
-    expected_header = ['Iverali, iverice, lesomali, medijapan, metakrilat', 'Dužina', 'Širina', 'Količina', 'Kant', 'Napomena', None]
-    verify_header(header_values, expected_header)
+    profiling.phase("template_load")
+    # Template loaded and its header verified once per process
+    workbook = load_template(workbook_file, spec['sheet'], spec['header_row'], spec['expected_header'])
+    sheet = workbook[spec['sheet']]
 
-    # Read data from CSV and populate the Excel sheet
-    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        
-        # Read header row
-        header_row = next(reader)
-        verify_header(header_row, CSV_HEADER)
-
-        # Start writing from row 3
-        row_num = 3
-        for row in reader:
-            material_code = row[0]
-            thickness = int(row[1])
-            dim_A = float(row[2])
-            dim_B = float(row[3])
-            count = int(row[4])
-            edge_A1 = int(row[5])
-            edge_A2 = int(row[6])
-            edge_B1 = int(row[7])
-            edge_B2 = int(row[8])
-            panel_name = row[9]
-            panel_desc = row[10]
-            cnc_face_holes = row[11]
-            cnc_side_holes = row[12]
-
-            sheet.cell(row=row_num, column=1).value = MATERIAL[service]['iveral'][material_code]
-            sheet.cell(row=row_num, column=2).value = dim_A
-            sheet.cell(row=row_num, column=3).value = dim_B
-            sheet.cell(row=row_num, column=4).value = count
-
-            # 'MEL-19': ABS 34140 RV 23/0,8 ; ABS 34140 RV 23/2
-            # 'MEL-12': ABS 1615 SF 23/0,45 ; ABS 1615 SF 23/2 
-            # Calculate banding (hack based on the thickness value; 19 -> 1 and 2, 12 -> 3 and 4)
-            banding = lambda x: (3 if thickness <= 12 else 2) if x != 0 else 0
-            banding_code = f"{banding(edge_A1)}{banding(edge_A2)}{banding(edge_B1)}{banding(edge_B2)}"
-            sheet.cell(row=row_num, column=5).value = banding_code            
-            sheet.cell(row=row_num, column=6).value = f"{panel_name}; {panel_desc}; {cnc_face_holes}; {cnc_side_holes}"
-
-            row_num += 1
+    material = MATERIAL[service]
+    order = {'material': material, 'material_code': material_code, 'thickness': thickness}
+    for (row_num, column), value in spec['cells'].items():
+        sheet.cell(row=row_num, column=column).value = value(order)
+
+    # Populate the Excel sheet
+    profiling.phase("row_fill")
+    values = build_order_rows(spec['columns'], rows, material)
+    write_rows(sheet, spec['first_row'], spec['columns'], values)
+    profiling.add_counts(rows=len(rows), rows_written=len(values))
 
     # Save the new Excel file
+    profiling.phase("save")
     workbook.save(output_file)
+    profiling.end_record()
     print(f"Successfully created order file: {output_file}")
 
 
+def process_order(workbook_file, cut_list, service, model_id):
+    """Write the order file(s) of a service for a model; returns the files written."""
+    spec = ORDER_SPECS[service]
+    date_str = datetime.datetime.now().strftime("%Y%m%d")
+    if not spec['split_by_material']:
+        output_file = os.path.join(order_dir(model_id), f"{service}_{model_id}_{date_str}.xlsx")
+        write_order(spec, service, model_id, workbook_file, cut_list['rows'], output_file)
+        return [output_file]
+
+    # One order file per material and thickness
+    output_files = []
+    for (material_code, thickness), rows in cut_list['by_material'].items():
+        material = MATERIAL[service]['iveral'][material_code]
+        output_file = os.path.join(order_dir(model_id), f"{service}_{model_id}_{date_str}_{material}_{thickness}mm.xlsx")
+        write_order(spec, service, model_id, workbook_file, rows, output_file, material_code=material_code, thickness=thickness)
+        output_files.append(output_file)
+    return output_files
+
+
+def run_order_job(service, workbook_file, cut_list, model_id, profile, snapshot_dir):
+    """Worker entry point: write the orders of one service and model.
+
+    Returns the order files written, the elapsed wall time and the profile records.
+    """
+    if profile:
+        profiling.enable()
+    enable_template_snapshots(snapshot_dir)
+    start = time.perf_counter()
+    output_files = process_order(workbook_file, cut_list, service, model_id)
+    return output_files, time.perf_counter() - start, profiling.take_records()
+
+
+def expand_services(services):
+    """Replace "all" by ALL_SERVICES and drop duplicates, keeping the order."""
+    expanded = []
+    for service in services:
+        for name in (ALL_SERVICES if service == 'all' else [service]):
+            if name not in expanded:
+                expanded.append(name)
+    return expanded
+
+
+def resolve_templates(services, template=None):
+    """Map every service to its template file, checking them before any order is written.
+
+    services may contain "all". Raises ValueError for an unknown service or a
+    template given for several services, FileNotFoundError for a missing template.
+    """
+    services = expand_services(services)
+    for service in services:
+        if service not in ORDER_SPECS:
+            raise ValueError(f"Unknown service: {service}")
+    if template and len(services) > 1:
+        raise ValueError("--template can only be used with a single service")
+
+    templates = {service: template or TEMPLATE_PATTERN.format(service=service) for service in services}
+    for service, template_file in templates.items():
+        if not os.path.isfile(template_file):
+            raise FileNotFoundError(f"template for service {service} not found: {template_file}")
+    return templates
+
+
+def create_orders(model_ids, templates, jobs=None, template_cache=None):
+    """Write the orders of every model for every service in templates.
+
+    A single order is written in this process, several in a pool of jobs worker
+    processes (jobs=1 keeps them all in this process, reusing its parsed templates).
+    Returns (service, model_id, output_files, elapsed) per order and the wall time.
+    """
+    job_list = []
+    for model_id in model_ids:
+        # Construct file paths
+        csv_file = os.path.join('export', model_id, 'cut_list.csv')
+
+        # Create the output directory if it does not exist
+        if not os.path.exists(order_dir(model_id)):
+            os.makedirs(order_dir(model_id))
+
+        # Parse the cut list once; every order writer works on the parsed rows
+        profiling.begin_record(csv_file)
+        profiling.phase("csv_load")
+        cut_list = load_cut_list(csv_file)
+        profiling.add_counts(rows=len(cut_list['rows']), materials=len(cut_list['by_material']))
+        profiling.end_record()
+
+        for service, template in templates.items():
+            job_list.append((service, template, cut_list, model_id))
+
+    timings = []
+    batch_start = time.perf_counter()
+    if len(job_list) == 1 or jobs == 1:
+        for service, template, cut_list, model_id in job_list:
+            output_files, elapsed, records = run_order_job(service, template, cut_list, model_id, profiling.is_enabled(), template_cache)
+            profiling.extend_records(records)
+            timings.append((service, model_id, output_files, elapsed))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(run_order_job, *job, profiling.is_enabled(), template_cache): job for job in job_list}
+            for future in as_completed(futures):
+                service, template, cut_list, model_id = futures[future]
+                # Let worker exceptions propagate - fail early and clearly
+                output_files, elapsed, records = future.result()
+                profiling.extend_records(records)
+                timings.append((service, model_id, output_files, elapsed))
+    return timings, time.perf_counter() - batch_start
+
+
+def print_timing_summary(timings, batch_elapsed):
+    print("--- Order Timing Summary ---")
+    timings = sorted(timings, key=lambda t: t[3], reverse=True)
+    for service, model_id, output_files, elapsed in timings:
+        print(f"{elapsed:8.2f}s  {service:12s} {model_id} -> {', '.join(output_files)}")
+    print(f"Total: {len(timings)} orders, {sum(t[3] for t in timings):.2f}s summed, {batch_elapsed:.2f}s wall")
+    print("----------------------------")
+
+
 def main():
     """Main function to orchestrate order creation."""
-    # Construct file paths
-    csv_file = os.path.join('export', args.model_id, 'cut_list.csv')
-
-    # Create the output directory if it does not exist
-    if not os.path.exists(ORDER_DIR):
-        os.makedirs(ORDER_DIR)
-
-    if args.service == 'iverpan':
-        process_iverpan_order(args.template, csv_file, args.service, args.model_id)
-    elif args.service == 'elgrad':
-        process_elgrad_order(args.template, csv_file, args.service, args.model_id)
-    elif args.service == 'furnir':
-        process_furnir_order(args.template, csv_file, args.service, args.model_id)
-    elif args.service == 'sizekupres':
-        process_sizekupres_order(args.template, csv_file, args.service, args.model_id)
-    else:
-        print(f"Unknown service: {args.service}")
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description='Create cutting service order documents from a CSV cut list.')
+    parser.add_argument('--model-id', required=True, nargs='+', help='Model identifier(s).')
+    parser.add_argument('--service', required=True, nargs='+', help=f'Service id(s): {" | ".join(ORDER_SPECS)}, or all ({", ".join(ALL_SERVICES)}).')
+    parser.add_argument('--template', help='Path to the Excel template file (single service only; default: ' + TEMPLATE_PATTERN + ').')
+    parser.add_argument('--template-cache', metavar='DIR', help='Keep pickled snapshots of the parsed templates in this directory (e.g. order/cache) so later runs skip parsing them.')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes (default: number of CPUs).')
+    parser.add_argument('--profile', metavar='PATH', help='Write per-file, per-phase wall time and peak memory to this JSON file.')
+    args = parser.parse_args()
+
+    if args.profile:
+        profiling.enable()
+
+    # Resolve the templates up front so a missing one fails before any order is written
+    try:
+        templates = resolve_templates(args.service, args.template)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"Error: {e}")
         exit(1)
 
+    timings, batch_elapsed = create_orders(args.model_id, templates, jobs=args.jobs, template_cache=args.template_cache)
+    print_timing_summary(timings, batch_elapsed)
+
+    if args.profile:
+        profiling.write_profile(args.profile)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,82 @@
+"""
+Reads the cut list CSV exported from model.scad by generate-csv.ps1.
+
+The cut list is validated against CSV_HEADER and parsed into typed CutListRow
+tuples once; create_order.py fills the supplier order files from them and
+nesting.py packs the parts onto boards.
+
+Usage:
+    cut_list = load_cut_list("export/H2300xW600xD230_Mm18_Ms12/cut_list.csv")
+    for (material_code, thickness), rows in cut_list['by_material'].items():
+        ...
+"""
+import csv
+from typing import NamedTuple
+
+CSV_HEADER = "material code,material thickness,dimension A (along wood grain),dimension B,count,edge banding A-1,edge banding A-2,edge banding B-1,edge banding B-2,panel name,panel description,cnc face holes,cnc side holes".split(',')
+
+
+def verify_header(header, expected_header):
+    # Check if the header starts with the expected header
+    if not all(h_found == h_expected for h_found, h_expected in zip(header, expected_header)):
+        print("Warning: headers do not match; there might be some additional columns beyond the expected header.")
+        print("Expected prefix:", expected_header)
+        print("Found:", header)
+        exit(1)
+    return True
+
+
+class CutListRow(NamedTuple):
+    """One line of cut_list.csv with its columns parsed."""
+    material_code: str
+    thickness: str  # As exported; used as is in order files and file names
+    dim_a: float  # Along the wood grain
+    dim_b: float
+    count: int
+    edge_a1: int
+    edge_a2: int
+    edge_b1: int
+    edge_b2: int
+    panel_name: str
+    panel_desc: str
+    cnc_face_holes: str
+    cnc_side_holes: str
+
+
+def parse_cut_list_row(row):
+    return CutListRow(
+        material_code=row[0],
+        thickness=row[1],
+        dim_a=float(row[2]),
+        dim_b=float(row[3]),
+        count=int(row[4]),
+        edge_a1=int(row[5]),
+        edge_a2=int(row[6]),
+        edge_b1=int(row[7]),
+        edge_b2=int(row[8]),
+        panel_name=row[9],
+        panel_desc=row[10],
+        cnc_face_holes=row[11],
+        cnc_side_holes=row[12],
+    )
+
+
+def load_cut_list(csv_file):
+    """Read, validate and parse cut_list.csv once.
+
+    Returns a dict with 'rows', the CutListRow of every line in file order, and
+    'by_material', the rows of every (material code, thickness) pair in the
+    order the pairs first appear.
+    """
+    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+
+        # Read header row
+        header_row = next(reader)
+        verify_header(header_row, CSV_HEADER)
+        rows = [parse_cut_list_row(row) for row in reader]
+
+    by_material = {}
+    for row in rows:
+        by_material.setdefault((row.material_code, row.thickness), []).append(row)
+    return {'rows': rows, 'by_material': by_material}
@@ -0,0 +1,370 @@
+"""
+Evaluates the cut list of model.scad for many parameter variants at once and
+reports the material totals of every variant.
+
+The rows of the generate_cut_list module are taken from model.scad itself: every
+`echo(str("CSV: ...", expression, ...))` statement is split into its CSV fields,
+which are either literal text or an OpenSCAD expression (see scad_params.py).
+The expressions, and the top-level assignments they depend on, are evaluated
+with NumPy over arrays holding one value per variant, so a grid of tens of
+thousands of variants takes about as long as a single one. Counts are
+expressions like the dimensions (the drawer counts follow number_of_drawers);
+edge banding flags are literals, the same for every variant.
+
+Per variant and material (material code and thickness) the sweep reports the
+number of parts, their total area and the total length of the banded edges.
+The result is written as a CSV file with one row per variant and material, or
+as a NumPy .npz file with one array per column.
+
+Usage:
+    python cut_list_sweep.py [<model.scad>] --param <name>=<values> [--param ...] [--output <sweep.csv|sweep.npz>] [--check [<cut_list.csv>]]
+
+Arguments:
+    --param: Parameter to sweep; values are a comma separated list (18,19) or an
+             inclusive range start:stop:step (2100:2400:10). All combinations are evaluated.
+    --output: Result file (default: artifacts/sweep.csv); the extension selects CSV or .npz.
+    --check: Compare the totals for the unchanged parameters with the cut list evaluated
+             by scad_params.py, or with the given cut list CSV (as written by generate-csv.ps1).
+
+Example:
+    python cut_list_sweep.py --param corpus_height=2100:2400:10 --param corpus_width=500:800:10 --param melanine_thickness_main=18,19 --param melanine_thickness_secondary=10,12 --output artifacts/sweep.csv
+    python cut_list_sweep.py --check export/H2300xW600xD230_Mm18_Ms10/cut_list.csv
+"""
+import argparse
+import csv
+import math
+import os
+import time
+
+import numpy as np
+
+import scad_params
+
+DEFAULT_OUTPUT_FILE = "artifacts/sweep.csv"
+
+# Unit conversions of the totals
+MM2_PER_M2 = 1e6
+MM_PER_M = 1e3
+
+# Number format of the CSV result
+CSV_NUMBER_FORMAT = "%.10g"
+
+# Relative tolerance of --check; cut list values are printed with 6 significant digits
+CHECK_TOLERANCE = 1e-5
+
+# Cut list columns used for the totals, as echoed in the header of generate_cut_list
+MATERIAL_COLUMN = "material code"
+THICKNESS_COLUMN = "material thickness"
+DIMENSION_A_COLUMN = "dimension A (along wood grain)"
+DIMENSION_B_COLUMN = "dimension B"
+COUNT_COLUMN = "count"
+# Banded edges along dimension A and along dimension B
+EDGE_A_COLUMNS = ["edge banding A-1", "edge banding A-2"]
+EDGE_B_COLUMNS = ["edge banding B-1", "edge banding B-2"]
+
+RESULT_COLUMNS = ["material", "thickness", "parts", "area_m2", "edge_banding_m"]
+
+VECTOR_FUNCTIONS = {
+    'abs': np.abs,
+    'floor': np.floor,
+    'ceil': np.ceil,
+    'sqrt': np.sqrt,
+    'min': np.minimum,
+    'max': np.maximum,
+    'pow': np.power,
+    # OpenSCAD rounds halves away from zero
+    'round': lambda x: np.copysign(np.floor(np.abs(x) + 0.5), x),
+}
+
+VECTOR_OPERATORS = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.divide,
+    '%': np.fmod,
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    '&&': np.logical_and,
+    '||': np.logical_or,
+}
+
+
+class VectorScope:
+    """Resolves the variables of a model as NumPy arrays, one element per variant.
+
+    Swept parameters are given as arrays; every other variable is evaluated
+    from its assignment on first use. Only numeric and boolean expressions are
+    supported.
+    """
+
+    def __init__(self, model, parameters):
+        self.model = model
+        self.values = dict(parameters)
+        self.resolving = set()
+
+    def get(self, name):
+        if name not in self.values:
+            if name not in self.model['assignments']:
+                raise ValueError(f"Variable {name} is not assigned at the top level")
+            if name in self.resolving:
+                raise ValueError(f"Variable {name} depends on itself")
+            self.resolving.add(name)
+            self.values[name] = self.evaluate(self.model['assignments'][name], {})
+            self.resolving.discard(name)
+        return self.values[name]
+
+    def evaluate(self, node, local):
+        kind = node[0]
+        if kind == 'literal':
+            if isinstance(node[1], str) or isinstance(node[1], list) or node[1] is None:
+                raise ValueError(f"Only numeric expressions can be swept, found {node[1]!r}")
+            return np.float64(node[1])
+        if kind == 'name':
+            return local[node[1]] if node[1] in local else self.get(node[1])
+        if kind == '?':
+            return np.where(self.evaluate(node[1], local) != 0, self.evaluate(node[2], local), self.evaluate(node[3], local))
+        if kind == 'unary':
+            value = self.evaluate(node[2], local)
+            return np.logical_not(value) if node[1] == "!" else np.negative(value) if node[1] == "-" else value
+        if kind == 'binary':
+            return VECTOR_OPERATORS[node[1]](self.evaluate(node[2], local), self.evaluate(node[3], local))
+        if kind == 'call':
+            return self.call(node, local)
+        raise ValueError(f"'{kind}' expressions cannot be swept")
+
+    def call(self, node, local):
+        name = node[1][1] if node[1][0] == 'name' else None
+        values = [self.evaluate(expression, local) for argument_name, expression in node[2] if argument_name is None]
+        if len(values) != len(node[2]):
+            raise ValueError(f"Named arguments cannot be swept in {name}()")
+        if name in self.model['functions']:
+            function = self.model['functions'][name]
+            scope = {parameter: self.evaluate(default, local) for parameter, default in function.parameters if default is not None}
+            scope.update(zip((parameter for parameter, _ in function.parameters), values))
+            return self.evaluate(function.body, scope)
+        if name in VECTOR_FUNCTIONS:
+            return VECTOR_FUNCTIONS[name](*values)
+        raise ValueError(f"Function {name}() cannot be swept")
+
+
+def split_echo_fields(arguments):
+    """Split the arguments of a "CSV: ..." echo into its CSV fields.
+
+    Returns a list of fields, each either a literal string or an expression node,
+    or None if the echo is not a cut list line.
+    """
+    if len(arguments) == 1 and arguments[0][0] == 'call' and arguments[0][1] == ('name', 'str'):
+        parts = [expression for _, expression in arguments[0][2]]
+    else:
+        parts = arguments
+    if not parts or parts[0][0] != 'literal' or not str(parts[0][1]).startswith(scad_params.CUT_LIST_PREFIX):
+        return None
+
+    fields = [[]]
+    for index, part in enumerate(parts):
+        if part[0] == 'literal' and isinstance(part[1], str):
+            text = part[1][len(scad_params.CUT_LIST_PREFIX):] if index == 0 else part[1]
+            pieces = text.split(",")
+            fields[-1].append(pieces[0])
+            fields.extend([piece] for piece in pieces[1:])
+        else:
+            fields[-1].append(part)
+
+    result = []
+    for field in fields:
+        expressions = [part for part in field if not isinstance(part, str)]
+        if not expressions:
+            result.append("".join(field))
+        elif len(expressions) == 1 and all(part == "" for part in field if isinstance(part, str)):
+            result.append(expressions[0])
+        else:
+            raise ValueError(f"Cut list field mixes text and expressions: {field}")
+    return result
+
+
+def cut_list_formulas(model):
+    """The header and the rows of the cut list, with expression nodes for the computed fields."""
+    lines = [fields for fields in map(split_echo_fields, scad_params.module_echo_arguments(model, scad_params.CUT_LIST_MODULE)) if fields is not None]
+    if not lines or not all(isinstance(field, str) for field in lines[0]):
+        raise ValueError(f"The {scad_params.CUT_LIST_MODULE} module does not start with a CSV header echo")
+    header = lines[0]
+    for row in lines[1:]:
+        if len(row) != len(header):
+            raise ValueError(f"Cut list row has {len(row)} fields, the header {len(header)}: {row}")
+    return header, [dict(zip(header, row)) for row in lines[1:]]
+
+
+def parse_sweep_values(text):
+    """Parse "18,19" or the inclusive range "2100:2400:10" into an array."""
+    if ":" in text:
+        start, stop, step = (float(value) for value in text.split(":"))
+        if step <= 0 or stop < start:
+            raise ValueError(f"Invalid range {text!r}, expected start:stop:step with step > 0")
+        # Include stop when the range lands on it, despite floating point steps
+        return start + step * np.arange(math.floor((stop - start) / step + 1e-9) + 1)
+    return np.array([float(value) for value in text.split(",")])
+
+
+def variant_grid(sweeps):
+    """All combinations of the swept values as flat arrays of equal length, keyed by parameter."""
+    if not sweeps:
+        return {}, 1
+    grids = np.meshgrid(*sweeps.values(), indexing='ij')
+    return {name: grid.ravel() for name, grid in zip(sweeps, grids)}, grids[0].size
+
+
+def sweep_cut_list(model, sweeps):
+    """Evaluate the cut list totals for every combination of the swept values.
+
+    sweeps maps parameter names to arrays of values. Returns the parameter
+    columns of the variants and a dict per (material, thickness expression)
+    group with the 'thickness', 'parts', 'area_m2' and 'edge_banding_m' arrays.
+    """
+    for name in sweeps:
+        if name not in model['assignments']:
+            raise ValueError(f"Unknown parameter {name}: it is not assigned at the top level of the model")
+    parameters, variant_count = variant_grid(sweeps)
+    scope = VectorScope(model, parameters)
+    _, rows = cut_list_formulas(model)
+
+    def column(value):
+        array = np.float64(value) if isinstance(value, str) else scope.evaluate(value, {})
+        return np.broadcast_to(np.asarray(array, dtype=float), (variant_count,))
+
+    groups = {}
+    for row in rows:
+        material = row[MATERIAL_COLUMN]
+        if not isinstance(material, str):
+            raise ValueError("The material code must be a literal to group the totals")
+        key = (material, repr(row[THICKNESS_COLUMN]))
+        if key not in groups:
+            zeros = np.zeros(variant_count)
+            groups[key] = {'material': material, 'thickness': column(row[THICKNESS_COLUMN]),
+                           'parts': zeros.copy(), 'area_m2': zeros.copy(), 'edge_banding_m': zeros.copy()}
+        totals = groups[key]
+        count = column(row[COUNT_COLUMN])
+        dimension_a = column(row[DIMENSION_A_COLUMN])
+        dimension_b = column(row[DIMENSION_B_COLUMN])
+        banded_a = sum((column(row[edge]) != 0).astype(float) for edge in EDGE_A_COLUMNS)
+        banded_b = sum((column(row[edge]) != 0).astype(float) for edge in EDGE_B_COLUMNS)
+        totals['parts'] += count
+        totals['area_m2'] += count * dimension_a * dimension_b / MM2_PER_M2
+        totals['edge_banding_m'] += count * (banded_a * dimension_a + banded_b * dimension_b) / MM_PER_M
+    return parameters, variant_count, list(groups.values())
+
+
+def material_totals(rows):
+    """Totals per (material, thickness) of a cut list given as dicts of CSV strings."""
+    totals = {}
+    for row in rows:
+        key = (row[MATERIAL_COLUMN], float(row[THICKNESS_COLUMN]))
+        count = float(row[COUNT_COLUMN])
+        dimension_a = float(row[DIMENSION_A_COLUMN])
+        dimension_b = float(row[DIMENSION_B_COLUMN])
+        banded_a = sum(float(row[edge]) != 0 for edge in EDGE_A_COLUMNS)
+        banded_b = sum(float(row[edge]) != 0 for edge in EDGE_B_COLUMNS)
+        total = totals.setdefault(key, {'parts': 0.0, 'area_m2': 0.0, 'edge_banding_m': 0.0})
+        total['parts'] += count
+        total['area_m2'] += count * dimension_a * dimension_b / MM2_PER_M2
+        total['edge_banding_m'] += count * (banded_a * dimension_a + banded_b * dimension_b) / MM_PER_M
+    return totals
+
+
+def check_totals(model, csv_file=None):
+    """Compare the sweep totals for the model's own parameters with a cut list.
+
+    The reference is csv_file, or the cut list evaluated by scad_params.py.
+    Returns a list of mismatch messages, empty if everything matches.
+    """
+    if csv_file:
+        with open(csv_file, 'r', newline='', encoding='utf-8-sig') as f:
+            reference = material_totals(csv.DictReader(f))
+    else:
+        header, *rows = scad_params.cut_list_rows(model)
+        reference = material_totals(dict(zip(header, row)) for row in rows)
+    _, _, groups = sweep_cut_list(model, {})
+    swept = {(group['material'], float(group['thickness'][0])): group for group in groups}
+
+    mismatches = []
+    for key in sorted(set(reference) | set(swept)):
+        if key not in reference or key not in swept:
+            mismatches.append(f"{key[0]} {key[1]:g} mm: only in the {'sweep' if key in swept else 'cut list'}")
+            continue
+        for name in ('parts', 'area_m2', 'edge_banding_m'):
+            expected = reference[key][name]
+            found = float(swept[key][name][0])
+            if not math.isclose(expected, found, rel_tol=CHECK_TOLERANCE):
+                mismatches.append(f"{key[0]} {key[1]:g} mm {name}: cut list {expected:g}, sweep {found:g}")
+    return mismatches
+
+
+def result_columns(parameters, variant_count, groups):
+    """Long-format result columns: one entry per variant and material group."""
+    variant = np.arange(variant_count)
+    columns = {'variant': np.tile(variant, len(groups))}
+    for name, values in parameters.items():
+        columns[name] = np.tile(values, len(groups))
+    columns['material'] = np.repeat([group['material'] for group in groups], variant_count)
+    for name in RESULT_COLUMNS[1:]:
+        columns[name] = np.concatenate([group[name] for group in groups])
+    return columns
+
+
+def write_result(columns, output_file):
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if output_file.lower().endswith(".npz"):
+        np.savez(output_file, **columns)
+        return
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(columns))
+        formatted = [
+            values.tolist() if values.dtype.kind in 'iU' else [CSV_NUMBER_FORMAT % value for value in values.tolist()]
+            for values in columns.values()
+        ]
+        writer.writerows(zip(*formatted))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate the cut list material totals of many model.scad variants at once.')
+    parser.add_argument('model_file', nargs='?', default=scad_params.DEFAULT_MODEL_FILE, help=f'OpenSCAD file (default: {scad_params.DEFAULT_MODEL_FILE}).')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUES', help='Parameter to sweep: a list (18,19) or an inclusive range (2100:2400:10).')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE, help=f'Result file, .csv or .npz (default: {DEFAULT_OUTPUT_FILE}).')
+    parser.add_argument('--check', nargs='?', const='', metavar='CUT_LIST_CSV', help='Check the totals of the unchanged model against scad_params.py or the given cut list CSV.')
+    args = parser.parse_args()
+
+    model = scad_params.load_model(args.model_file)
+
+    if args.check is not None:
+        mismatches = check_totals(model, args.check or None)
+        for message in mismatches:
+            print(f"Mismatch: {message}")
+        if mismatches:
+            exit(1)
+        print(f"Sweep totals match the cut list of {args.check or args.model_file}")
+        if not args.param:
+            return
+
+    sweeps = {}
+    for param in args.param:
+        name, separator, values = param.partition("=")
+        if not separator:
+            parser.error(f"--param {param!r}: expected name=values")
+        sweeps[name.strip()] = parse_sweep_values(values)
+
+    start = time.perf_counter()
+    parameters, variant_count, groups = sweep_cut_list(model, sweeps)
+    elapsed = time.perf_counter() - start
+    columns = result_columns(parameters, variant_count, groups)
+    write_result(columns, args.output)
+    print(f"Evaluated {variant_count} variants x {len(groups)} materials in {elapsed * 1000:.1f} ms; written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
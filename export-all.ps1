@@ -3,7 +3,8 @@
 # This script automates the export of all panels from the model.scad file
 # to the export/$modelIdentifier directory for all supported export types.
 # It orchestrates the execution of several other scripts:
-# - export-panels.ps1: Exports panels to various formats (STL, DXF, SVG).
+# - export_panels.py: Exports panels to various formats (STL, DXF, SVG) with parallel OpenSCAD jobs.
+# - export-panels.ps1: Exports panels to various formats one after the other.
 # - convert-dxf-to-dwg.ps1: Converts DXF files to DWG format.
 # - convert-dxf-to-pdf.ps1: Converts DXF files to PDF format.
 # - generate-csv.ps1: Generates a CSV file with panel information.
@@ -26,6 +27,7 @@ Import-Module (Join-Path $scriptDir "ps-modules/CommonFunctions.psm1") -Force
 $modelFile = Join-Path $scriptDir "model.scad"
 # Please set the path to your OpenSCAD executable here.
 $openscadPath = "openscad"
+$pythonPath = "python"
 $logFile = Join-Path $scriptDir "artifacts/openscad-console.log"
 
 if ($exportDir -eq "export/default") {
@@ -37,13 +39,15 @@ Assert-DirectoryExists -Path $exportDir
 
 Write-Output "Exporting all panels to STL, DXF and SVG to export/$modelIdentifier directory..."
 
-# Export to STL
-#.\export-panels.ps1 -exportDir $exportDir -exportType stl
-
-# Export to DXF
-.\export-panels.ps1 -exportDir $exportDir -exportType dxf
+# Export to DXF, one OpenSCAD job per panel and CPU (add stl and svg to --type for the other formats)
+# python export_panels.py --type dxf --export-dir "export/H2300xW600xD230_Mm18_Ms12" --openscad openscad
+& $pythonPath (Join-Path $scriptDir "export_panels.py") --type dxf --export-dir "$exportDir" --openscad "$openscadPath" --model "$modelFile" 2>&1
+if ($LASTEXITCODE -ne 0) {
+    Write-Error "Failed to export the panels. export_panels.py exited with $LASTEXITCODE status."
+    exit 1
+}
 
-# Export to SVG
-#.\export-panels.ps1 -exportDir $exportDir -exportType svg
+# Serial export, one panel after the other
+#.\export-panels.ps1 -exportDir $exportDir -exportType dxf
 
 Write-Output "All panels exported successfully to export/$modelIdentifier directory."
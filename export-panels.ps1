@@ -4,13 +4,15 @@
 # to the export/$modelIdentifier directory for a specified export type (DXF, STL, or SVG).
 # It iterates through a list of panel names obtained from the OpenSCAD model,
 # and for each panel, it executes OpenSCAD to generate the corresponding
-# output file. For DXF exports, it also attempts to extract hole metadata
-# from OpenSCAD's console output and save it as a separate CSV file.
+# output file. For DXF exports, it also ingests the hole metadata from
+# OpenSCAD's console output into the hole database (hole_db.py) and writes it
+# as a separate CSV file per panel.
 #
 # Output file formats:
 # - DXF: AutoCAD Drawing Exchange Format. Contains 2D geometry of panels,
 #        including cut lines and drill holes. For DXF exports, a companion
-#        CSV file is generated containing detailed metadata for each hole.
+#        CSV file is generated containing detailed metadata for each hole,
+#        and the holes are stored in $exportDir/holes.sqlite.
 # - STL: Stereolithography (Standard Tessellation Language). Represents 3D
 #        surfaces as a collection of triangular facets. Used for 3D printing
 #        or viewing 3D models.
@@ -42,6 +44,9 @@ Test-ExportDirectory -ExportDir $exportDir
 $modelFile = Join-Path $scriptDir "model.scad"
 # Please set the path to your OpenSCAD executable here.
 $openscadPath = "openscad"
+$pythonPath = "python"
+$holeDbScript = Join-Path $scriptDir "hole_db.py"
+$holeDb = Join-Path $exportDir "holes.sqlite"
 $logFile = Join-Path $exportDir "log/openscad-console.log"
  
 # --- Script ---
@@ -89,18 +94,14 @@ foreach ($panelName in $panelNames) {
 
     # Check the exit code of the last command
     if ($LASTEXITCODE -eq 0) {
-        # --- Create Hole Metadata CSV ---
-        $holeMetadata = Get-Content $logFile | Where-Object { $_.StartsWith('ECHO: "Hole,') } | ForEach-Object { $_.Substring(6).Trim('"') }
-        if ($holeMetadata.Count -gt 0) {
-            $csvFile = Join-Path $exportTypeDir "$safePanelName.csv"
-            $csvContent = @("PanelName,HoleName,X,Y,Z,Diameter,Depth,Nx,Ny,Nz")
-            $holeMetadata | ForEach-Object {
-                $line = $_ -replace 'Hole,', ''
-                $csvContent += $line
+        # --- Store Hole Metadata and Create the Panel CSV ---
+        if ($exportType -eq "dxf") {
+            # python hole_db.py ingest "export/.../log/openscad-console.log" --db "export/.../holes.sqlite" --csv-dir "export/.../dxf-raw"
+            & $pythonPath $holeDbScript ingest "$logFile" --db "$holeDb" --csv-dir "$exportTypeDir" 2>&1
+            if ($LASTEXITCODE -ne 0) {
+                Write-Error "Failed to ingest the hole metadata of '$panelName'. hole_db.py exited with $LASTEXITCODE status."
+                exit 1
             }
-            $relativeCsvFile = Get-RelativePath -Base $exportDir -TargetPath $csvFile
-            $csvContent | Out-File -FilePath $csvFile -Encoding utf8
-            Write-Output "  -> Created hole metadata file: $relativeCsvFile"
         }
     } else {
         Write-Output "FAILED with exit code $LASTEXITCODE"
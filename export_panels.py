@@ -0,0 +1,215 @@
+"""
+Exports the panels of model.scad with OpenSCAD in a pool of parallel jobs.
+
+export-panels.ps1 renders one panel after the other and every render writes the
+same console log. This driver runs one OpenSCAD process per panel and export
+type, as many at a time as there are CPUs (--jobs), so a full multi-format
+export scales with the cores:
+
+    openscad -o <export_dir>/dxf-raw/<panel>.dxf -D export_panel_name="<panel>" -D export_type="dxf" model.scad
+
+Every job writes its console output to its own log, <export_dir>/log/<type>/<panel>.log.
+OpenSCAD writes to a temporary file in the output directory that is renamed to
+the final name once the job has succeeded, so an interrupted or failed export
+never leaves a partial DXF, STL or SVG behind. For DXF exports the hole metadata
+echoed into the job's log is stored in <export_dir>/holes.sqlite and written as
+<panel>.csv next to the DXF (see hole_db.py).
+
+The panel names and the model identifier (which names the default export
+directory) are evaluated with scad_params.py, with the same -D overrides that
+are passed on to OpenSCAD. The first failing job stops the export: jobs that
+have not started yet are cancelled and the log of the failed job is printed.
+
+--openscad selects the OpenSCAD binary; a path ending in .py is run with the
+current Python interpreter, which lets test/openscad_stub.py stand in for
+OpenSCAD when trying the pipeline without it.
+
+Usage:
+    python export_panels.py [--type dxf stl svg] [--export-dir <dir>] [--panel <name> ...] [--jobs N]
+                            [--openscad <path>] [--model <model.scad>] [-D name=value ...]
+
+Example:
+    python export_panels.py --type dxf
+    python export_panels.py --type dxf stl svg --jobs 8 --export-dir export/H2300xW600xD230_Mm18_Ms12
+    python export_panels.py --openscad test/openscad_stub.py --export-dir build/export-stub
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import closing
+
+import hole_db
+import scad_params
+
+# Please set the path to your OpenSCAD executable here (or pass --openscad)
+DEFAULT_OPENSCAD = "openscad"
+
+EXPORT_TYPES = ["dxf", "stl", "svg"]
+
+# DXF files go to dxf-raw, for split_layers.py; the other types to a directory named after the type
+RAW_DXF_DIR = "dxf-raw"
+LOG_DIR = "log"
+HOLE_DB_FILE = "holes.sqlite"
+
+# Characters not allowed in file names, as sanitized by export-panels.ps1
+UNSAFE_FILE_NAME_CHARACTERS = re.compile(r'[\\/:"*?<>|]')
+
+# Lines of a failed job's log printed with the error
+FAILED_LOG_TAIL_LINES = 20
+
+
+def safe_file_name(panel_name):
+    return UNSAFE_FILE_NAME_CHARACTERS.sub("_", panel_name)
+
+
+def program_command(program):
+    """The command that starts a program; Python stand-ins (*.py) are run with this interpreter."""
+    if program.endswith(".py"):
+        return [sys.executable, program]
+    return [program]
+
+
+def openscad_export_command(openscad, model_file, overrides, panel_name, export_type, output_file):
+    """The OpenSCAD command line that exports one panel to output_file."""
+    command = program_command(openscad) + ["-o", output_file]
+    for override in overrides:
+        command += ["-D", override]
+    return command + ["-D", f'export_panel_name="{panel_name}"', "-D", f'export_type="{export_type}"', model_file]
+
+
+def export_jobs(panel_names, export_types, export_dir):
+    """One job per export type and panel, with its output and log file."""
+    jobs = []
+    for export_type in export_types:
+        output_dir = os.path.join(export_dir, RAW_DXF_DIR if export_type == "dxf" else export_type)
+        for panel_name in panel_names:
+            file_name = safe_file_name(panel_name)
+            jobs.append({
+                'panel_name': panel_name,
+                'export_type': export_type,
+                'output_file': os.path.join(output_dir, f"{file_name}.{export_type}"),
+                'log_file': os.path.join(export_dir, LOG_DIR, export_type, f"{file_name}.log"),
+            })
+    return jobs
+
+
+def run_export_job(job, openscad, model_file, overrides):
+    """Render one panel with OpenSCAD and move its output into place.
+
+    Returns the elapsed wall time; raises RuntimeError if OpenSCAD fails or
+    writes no output.
+    """
+    output_dir = os.path.dirname(job['output_file'])
+    # OpenSCAD picks the export format from the file extension, so the temporary file keeps it.
+    # The name is unique per process and thread; it is created with open() rather than
+    # tempfile.mkstemp() so the export gets the default (umask) permissions, not 0600
+    partial_file = os.path.join(output_dir, f".{os.path.basename(job['output_file'])}.{os.getpid()}.{threading.get_ident()}.partial.{job['export_type']}")
+    open(partial_file, 'x').close()
+    command = openscad_export_command(openscad, model_file, overrides, job['panel_name'], job['export_type'], partial_file)
+
+    start = time.perf_counter()
+    try:
+        with open(job['log_file'], 'w', encoding='utf-8') as log:
+            # OpenSCAD writes its ECHO lines to stderr
+            returncode = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL).returncode
+        if returncode != 0:
+            raise RuntimeError(f"OpenSCAD failed to export '{job['panel_name']}' ({job['export_type']}) with exit code {returncode}, see {job['log_file']}")
+        if os.path.getsize(partial_file) == 0:
+            raise RuntimeError(f"OpenSCAD wrote no {job['export_type']} output for '{job['panel_name']}', see {job['log_file']}")
+        os.replace(partial_file, job['output_file'])
+    finally:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+    return time.perf_counter() - start
+
+
+def log_tail(log_file, lines=FAILED_LOG_TAIL_LINES):
+    with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+        return f.readlines()[-lines:]
+
+
+def export_panels(panel_names, export_types, export_dir, model_id, openscad=DEFAULT_OPENSCAD, model_file=scad_params.DEFAULT_MODEL_FILE,
+                  overrides=(), jobs=None):
+    """Export every panel in every export type with up to jobs OpenSCAD processes at a time.
+
+    The holes of every DXF job are stored under model_id in the hole database
+    of export_dir as the jobs finish. Returns the (job, elapsed) timings and the
+    wall time of the whole export.
+    """
+    job_list = export_jobs(panel_names, export_types, export_dir)
+    for job in job_list:
+        os.makedirs(os.path.dirname(job['output_file']), exist_ok=True)
+        os.makedirs(os.path.dirname(job['log_file']), exist_ok=True)
+
+    timings = []
+    batch_start = time.perf_counter()
+    # The jobs wait on OpenSCAD processes, so threads are enough to keep them running in parallel
+    with closing(hole_db.connect(os.path.join(export_dir, HOLE_DB_FILE))) as connection, \
+            ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        pending = {executor.submit(run_export_job, job, openscad, model_file, overrides): job for job in job_list}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = pending.pop(future)
+                if future.exception() is not None:
+                    for waiting in pending:
+                        waiting.cancel()
+                    print(f"FAILED: {job['export_type']} {job['panel_name']}", file=sys.stderr)
+                    if os.path.exists(job['log_file']):
+                        for line in log_tail(job['log_file']):
+                            print(f"  {line}", end="", file=sys.stderr)
+                    raise future.exception()
+                elapsed = future.result()
+                timings.append((job, elapsed))
+                print(f"[{len(timings)}/{len(job_list)}] {elapsed:7.2f}s  {job['export_type']}  {job['panel_name']} -> {job['output_file']}")
+                # The database has one writer: the holes are stored here, not in the jobs
+                if job['export_type'] == "dxf":
+                    _, panels = hole_db.ingest(connection, job['log_file'], model_id, job['panel_name'])
+                    for panel_name in panels:
+                        print(f"  -> Created hole metadata file: {hole_db.write_panel_csv(connection, model_id, panel_name, os.path.dirname(job['output_file']))}")
+    return timings, time.perf_counter() - batch_start
+
+
+def print_timing_summary(timings, batch_elapsed):
+    print("--- Export Timing Summary ---")
+    for job, elapsed in sorted(timings, key=lambda timing: timing[1], reverse=True):
+        print(f"{elapsed:8.2f}s  {job['export_type']:3s}  {job['panel_name']}")
+    total = sum(elapsed for _, elapsed in timings)
+    print(f"Total: {len(timings)} exports, {total:.2f}s summed, {batch_elapsed:.2f}s wall")
+    print("-----------------------------")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the panels of model.scad with parallel OpenSCAD jobs.')
+    parser.add_argument('--type', nargs='+', choices=EXPORT_TYPES, default=["dxf"], help='Export types (default: dxf).')
+    parser.add_argument('--export-dir', help='Export directory (default: export/<model identifier>).')
+    parser.add_argument('--panel', nargs='+', help='Panels to export (default: all panel_names of the model).')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of parallel OpenSCAD processes (default: number of CPUs).')
+    parser.add_argument('--openscad', default=DEFAULT_OPENSCAD, help=f'OpenSCAD executable, or a Python stand-in script (default: {DEFAULT_OPENSCAD}).')
+    parser.add_argument('--model', default=scad_params.DEFAULT_MODEL_FILE, help=f'OpenSCAD model (default: {scad_params.DEFAULT_MODEL_FILE}).')
+    parser.add_argument('-D', dest='overrides', action='append', default=[], metavar='NAME=VALUE', help='Override a top-level variable, passed on to OpenSCAD.')
+    args = parser.parse_args()
+
+    variables = scad_params.load_model(args.model, args.overrides)['variables']
+    model_id = variables['model_identifier']
+    panel_names = args.panel or variables['panel_names']
+    unknown = [name for name in panel_names if name not in variables['panel_names']]
+    if unknown:
+        parser.error(f"Unknown panels: {', '.join(unknown)}. Expected some of {json.dumps(variables['panel_names'])}")
+    export_dir = args.export_dir or os.path.join("export", model_id)
+
+    print(f"Exporting {len(panel_names)} panels of {model_id} as {', '.join(args.type)} to '{export_dir}'")
+    # Let all exceptions propagate - fail early and clearly
+    timings, batch_elapsed = export_panels(panel_names, args.type, export_dir, model_id, openscad=args.openscad, model_file=args.model,
+                                           overrides=args.overrides, jobs=args.jobs)
+    print_timing_summary(timings, batch_elapsed)
+
+
+if __name__ == "__main__":
+    main()
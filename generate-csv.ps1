@@ -7,12 +7,19 @@
 # e.g.
 # .\generate-csv.ps1 -exportDir export\H2300xW600xD230_Mm19_Ms12
 #
+# By default the cut list is evaluated from the model parameters by scad_params.py,
+# which takes milliseconds; -Render runs OpenSCAD and parses its console output.
+#
+# python scad_params.py model.scad --cut-list export/H2300xW600xD230_Mm18_Ms10/cut_list.csv
 # "C:\Program Files\OpenSCAD\openscad.exe" -o "artifacts/model.png" --imgsize=1920,1080 -D generate_cut_list_csv=true  model.scad
 # openscad -o "artifacts/dummy.png" --imgsize=1,1 -D generate_model_identifier=true  model.scad
 
 param(
     [Parameter(Mandatory = $false)]
-    [string]$exportDir = "export/default"
+    [string]$exportDir = "export/default",
+
+    [Parameter(Mandatory = $false)]
+    [switch]$Render
 )
 
 # Exit immediately if a command exits with a non-zero status.
@@ -27,6 +34,7 @@ $modelFile = Join-Path $scriptDir "model.scad"
 
 # $openscadPath = 'C:\Program Files\OpenSCAD\openscad.exe'
 $openscadPath = 'openscad'
+$pythonPath = 'python'
 $outputCsv = "cut_list.csv"
 $modelPath = "model.scad"
 
@@ -43,7 +51,7 @@ if (!(Test-Path $modelPath)) {
 
 if ($exportDir -eq "export/default") {
     $logFile = "artifacts\openscad-console.log"
-    $modelIdentifier = Get-ModelIdentifier -openscadPath $openscadPath -modelFile $modelFile -logFile $logFile
+    $modelIdentifier = Get-ModelIdentifier -openscadPath $openscadPath -pythonPath $pythonPath -modelFile $modelFile -logFile $logFile -Render:$Render
     $exportDir = Join-Path $scriptDir "export/$modelIdentifier"
 }
 Write-Output "Export directory: $exportDir"
@@ -57,6 +65,15 @@ Initialize-LogFile -logFile $logFile
 # Execute OpenSCAD and save all output to temp file first
 # $tempFile = [System.IO.Path]::GetTempFileName()
 $outputCsvPath = Join-Path $exportDir $outputCsv
+if (-not $Render) {
+    Write-Output "Generating cut list..."
+    & $pythonPath (Join-Path $scriptDir "scad_params.py") $modelPath --cut-list $outputCsvPath 2>&1 | Tee-Object -FilePath $logFile
+    if ($LASTEXITCODE -ne 0) {
+        Write-Error "Failed to evaluate the cut list (run with -Render to use OpenSCAD). scad_params.py exited with $LASTEXITCODE status."
+        exit 1
+    }
+    exit 0
+}
 try {
     Write-Output "Generating cut list..."
     & $openscadPath -o "artifacts/dummy.png" --imgsize="1,1" -D generate_cut_list_csv=true $modelPath 2>&1 | Out-File -FilePath $logFile -Encoding utf8
@@ -0,0 +1,305 @@
+"""
+Ingests OpenSCAD console logs into an indexed SQLite hole database.
+
+export-panels.ps1 runs OpenSCAD once per panel and overwrites the same console
+log every time. This script reads such a log in a single streaming pass and
+keeps what the pipeline needs from it:
+
+    ECHO: "DEFINITIONS: ..., export_panel_name=CorpusSideLeft, ..."   exported panel
+    ECHO: "model_identifier=H2300xW600xD230_Mm18_Ms12"      model ID
+    ECHO: "model_info={corpus_height:2300, ...}"             model ID when no identifier was echoed
+    ECHO: "Hole,CorpusSideLeft,confirmat_bottom_1,9.5,..."   hole of the exported panel
+    ECHO: "CSV: MEL-19,18,2300,230,1,..."                     cut list row (first CSV: line is the header)
+
+Every hole and cut list row is stored under its model ID, so the holes of all
+panels and of several models live in one file. Ingesting a panel again replaces
+its holes, also when the panel has no holes anymore; a new cut list replaces the
+cut list of the model. The holes are
+indexed by panel, diameter and face ("face" for holes drilled into the panel
+face, "edge" for holes drilled into an edge).
+
+The views panel_holes_csv and cut_list_csv return the rows with the columns of
+the per-panel hole CSV files and of cut_list.csv. The csv command, or --csv-dir
+of ingest, writes the per-panel hole CSVs split_layers.py reads next to the raw
+DXFs; split_layers.py --hole-db reads the holes from the database directly.
+
+Usage:
+    python hole_db.py ingest <console.log> [<console.log> ...] --db <holes.sqlite> [--model-id <id>] [--csv-dir <dir>]
+    python hole_db.py csv --db <holes.sqlite> --model-id <id> --output-dir <dir> [--panel <name> ...]
+
+Example:
+    python hole_db.py ingest "export/H2300xW600xD230_Mm18_Ms12/log/openscad-console.log" --db "export/H2300xW600xD230_Mm18_Ms12/holes.sqlite" --csv-dir "export/H2300xW600xD230_Mm18_Ms12/dxf-raw"
+    python hole_db.py csv --db "export/H2300xW600xD230_Mm18_Ms12/holes.sqlite" --model-id H2300xW600xD230_Mm18_Ms12 --output-dir "export/H2300xW600xD230_Mm18_Ms12/dxf-raw"
+"""
+import argparse
+import csv
+import os
+import re
+import sqlite3
+
+from cut_list import CSV_HEADER, CutListRow, parse_cut_list_row, verify_header
+from scad_params import format_number
+
+# Console lines written by echo(); the text is quoted with \" and \\ escaped
+ECHO_PREFIX = 'ECHO: "'
+ECHO_ESCAPE = re.compile(r'\\(.)')
+
+# Echoed tags, see echo_hole_metadata(), generate_cut_list() and the main section of model.scad
+HOLE_TAG = "Hole,"
+CSV_TAG = "CSV: "
+MODEL_IDENTIFIER_TAG = "model_identifier="
+MODEL_INFO_TAG = "model_info="
+DEFINITIONS_TAG = "DEFINITIONS: "
+
+# export_panel_name in the DEFINITIONS echo, up to the next ", name=" (panel name lists contain ", " too)
+EXPORT_PANEL_NAME = re.compile(r"(?:^|, )export_panel_name=(.*?)(?=, \w+=|$)")
+
+# model_identifier in model.scad, rebuilt from the model_info echo
+MODEL_IDENTIFIER_FORMAT = "H{corpus_height}xW{corpus_width}xD{corpus_depth}_Mm{melanine_thickness_main}_Ms{melanine_thickness_secondary}"
+MODEL_INFO_FIELD = re.compile(r"(\w+):([^,\[\]{}]+)")
+
+# Columns of a Hole echo after the tag, and the header of the per-panel hole CSV
+HOLE_FIELDS = ["panel_name", "hole_name", "x", "y", "z", "diameter", "depth", "nx", "ny", "nz"]
+HOLE_CSV_HEADER = ["PanelName", "HoleName", "X", "Y", "Z", "Diameter", "Depth", "Nx", "Ny", "Nz"]
+
+# A hole is drilled into the face when it points along Z and starts on the face (z == 0)
+FACE_HOLE = "face"
+EDGE_HOLE = "edge"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS models (
+    model_id TEXT PRIMARY KEY,
+    last_log TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holes (
+    model_id TEXT NOT NULL,
+    panel_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    hole_name TEXT NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    z REAL NOT NULL,
+    diameter REAL NOT NULL,
+    depth REAL NOT NULL,
+    nx REAL NOT NULL,
+    ny REAL NOT NULL,
+    nz REAL NOT NULL,
+    face TEXT NOT NULL,
+    PRIMARY KEY (model_id, panel_name, position)
+);
+CREATE INDEX IF NOT EXISTS holes_diameter ON holes (model_id, diameter, depth);
+CREATE INDEX IF NOT EXISTS holes_face ON holes (model_id, face);
+CREATE TABLE IF NOT EXISTS cut_list (
+    model_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    material_code TEXT NOT NULL,
+    thickness TEXT NOT NULL,
+    dim_a REAL NOT NULL,
+    dim_b REAL NOT NULL,
+    count INTEGER NOT NULL,
+    edge_a1 INTEGER NOT NULL,
+    edge_a2 INTEGER NOT NULL,
+    edge_b1 INTEGER NOT NULL,
+    edge_b2 INTEGER NOT NULL,
+    panel_name TEXT NOT NULL,
+    panel_desc TEXT NOT NULL,
+    cnc_face_holes TEXT NOT NULL,
+    cnc_side_holes TEXT NOT NULL,
+    PRIMARY KEY (model_id, position)
+);
+CREATE VIEW IF NOT EXISTS panel_holes_csv AS
+    SELECT model_id, {", ".join(f'{field} AS "{column}"' for field, column in zip(HOLE_FIELDS, HOLE_CSV_HEADER))}
+    FROM holes ORDER BY model_id, panel_name, position;
+CREATE VIEW IF NOT EXISTS cut_list_csv AS
+    SELECT model_id, {", ".join(f'{field} AS "{column}"' for field, column in zip(CutListRow._fields, CSV_HEADER))}
+    FROM cut_list ORDER BY model_id, position;
+"""
+
+
+def echo_text(line):
+    """The text of an OpenSCAD echo() console line, or None for other lines."""
+    line = line.rstrip("\r\n")
+    if not line.startswith(ECHO_PREFIX) or not line.endswith('"'):
+        return None
+    return ECHO_ESCAPE.sub(r"\1", line[len(ECHO_PREFIX):-1])
+
+
+def model_id_from_info(info):
+    """Rebuild model_identifier from the model_info={...} echo."""
+    fields = {name: value.strip() for name, value in MODEL_INFO_FIELD.findall(info)}
+    return MODEL_IDENTIFIER_FORMAT.format(**fields)
+
+
+def hole_face(z, nx, ny):
+    return FACE_HOLE if nx == 0 and ny == 0 and z == 0 else EDGE_HOLE
+
+
+def parse_hole(fields):
+    """Parse the columns of a Hole echo into a hole dict."""
+    if len(fields) != len(HOLE_FIELDS):
+        raise ValueError(f"Expected {len(HOLE_FIELDS)} hole columns, found {len(fields)}")
+    panel_name, hole_name, *values = fields
+    hole = {'panel_name': panel_name, 'hole_name': hole_name}
+    hole.update(zip(HOLE_FIELDS[2:], map(float, values)))
+    hole['face'] = hole_face(hole['z'], hole['nx'], hole['ny'])
+    return hole
+
+
+def read_console_log(log_file):
+    """Read the model ID, holes and cut list rows of a console log in one pass.
+
+    Returns a dict with 'model_id' (None if the log echoes neither the
+    identifier nor model_info), 'panel_name', the exported panel (None if the
+    log exports none), 'holes' in echo order and 'cut_list', the parsed
+    CutListRows (None if the log has no CSV: lines).
+    """
+    model_id = None
+    info_model_id = None
+    panel_name = None
+    holes = []
+    cut_list = None
+    # PowerShell 5 writes the log with a BOM
+    with open(log_file, 'r', encoding='utf-8-sig') as f:
+        for line_number, line in enumerate(f, start=1):
+            text = echo_text(line)
+            if text is None:
+                continue
+            try:
+                if text.startswith(HOLE_TAG):
+                    holes.append(parse_hole(next(csv.reader([text[len(HOLE_TAG):]]))))
+                elif text.startswith(CSV_TAG):
+                    row = next(csv.reader([text[len(CSV_TAG):]]))
+                    if cut_list is None:
+                        verify_header(row, CSV_HEADER)
+                        cut_list = []
+                    else:
+                        cut_list.append(parse_cut_list_row(row))
+                elif text.startswith(MODEL_IDENTIFIER_TAG):
+                    model_id = text[len(MODEL_IDENTIFIER_TAG):]
+                elif text.startswith(MODEL_INFO_TAG):
+                    info_model_id = model_id_from_info(text[len(MODEL_INFO_TAG):])
+                elif text.startswith(DEFINITIONS_TAG):
+                    match = EXPORT_PANEL_NAME.search(text[len(DEFINITIONS_TAG):])
+                    panel_name = match.group(1) if match else None
+            except (ValueError, IndexError, KeyError) as e:
+                raise ValueError(f"{log_file}:{line_number}: cannot parse {text!r}: {e}") from e
+    return {'model_id': model_id or info_model_id, 'panel_name': panel_name or None, 'holes': holes, 'cut_list': cut_list}
+
+
+def connect(db_file):
+    """Open the hole database, creating its tables, indexes and views if needed."""
+    db_dir = os.path.dirname(db_file)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    connection = sqlite3.connect(db_file)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def store_log(connection, model_id, log_file, log, panel_name=None):
+    """Replace the holes of the panels and the cut list found in the log.
+
+    The holes of the exported panel (panel_name, or the one the log echoes) are
+    replaced even when the log has none, so a panel that lost its holes does
+    not keep the old ones.
+    """
+    with connection:
+        connection.execute("INSERT OR REPLACE INTO models (model_id, last_log) VALUES (?, ?)", (model_id, log_file))
+        exported = [name for name in (panel_name or log['panel_name'],) if name]
+        panels = list(dict.fromkeys(exported + [hole['panel_name'] for hole in log['holes']]))
+        connection.executemany("DELETE FROM holes WHERE model_id = ? AND panel_name = ?", [(model_id, panel) for panel in panels])
+        positions = {}
+        rows = []
+        for hole in log['holes']:
+            position = positions[hole['panel_name']] = positions.get(hole['panel_name'], -1) + 1
+            rows.append((model_id, hole['panel_name'], position, hole['hole_name'], hole['x'], hole['y'], hole['z'],
+                         hole['diameter'], hole['depth'], hole['nx'], hole['ny'], hole['nz'], hole['face']))
+        connection.executemany("INSERT INTO holes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        if log['cut_list'] is not None:
+            connection.execute("DELETE FROM cut_list WHERE model_id = ?", (model_id,))
+            connection.executemany(f"INSERT INTO cut_list VALUES (?, ?, {', '.join('?' * len(CSV_HEADER))})",
+                                   [(model_id, position, *row) for position, row in enumerate(log['cut_list'])])
+    return panels
+
+
+def ingest(connection, log_file, model_id=None, panel_name=None):
+    """Store one console log; model_id and panel_name override the model ID and
+    the exported panel found in the log.
+
+    Returns the model ID and the panels whose holes were replaced, the exported
+    panel included even if it has no holes.
+    """
+    log = read_console_log(log_file)
+    model_id = model_id or log['model_id']
+    if model_id is None:
+        raise ValueError(f"No model_identifier or model_info echo in {log_file}; pass --model-id")
+    panels = store_log(connection, model_id, log_file, log, panel_name)
+    print(f"{log_file}: {model_id}, {len(log['holes'])} holes on {len(panels)} panels"
+          + ("" if log['cut_list'] is None else f", {len(log['cut_list'])} cut list rows"))
+    return model_id, panels
+
+
+def panel_hole_rows(connection, model_id, panel_name):
+    """The holes of a panel as rows of the per-panel hole CSV, in echo order."""
+    columns = ", ".join(f'"{column}"' for column in HOLE_CSV_HEADER)
+    return connection.execute(f"SELECT {columns} FROM panel_holes_csv WHERE model_id = ? AND PanelName = ?",
+                              (model_id, panel_name)).fetchall()
+
+
+def model_panels(connection, model_id):
+    return [panel for panel, in connection.execute("SELECT DISTINCT panel_name FROM holes WHERE model_id = ? ORDER BY panel_name", (model_id,))]
+
+
+def write_panel_csv(connection, model_id, panel_name, output_dir):
+    """Write <output_dir>/<panel_name>.csv with the numbers formatted like OpenSCAD echoes them.
+
+    The file is written next to its final name and renamed when complete, so
+    readers never see a partial CSV.
+    """
+    csv_file = os.path.join(output_dir, f"{panel_name}.csv")
+    partial_file = f"{csv_file}.partial"
+    with open(partial_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(HOLE_CSV_HEADER)
+        for panel, hole_name, *values in panel_hole_rows(connection, model_id, panel_name):
+            writer.writerow([panel, hole_name, *map(format_number, values)])
+    os.replace(partial_file, csv_file)
+    return csv_file
+
+
+def write_panel_csvs(connection, model_id, output_dir, panels=None):
+    os.makedirs(output_dir, exist_ok=True)
+    for panel_name in panels or model_panels(connection, model_id):
+        print(f"  -> {write_panel_csv(connection, model_id, panel_name, output_dir)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest OpenSCAD console logs into an indexed SQLite hole database.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = commands.add_parser('ingest', help='Store the holes and cut list of console logs.')
+    ingest_parser.add_argument('log_files', nargs='+', help='OpenSCAD console logs.')
+    ingest_parser.add_argument('--db', required=True, help='SQLite database file (created if missing).')
+    ingest_parser.add_argument('--model-id', help='Model ID to store the logs under (default: the one echoed in the log).')
+    ingest_parser.add_argument('--csv-dir', help='Also write the per-panel hole CSVs of the ingested panels to this directory.')
+    csv_parser = commands.add_parser('csv', help='Write per-panel hole CSV files from the database.')
+    csv_parser.add_argument('--db', required=True, help='SQLite database file.')
+    csv_parser.add_argument('--model-id', required=True, help='Model ID whose panels are written.')
+    csv_parser.add_argument('--output-dir', required=True, help='Directory for the <panel>.csv files.')
+    csv_parser.add_argument('--panel', nargs='+', help='Panels to write (default: all panels of the model).')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db) and args.command == 'csv':
+        parser.error(f"Database not found: {args.db}")
+    connection = connect(args.db)
+    if args.command == 'ingest':
+        for log_file in args.log_files:
+            model_id, panels = ingest(connection, log_file, args.model_id)
+            if args.csv_dir and panels:
+                write_panel_csvs(connection, model_id, args.csv_dir, panels)
+    else:
+        write_panel_csvs(connection, args.model_id, args.output_dir, args.panel)
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
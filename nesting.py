@@ -0,0 +1,382 @@
+"""
+Packs the parts of one or more cut lists onto supplier boards and reports how
+many boards every material needs.
+
+The parts of every material (material code and thickness) are packed with one of
+two heuristics:
+
+    guillotine  Every placement splits its free rectangle in two with a straight
+                cut across it (best area fit, split along the shorter leftover
+                side), so the layout can be cut on a panel saw. This is the default.
+    maxrects    Keeps all maximal free rectangles (best short side fit). It often
+                needs fewer boards, but the layout is not always guillotine-cuttable.
+    best        Runs both and keeps the one with fewer boards per material,
+                guillotine on a tie.
+
+Dimension A of a part runs along the wood grain and is placed along the board
+length (the first board dimension). Parts of the materials in
+NO_ROTATION_MATERIALS (decor with a visible grain) are never rotated; other parts
+are turned by 90 degrees when they only fit that way. Every board loses the trim
+margin on all four edges and every cut the kerf width.
+
+For every material the board count, the parts area and the waste percentage
+(share of the board area, trim included, not covered by parts) are printed; with
+--dxf-dir a cutting layout DXF is written for every board.
+
+Usage:
+    python nesting.py <cut_list.csv> [<cut_list.csv> ...] [--algorithm guillotine|maxrects|best]
+                      [--board <material>=<length>x<width> ...] [--kerf <mm>] [--trim <mm>]
+                      [--no-rotation <material> ...] [--dxf-dir <dir>] [--format text|json]
+
+Several cut lists (orders) are consolidated into one packing per material.
+
+Example:
+    python nesting.py export/H2300xW600xD230_Mm18_Ms12/cut_list.csv --dxf-dir order/export/H2300xW600xD230_Mm18_Ms12/nesting
+    python nesting.py export/*/cut_list.csv --algorithm best --board HDF-3=2440x1220 --kerf 3.2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import ezdxf
+
+from cut_list import load_cut_list
+
+# Supplier board size (length along the grain x width) in mm, unless given with --board
+DEFAULT_BOARD_SIZE = (2800.0, 2070.0)
+
+# Saw blade width and the margin trimmed off every board edge (mm)
+DEFAULT_KERF = 4.0
+DEFAULT_TRIM = 10.0
+
+# Materials whose decor grain must run along the board length
+NO_ROTATION_MATERIALS = {"MEL-19"}
+
+ALGORITHMS = ["guillotine", "maxrects", "best"]
+
+# Layers of the cutting layout DXF
+BOARD_LAYER = "BOARD"
+TRIM_LAYER = "TRIM"
+PART_LAYER = "PART"
+LABEL_LAYER = "LABEL"
+
+# Label text height (mm); shrunk for parts too small to hold it
+LABEL_TEXT_HEIGHT = 25.0
+# Approximate width of a character relative to the text height
+LABEL_CHARACTER_WIDTH = 0.8
+# Label lines are spaced this many text heights apart
+LABEL_LINE_SPACING = 1.4
+# The title above the board
+TITLE_TEXT_HEIGHT = 40.0
+TITLE_OFFSET = 30.0
+
+
+def board_part_list(rows, no_rotation_materials=NO_ROTATION_MATERIALS):
+    """Expand cut list rows into one part per piece, largest first.
+
+    A part is a dict with the panel 'name', its 'length' along the grain, its
+    'width' and whether it may be 'rotatable'.
+    """
+    parts = []
+    for row in rows:
+        for _ in range(row.count):
+            parts.append({
+                'name': row.panel_name,
+                'length': row.dim_a,
+                'width': row.dim_b,
+                'rotatable': row.material_code not in no_rotation_materials,
+            })
+    # Large parts first leaves the small ones to fill the gaps
+    parts.sort(key=lambda p: (p['length'] * p['width'], max(p['length'], p['width'])), reverse=True)
+    return parts
+
+
+def orientations(part, kerf):
+    """The (x size, y size, rotated) footprints a part may take, each grown by the kerf."""
+    footprints = [(part['length'] + kerf, part['width'] + kerf, False)]
+    if part['rotatable'] and part['length'] != part['width']:
+        footprints.append((part['width'] + kerf, part['length'] + kerf, True))
+    return footprints
+
+
+def guillotine_find(free, footprints):
+    """Best area fit: the free rectangle with the least area left over."""
+    best = None
+    for index, (x, y, width, height) in enumerate(free):
+        for part_width, part_height, rotated in footprints:
+            if part_width <= width and part_height <= height:
+                score = width * height - part_width * part_height
+                if best is None or score < best[0]:
+                    best = (score, index, part_width, part_height, rotated)
+    return best
+
+
+def guillotine_place(free, index, part_width, part_height):
+    """Cut the placed part out of free[index], splitting the rest along the shorter leftover side."""
+    x, y, width, height = free.pop(index)
+    leftover_width = width - part_width
+    leftover_height = height - part_height
+    if leftover_width < leftover_height:
+        # Cut across the full width above the part
+        pieces = [(x + part_width, y, leftover_width, part_height), (x, y + part_height, width, leftover_height)]
+    else:
+        # Cut across the full height right of the part
+        pieces = [(x + part_width, y, leftover_width, height), (x, y + part_height, part_width, leftover_height)]
+    free.extend(piece for piece in pieces if piece[2] > 0 and piece[3] > 0)
+
+
+def maxrects_find(free, footprints):
+    """Best short side fit: the free rectangle with the smallest leftover on the tighter side."""
+    best = None
+    for index, (x, y, width, height) in enumerate(free):
+        for part_width, part_height, rotated in footprints:
+            if part_width <= width and part_height <= height:
+                leftover_x = width - part_width
+                leftover_y = height - part_height
+                score = (min(leftover_x, leftover_y), max(leftover_x, leftover_y))
+                if best is None or score < best[0]:
+                    best = (score, index, part_width, part_height, rotated)
+    return best
+
+
+def maxrects_place(free, index, part_width, part_height):
+    """Place the part in the corner of free[index] and split every free rectangle it overlaps."""
+    left, bottom = free[index][0], free[index][1]
+    right, top = left + part_width, bottom + part_height
+    split = []
+    for x, y, width, height in free:
+        if x >= right or x + width <= left or y >= top or y + height <= bottom:
+            split.append((x, y, width, height))
+            continue
+        # The maximal rectangles left of, right of, below and above the placed part
+        if left > x:
+            split.append((x, y, left - x, height))
+        if right < x + width:
+            split.append((right, y, x + width - right, height))
+        if bottom > y:
+            split.append((x, y, width, bottom - y))
+        if top < y + height:
+            split.append((x, top, width, y + height - top))
+    # Drop the rectangles contained in another one
+    split.sort(key=lambda r: r[2] * r[3], reverse=True)
+    free[:] = []
+    for rectangle in split:
+        x, y, width, height = rectangle
+        if not any(x >= fx and y >= fy and x + width <= fx + fw and y + height <= fy + fh for fx, fy, fw, fh in free):
+            free.append(rectangle)
+
+
+PACKERS = {
+    'guillotine': (guillotine_find, guillotine_place),
+    'maxrects': (maxrects_find, maxrects_place),
+}
+
+
+def new_board(board_size, kerf, trim):
+    """An empty board; its usable area is grown by one kerf so the last part of a row needs no cut."""
+    usable = (trim, trim, board_size[0] - 2 * trim + kerf, board_size[1] - 2 * trim + kerf)
+    return {'placements': [], 'free': [usable], 'parts_area': 0.0}
+
+
+def pack_parts(parts, board_size, algorithm="guillotine", kerf=DEFAULT_KERF, trim=DEFAULT_TRIM):
+    """Pack the parts onto as few boards as the heuristic finds.
+
+    Every part goes onto the first open board it fits on, else onto a new board.
+    Returns the list of boards, each with its 'placements' (part, x, y, x size,
+    y size, rotated; without kerf) and the 'parts_area'.
+    """
+    find, place = PACKERS[algorithm]
+    smallest_part = min((part['length'] + kerf) * (part['width'] + kerf) for part in parts) if parts else 0.0
+    boards = []
+    # Boards before first_open are full; boards before first_board[size] had no room
+    # for the previous part of that size and can only have lost space since
+    first_open = 0
+    first_board = {}
+    for part in parts:
+        footprints = orientations(part, kerf)
+        part_area = footprints[0][0] * footprints[0][1]
+        size = (part['length'], part['width'], part['rotatable'])
+        fit = None
+        for board_index in range(max(first_open, first_board.get(size, 0)), len(boards)):
+            board = boards[board_index]
+            # Cheap bounds before scanning the free rectangles of a nearly full board
+            if board['largest_free'] < part_area or not any(w <= board['widest_free'] and h <= board['highest_free'] for w, h, _ in footprints):
+                continue
+            fit = find(board['free'], footprints)
+            if fit is not None:
+                break
+        if fit is None:
+            board = new_board(board_size, kerf, trim)
+            fit = find(board['free'], footprints)
+            if fit is None:
+                raise ValueError(f"Part {part['name']} ({part['length']:g} x {part['width']:g} mm) does not fit on a "
+                                 f"{board_size[0]:g} x {board_size[1]:g} mm board with {trim:g} mm trim")
+            boards.append(board)
+            board_index = len(boards) - 1
+        first_board[size] = board_index
+        _, index, part_width, part_height, rotated = fit
+        x, y = board['free'][index][0], board['free'][index][1]
+        place(board['free'], index, part_width, part_height)
+        board['largest_free'] = max((width * height for _, _, width, height in board['free']), default=0.0)
+        board['widest_free'] = max((width for _, _, width, _ in board['free']), default=0.0)
+        board['highest_free'] = max((height for _, _, _, height in board['free']), default=0.0)
+        board['placements'].append({'part': part, 'x': x, 'y': y, 'x_size': part_width - kerf, 'y_size': part_height - kerf, 'rotated': rotated})
+        board['parts_area'] += part['length'] * part['width']
+        while first_open < len(boards) and boards[first_open]['largest_free'] < smallest_part:
+            first_open += 1
+    return boards
+
+
+def nest_material(rows, board_size, algorithm="guillotine", kerf=DEFAULT_KERF, trim=DEFAULT_TRIM, no_rotation_materials=NO_ROTATION_MATERIALS):
+    """Pack the cut list rows of one material and summarize the result.
+
+    With algorithm "best" both heuristics run and the one with fewer boards
+    is kept, guillotine on a tie.
+    """
+    parts = board_part_list(rows, no_rotation_materials)
+    candidates = ["guillotine", "maxrects"] if algorithm == "best" else [algorithm]
+    results = []
+    for candidate in candidates:
+        boards = pack_parts(parts, board_size, candidate, kerf, trim)
+        results.append((len(boards), candidate, boards))
+    # min() keeps the first of equal board counts
+    board_count, used_algorithm, boards = min(results, key=lambda r: r[0])
+    board_area = board_size[0] * board_size[1]
+    parts_area = sum(board['parts_area'] for board in boards)
+    return {
+        'algorithm': used_algorithm,
+        'board_size': board_size,
+        'parts': len(parts),
+        'boards': board_count,
+        'parts_area_m2': parts_area / 1e6,
+        'waste_percent': 100.0 * (1.0 - parts_area / (board_count * board_area)) if board_count else 0.0,
+        'layouts': boards,
+    }
+
+
+def add_rectangle(msp, x, y, width, height, layer):
+    msp.add_lwpolyline([(x, y), (x + width, y), (x + width, y + height), (x, y + height)], close=True, dxfattribs={'layer': layer})
+
+
+def add_part_label(msp, placement):
+    """Panel name and size centered on the part, shrunk to fit small parts."""
+    part = placement['part']
+    lines = [part['name'], f"{part['length']:g} x {part['width']:g}" + (" R" if placement['rotated'] else "")]
+    longest = max(len(line) for line in lines)
+    height = min(LABEL_TEXT_HEIGHT,
+                 placement['x_size'] / (longest * LABEL_CHARACTER_WIDTH),
+                 placement['y_size'] / (len(lines) * LABEL_LINE_SPACING))
+    center_x = placement['x'] + placement['x_size'] / 2
+    center_y = placement['y'] + placement['y_size'] / 2
+    for number, line in enumerate(lines):
+        offset = (len(lines) / 2 - number - 0.5) * height * LABEL_LINE_SPACING
+        msp.add_text(line, height=height, dxfattribs={'layer': LABEL_LAYER}).set_placement(
+            (center_x, center_y + offset), align=ezdxf.enums.TextEntityAlignment.MIDDLE_CENTER)
+
+
+def write_board_dxf(board, board_size, trim, title, output_file):
+    """Cutting layout of one board: outline, trimmed area, parts and their labels."""
+    doc = ezdxf.new('R2000')
+    doc.units = ezdxf.units.MM
+    for name, color in ((BOARD_LAYER, 7), (TRIM_LAYER, 8), (PART_LAYER, 1), (LABEL_LAYER, 5)):
+        doc.layers.add(name, color=color)
+    msp = doc.modelspace()
+    add_rectangle(msp, 0, 0, board_size[0], board_size[1], BOARD_LAYER)
+    add_rectangle(msp, trim, trim, board_size[0] - 2 * trim, board_size[1] - 2 * trim, TRIM_LAYER)
+    for placement in board['placements']:
+        add_rectangle(msp, placement['x'], placement['y'], placement['x_size'], placement['y_size'], PART_LAYER)
+        add_part_label(msp, placement)
+    msp.add_text(title, height=TITLE_TEXT_HEIGHT, dxfattribs={'layer': LABEL_LAYER}).set_placement(
+        (0, board_size[1] + TITLE_OFFSET))
+    doc.saveas(output_file)
+
+
+def write_layouts(material, thickness, result, kerf, trim, dxf_dir):
+    """Write one DXF per board; returns the file names."""
+    os.makedirs(dxf_dir, exist_ok=True)
+    files = []
+    length, width = result['board_size']
+    for number, board in enumerate(result['layouts'], start=1):
+        output_file = os.path.join(dxf_dir, f"{material}_{thickness}mm_board_{number}.dxf")
+        title = (f"{material} {thickness} mm - board {number}/{result['boards']} - {length:g} x {width:g} mm, "
+                 f"kerf {kerf:g} mm, trim {trim:g} mm, {result['algorithm']}, grain along X")
+        write_board_dxf(board, result['board_size'], trim, title, output_file)
+        files.append(output_file)
+    return files
+
+
+def nest_cut_lists(csv_files, board_sizes=None, algorithm="guillotine", kerf=DEFAULT_KERF, trim=DEFAULT_TRIM,
+                   no_rotation_materials=NO_ROTATION_MATERIALS):
+    """Consolidate the cut lists and nest every (material code, thickness) group.
+
+    board_sizes maps material codes to (length, width); others use DEFAULT_BOARD_SIZE.
+    Returns a dict of (material code, thickness) -> nest_material() result.
+    """
+    by_material = {}
+    for csv_file in csv_files:
+        for key, rows in load_cut_list(csv_file)['by_material'].items():
+            by_material.setdefault(key, []).extend(rows)
+    board_sizes = board_sizes or {}
+    return {
+        (material, thickness): nest_material(rows, board_sizes.get(material, DEFAULT_BOARD_SIZE), algorithm, kerf, trim, no_rotation_materials)
+        for (material, thickness), rows in by_material.items()
+    }
+
+
+def parse_board_size(text):
+    """Parse "MEL-19=2800x2070" into the material and its (length, width)."""
+    material, separator, size = text.partition("=")
+    length, x, width = size.lower().partition("x")
+    if not separator or not x:
+        raise argparse.ArgumentTypeError(f"Invalid board size {text!r}, expected <material>=<length>x<width>")
+    return material, (float(length), float(width))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack the parts of cut lists onto supplier boards per material.')
+    parser.add_argument('csv_files', nargs='+', help='Cut list CSV files; several are consolidated into one packing.')
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='guillotine', help='Packing heuristic (default: guillotine).')
+    parser.add_argument('--board', type=parse_board_size, action='append', default=[], metavar='MATERIAL=LxW',
+                        help=f'Board size of a material, length along the grain first (default: {DEFAULT_BOARD_SIZE[0]:g}x{DEFAULT_BOARD_SIZE[1]:g}).')
+    parser.add_argument('--kerf', type=float, default=DEFAULT_KERF, help=f'Saw blade width in mm (default: {DEFAULT_KERF:g}).')
+    parser.add_argument('--trim', type=float, default=DEFAULT_TRIM, help=f'Margin trimmed off every board edge in mm (default: {DEFAULT_TRIM:g}).')
+    parser.add_argument('--no-rotation', nargs='+', default=sorted(NO_ROTATION_MATERIALS), metavar='MATERIAL',
+                        help=f'Materials whose parts keep dimension A along the board length (default: {" ".join(sorted(NO_ROTATION_MATERIALS))}).')
+    parser.add_argument('--dxf-dir', help='Write a cutting layout DXF for every board into this directory.')
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='Report format.')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = nest_cut_lists(args.csv_files, dict(args.board), args.algorithm, args.kerf, args.trim, set(args.no_rotation))
+    elapsed = time.perf_counter() - start
+
+    files = {}
+    if args.dxf_dir:
+        for (material, thickness), result in results.items():
+            files[(material, thickness)] = write_layouts(material, thickness, result, args.kerf, args.trim, args.dxf_dir)
+
+    if args.format == 'json':
+        report = [
+            {'material': material, 'thickness': thickness, 'dxf_files': files.get((material, thickness), []),
+             **{key: value for key, value in result.items() if key != 'layouts'}}
+            for (material, thickness), result in results.items()
+        ]
+        json.dump({'elapsed_s': elapsed, 'materials': report}, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+
+    print("--- Nesting Summary ---")
+    for (material, thickness), result in results.items():
+        length, width = result['board_size']
+        print(f"{material:8s} {thickness:>3s} mm  {result['parts']:5d} parts  {result['boards']:3d} boards of {length:g} x {width:g}  "
+              f"{result['parts_area_m2']:8.2f} m2 parts  {result['waste_percent']:5.1f}% waste  ({result['algorithm']})")
+        for output_file in files.get((material, thickness), []):
+            print(f"    {output_file}")
+    print(f"Packed in {elapsed:.3f}s")
+    print("-----------------------")
+
+
+if __name__ == "__main__":
+    main()
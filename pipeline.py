@@ -0,0 +1,340 @@
+"""
+Runs the export -> split -> DWG -> PDF chain of every panel as a task graph.
+
+workflow.ps1 runs the stages one after the other for all panels: every panel is
+exported before the first one is split, and so on. The chain of one panel does
+not depend on the other panels though, so this runner schedules one task per
+panel and step and starts every task as soon as the tasks it needs are done:
+
+    export    openscad -o dxf-raw/<panel>.dxf            holes stored in holes.sqlite, <panel>.csv written
+    split     split_layers.py dxf-raw -> dxf, dxf-template    needs export
+    dwg       ODA File Converter dxf -> dwg                   needs split
+    pdf       LibreCAD dxf2pdf dxf -> pdf                     needs split
+    template-pdf  LibreCAD dxf2pdf dxf-template -> pdf-template   needs split
+
+The split task parses the raw DXF once and writes both the drawing and the
+drilling template (split_layers.py --template-file).
+
+The tasks run as asyncio subprocesses. Every tool has its own concurrency limit
+(--limit), so OpenSCAD and split_layers.py fill the CPUs while the ODA File
+Converter and LibreCAD run a few instances at a time. Every task writes its
+output to its own log, <export_dir>/log/<step>/<panel>.log.
+
+A task is done when its tool has exited successfully and its output exists.
+LibreCAD's dxf2pdf returns 1 on success and writes the PDF asynchronously, so
+its exit code is ignored and the PDF is polled for until it ends with %%EOF
+(other polled files must keep their size between two polls). OpenSCAD writes
+to a temporary file renamed to the final name when complete.
+
+One progress line with the completed tasks and an estimate of the remaining
+time is printed per finished task. The first failing task stops the run: the
+other tasks are cancelled, their processes killed, and the log of the failed
+task is printed.
+
+The tools are configurable with --tool NAME=PATH; a path ending in .py is run with
+the current Python interpreter. test/openscad_stub.py, test/oda_stub.py and
+test/librecad_stub.py stand in for OpenSCAD, the ODA File Converter and LibreCAD
+to run the whole graph without them.
+
+Usage:
+    python pipeline.py [--export-dir <dir>] [--panel <name> ...] [--steps export split dwg pdf template-pdf]
+                       [--tool NAME=PATH ...] [--limit NAME=N ...] [--model <model.scad>] [-D name=value ...]
+                       [--output-timeout SECONDS] [--poll-interval SECONDS]
+
+Example:
+    python pipeline.py --tool openscad="C:/Program Files/OpenSCAD/openscad.exe" --limit librecad=1
+    python pipeline.py --tool openscad=test/openscad_stub.py --tool oda=test/oda_stub.py --tool librecad=test/librecad_stub.py --export-dir build/pipeline-stub
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import closing
+
+import export_panels
+import hole_db
+import scad_params
+
+# Tools: default executable, default concurrency and whether the exit code can be trusted
+TOOLS = {
+    'openscad': {'path': export_panels.DEFAULT_OPENSCAD, 'limit': os.cpu_count(), 'exit_code': True},
+    'python': {'path': sys.executable, 'limit': os.cpu_count(), 'exit_code': True},
+    'oda': {'path': "ODAFileConverter", 'limit': 1, 'exit_code': True},
+    # dxf2pdf returns 1 on success and writes the PDF after it has exited
+    'librecad': {'path': "librecad", 'limit': 2, 'exit_code': False},
+}
+
+STEPS = ["export", "split", "dwg", "pdf", "template-pdf"]
+
+# Output directories below the export directory
+RAW_DXF_DIR = export_panels.RAW_DXF_DIR
+DXF_DIR = "dxf"
+TEMPLATE_DXF_DIR = "dxf-template"
+DWG_DIR = "dwg"
+PDF_DIR = "pdf"
+TEMPLATE_PDF_DIR = "pdf-template"
+LOG_DIR = export_panels.LOG_DIR
+
+SPLIT_LAYERS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "split_layers.py")
+
+# ODA File Converter arguments, see convert-dxf-to-dwg.ps1
+DWG_VERSION = "ACAD2000"
+ODA_RECURSE = "0"
+ODA_AUDIT = "1"
+
+# LibreCAD dxf2pdf page setup, see convert-dxf-to-pdf.ps1
+PDF_OPTIONS = ["--fit", "--paper", "297x210", "--margins", "10,10,10,10", "--pages", "1x1"]
+
+# A PDF is complete once its last bytes hold the end-of-file marker
+PDF_EOF_MARKER = b"%%EOF"
+PDF_TAIL_BYTES = 32
+
+# Polling for outputs that appear after the tool has exited (seconds)
+DEFAULT_OUTPUT_TIMEOUT = 120.0
+DEFAULT_POLL_INTERVAL = 0.25
+
+FAILED_LOG_TAIL_LINES = export_panels.FAILED_LOG_TAIL_LINES
+
+
+def panel_tasks(panel_name, export_dir, tool_paths, model_file, overrides):
+    """The tasks of one panel, keyed by step.
+
+    Every task names its tool, the steps it needs, its command, its output file
+    and its log file; extra_outputs lists further files the command writes. The
+    export task writes to partial_file, which is renamed to the output file when
+    complete.
+    """
+    file_name = export_panels.safe_file_name(panel_name)
+    raw_dxf = os.path.join(export_dir, RAW_DXF_DIR, f"{file_name}.dxf")
+    dxf = os.path.join(export_dir, DXF_DIR, f"{file_name}.dxf")
+    template_dxf = os.path.join(export_dir, TEMPLATE_DXF_DIR, f"{file_name}.dxf")
+    partial_dxf = os.path.join(export_dir, RAW_DXF_DIR, f".{file_name}.partial.dxf")
+    python = export_panels.program_command(tool_paths['python'])
+    librecad = export_panels.program_command(tool_paths['librecad'])
+
+    def pdf_command(dxf_file, pdf_file):
+        return librecad + ["dxf2pdf", *PDF_OPTIONS, "--outfile", pdf_file, dxf_file]
+
+    tasks = {
+        'export': {
+            'tool': 'openscad', 'needs': [],
+            'command': export_panels.openscad_export_command(tool_paths['openscad'], model_file, overrides, panel_name, "dxf", partial_dxf),
+            'output': raw_dxf, 'partial_file': partial_dxf,
+        },
+        'split': {'tool': 'python', 'needs': ['export'], 'command': python + [SPLIT_LAYERS_SCRIPT, raw_dxf, dxf, "--template-file", template_dxf],
+                  'output': dxf, 'extra_outputs': [template_dxf]},
+        'dwg': {
+            'tool': 'oda', 'needs': ['split'],
+            # The converter works on directories; the filter selects this panel
+            'command': export_panels.program_command(tool_paths['oda']) + [os.path.dirname(dxf), os.path.join(export_dir, DWG_DIR), DWG_VERSION, "DWG", ODA_RECURSE, ODA_AUDIT, f"{file_name}.dxf"],
+            'output': os.path.join(export_dir, DWG_DIR, f"{file_name}.dwg"),
+        },
+        'pdf': {'tool': 'librecad', 'needs': ['split'], 'command': pdf_command(dxf, os.path.join(export_dir, PDF_DIR, f"{file_name}.pdf")),
+                'output': os.path.join(export_dir, PDF_DIR, f"{file_name}.pdf")},
+        'template-pdf': {'tool': 'librecad', 'needs': ['split'], 'command': pdf_command(template_dxf, os.path.join(export_dir, TEMPLATE_PDF_DIR, f"{file_name}.pdf")),
+                         'output': os.path.join(export_dir, TEMPLATE_PDF_DIR, f"{file_name}.pdf")},
+    }
+    for step, task in tasks.items():
+        task.update({'panel_name': panel_name, 'step': step, 'log_file': os.path.join(export_dir, LOG_DIR, step, f"{file_name}.log")})
+    return tasks
+
+
+def build_graph(panel_names, steps, export_dir, tool_paths, model_file, overrides):
+    """The tasks of the selected steps for every panel, keyed by (panel, step).
+
+    Steps that are not selected are assumed done: their outputs must exist.
+    """
+    graph = {}
+    for panel_name in panel_names:
+        for step, task in panel_tasks(panel_name, export_dir, tool_paths, model_file, overrides).items():
+            if step in steps:
+                task['needs'] = [(panel_name, need) for need in task['needs'] if need in steps]
+                graph[(panel_name, step)] = task
+    return graph
+
+
+def output_complete(path, previous_size):
+    """Whether path holds a complete output; returns the verdict and the current size."""
+    if not os.path.exists(path):
+        return False, None
+    size = os.path.getsize(path)
+    if path.lower().endswith(".pdf"):
+        with open(path, 'rb') as f:
+            f.seek(max(size - PDF_TAIL_BYTES, 0))
+            return PDF_EOF_MARKER in f.read(), size
+    return size > 0 and size == previous_size, size
+
+
+async def wait_for_output(path, timeout, poll_interval):
+    """Poll until path is complete; raises TimeoutError after timeout seconds.
+
+    Used for tools that write their output after they have exited.
+    """
+    deadline = time.monotonic() + timeout
+    size = None
+    while True:
+        complete, size = output_complete(path, size)
+        if complete:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{path} was not complete {timeout:.0f}s after the tool exited")
+        await asyncio.sleep(poll_interval)
+
+
+async def run_task(task, semaphore, output_timeout, poll_interval):
+    """Run the command of a task under its tool's semaphore and wait for its output."""
+    async with semaphore:
+        start = time.perf_counter()
+        for path in [task['output'], *task.get('extra_outputs', [])]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Outputs of earlier runs would count as complete before the tool has written them
+            if os.path.exists(path) and not task.get('partial_file'):
+                os.remove(path)
+        output = task.get('partial_file') or task['output']
+        try:
+            with open(task['log_file'], 'w', encoding='utf-8') as log:
+                process = await asyncio.create_subprocess_exec(*task['command'], stdout=log, stderr=asyncio.subprocess.STDOUT,
+                                                               stdin=asyncio.subprocess.DEVNULL)
+                try:
+                    returncode = await process.wait()
+                except asyncio.CancelledError:
+                    process.kill()
+                    await process.wait()
+                    raise
+            if TOOLS[task['tool']]['exit_code']:
+                if returncode != 0:
+                    raise RuntimeError(f"{task['step']} of '{task['panel_name']}' failed with exit code {returncode}, see {task['log_file']}")
+                # The outputs are complete when the tool exits
+                for path in [output, *task.get('extra_outputs', [])]:
+                    if not os.path.exists(path) or os.path.getsize(path) == 0:
+                        raise RuntimeError(f"{task['step']} of '{task['panel_name']}' wrote no {path}, see {task['log_file']}")
+            else:
+                await wait_for_output(output, output_timeout, poll_interval)
+            if task.get('partial_file'):
+                os.replace(task['partial_file'], task['output'])
+        finally:
+            if task.get('partial_file') and os.path.exists(task['partial_file']):
+                os.remove(task['partial_file'])
+        return time.perf_counter() - start
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def print_progress(done, total, started, task, elapsed):
+    """One progress line; the remaining time is extrapolated from the tasks done so far."""
+    wall = time.perf_counter() - started
+    eta = wall / done * (total - done)
+    print(f"[{done:{len(str(total))}d}/{total}] {100 * done / total:5.1f}%  elapsed {format_duration(wall)}  ETA {format_duration(eta)}"
+          f"  {task['step']:12s} {task['panel_name']} ({elapsed:.2f}s)", flush=True)
+
+
+async def run_graph(graph, limits, on_done=None, output_timeout=DEFAULT_OUTPUT_TIMEOUT, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Run every task once the tasks it needs are done, at most limits[tool] at a time per tool.
+
+    on_done(task) is called in the event loop after each task has finished.
+    Returns the (task, elapsed) timings and the wall time. The first failure
+    cancels all other tasks and is raised.
+    """
+    for task in graph.values():
+        os.makedirs(os.path.dirname(task['log_file']), exist_ok=True)
+    semaphores = {tool: asyncio.Semaphore(limit) for tool, limit in limits.items()}
+    started = time.perf_counter()
+    timings = []
+    futures = {}
+
+    async def run_when_ready(key):
+        task = graph[key]
+        await asyncio.gather(*(futures[need] for need in task['needs']))
+        elapsed = await run_task(task, semaphores[task['tool']], output_timeout, poll_interval)
+        if on_done:
+            on_done(task)
+        timings.append((task, elapsed))
+        print_progress(len(timings), len(graph), started, task, elapsed)
+
+    for key in graph:
+        futures[key] = asyncio.ensure_future(run_when_ready(key))
+    try:
+        done, _ = await asyncio.wait(futures.values(), return_when=asyncio.FIRST_EXCEPTION)
+        failed = [key for key, future in futures.items() if future in done and future.exception() is not None]
+        if failed:
+            # Tasks waiting on a failed task fail with its error; report the task that failed itself
+            key = next(key for key in failed if not any(need in failed for need in graph[key]['needs']))
+            task = graph[key]
+            print(f"FAILED: {task['step']} {task['panel_name']}", file=sys.stderr)
+            if os.path.exists(task['log_file']):
+                for line in export_panels.log_tail(task['log_file'], FAILED_LOG_TAIL_LINES):
+                    print(f"  {line}", end="", file=sys.stderr)
+            raise futures[key].exception()
+    finally:
+        for future in futures.values():
+            future.cancel()
+        await asyncio.gather(*futures.values(), return_exceptions=True)
+    return timings, time.perf_counter() - started
+
+
+def print_timing_summary(timings, wall):
+    print("--- Pipeline Timing Summary ---")
+    per_step = {}
+    for task, elapsed in timings:
+        per_step.setdefault(task['step'], []).append(elapsed)
+    for step, durations in per_step.items():
+        print(f"{step:12s} {len(durations):4d} tasks  {sum(durations):8.2f}s summed  {max(durations):7.2f}s longest")
+    print(f"Total: {len(timings)} tasks, {sum(elapsed for _, elapsed in timings):.2f}s summed, {wall:.2f}s wall")
+    print("-------------------------------")
+
+
+def parse_assignment(text, parser, names, value_type=str):
+    name, separator, value = text.partition("=")
+    if not separator or name not in names:
+        parser.error(f"Expected NAME=VALUE with NAME one of {', '.join(names)}, got {text!r}")
+    return name, value_type(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run export, split_layers, DWG and PDF conversion per panel as an overlapping task graph.')
+    parser.add_argument('--export-dir', help='Export directory (default: export/<model identifier>).')
+    parser.add_argument('--panel', nargs='+', help='Panels to process (default: all panel_names of the model).')
+    parser.add_argument('--steps', nargs='+', choices=STEPS, default=STEPS, help='Steps to run; the outputs of the other steps must exist (default: all).')
+    parser.add_argument('--tool', action='append', default=[], metavar='NAME=PATH', help=f'Executable of a tool ({", ".join(TOOLS)}); *.py runs with this Python.')
+    parser.add_argument('--limit', action='append', default=[], metavar='NAME=N',
+                        help='Concurrent processes of a tool (default: ' + ", ".join(f"{name}={tool['limit']}" for name, tool in TOOLS.items()) + ').')
+    parser.add_argument('--model', default=scad_params.DEFAULT_MODEL_FILE, help=f'OpenSCAD model (default: {scad_params.DEFAULT_MODEL_FILE}).')
+    parser.add_argument('-D', dest='overrides', action='append', default=[], metavar='NAME=VALUE', help='Override a top-level variable, passed on to OpenSCAD.')
+    parser.add_argument('--output-timeout', type=float, default=DEFAULT_OUTPUT_TIMEOUT, help=f'Seconds to wait for an output after its tool has exited (default: {DEFAULT_OUTPUT_TIMEOUT:.0f}).')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL, help=f'Seconds between output polls (default: {DEFAULT_POLL_INTERVAL}).')
+    args = parser.parse_args()
+
+    tool_paths = {name: tool['path'] for name, tool in TOOLS.items()}
+    tool_paths.update(parse_assignment(text, parser, TOOLS) for text in args.tool)
+    limits = {name: tool['limit'] for name, tool in TOOLS.items()}
+    limits.update(parse_assignment(text, parser, TOOLS, int) for text in args.limit)
+
+    variables = scad_params.load_model(args.model, args.overrides)['variables']
+    model_id = variables['model_identifier']
+    panel_names = args.panel or variables['panel_names']
+    unknown = [name for name in panel_names if name not in variables['panel_names']]
+    if unknown:
+        parser.error(f"Unknown panels: {', '.join(unknown)}")
+    export_dir = args.export_dir or os.path.join("export", model_id)
+    graph = build_graph(panel_names, args.steps, export_dir, tool_paths, args.model, args.overrides)
+    print(f"Running {len(graph)} tasks for {len(panel_names)} panels of {model_id} in '{export_dir}'")
+
+    with closing(hole_db.connect(os.path.join(export_dir, export_panels.HOLE_DB_FILE))) as connection:
+        def store_holes(task):
+            # The holes of an export are stored before the split tasks that read the CSV start
+            if task['step'] == "export":
+                _, panels = hole_db.ingest(connection, task['log_file'], model_id, task['panel_name'])
+                for panel_name in panels:
+                    hole_db.write_panel_csv(connection, model_id, panel_name, os.path.dirname(task['output']))
+
+        # Let all exceptions propagate - fail early and clearly
+        timings, wall = asyncio.run(run_graph(graph, limits, on_done=store_holes, output_timeout=args.output_timeout, poll_interval=args.poll_interval))
+    print_timing_summary(timings, wall)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Long-lived worker that runs split_layers, analyze_dxf and create_order jobs in one
+Python process, so a driver submitting hundreds of jobs pays the interpreter start
+and the ezdxf/openpyxl imports once instead of once per file or service.
+
+Jobs are JSON objects, one per line, read from standard input or, with --socket,
+from the connections to a local UNIX socket. Every job names an operation and
+its arguments; an optional "id" is echoed in the response:
+
+    {"id": 1, "op": "split_layers", "args": {"input_file": "dxf-raw/Top.dxf", "output_file": "dxf/Top.dxf", "template_file": "dxf-template/Top.dxf"}}
+    {"id": 2, "op": "analyze", "args": {"paths": ["export/H2300xW600xD230_Mm18_Ms12/dxf"]}}
+    {"id": 3, "op": "create_order", "args": {"model_id": ["H2300xW600xD230_Mm18_Ms12"], "service": ["all"], "template_cache": "order/cache"}}
+    {"op": "shutdown"}
+
+split_layers takes the keyword arguments of split_layers.split_layers(), analyze
+takes the paths of analyze_dxf.py and create_order the options of create_order.py
+(model_id, service, template, template_cache). Relative paths are resolved
+against the working directory of the worker.
+
+For every job one JSON line is written back as soon as the job is done:
+
+    {"id": 1, "op": "split_layers", "ok": true, "result": {...}, "output": "...", "elapsed_s": 0.08}
+
+"output" holds what the job printed and logged; a failed job has "ok": false and
+an "error" message instead of a result, and the worker carries on with the next job.
+
+Jobs run one at a time. The parsed order templates stay in memory between
+create_order jobs; a template is parsed again when its file changes, so an
+edited order/template/*.xlsx is picked up by the next job. The order module (and
+with it order/PII.py) is only imported by the first create_order job.
+
+The code itself is imported once: restart the worker after changing
+split_layers.py, analyze_dxf.py or create_order.py.
+
+Usage:
+    python -m pipeline_worker serve [--socket <path>] [--quiet | --verbose]
+    python -m pipeline_worker submit --socket <path> < jobs.jsonl
+
+Example:
+    Get-Content jobs.jsonl | python -m pipeline_worker serve
+    python -m pipeline_worker serve --socket build/pipeline.sock
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import time
+
+# Imported up front so every job finds them warm
+import ezdxf
+import openpyxl
+
+import analyze_dxf
+import split_layers
+
+# Operation that stops the worker after answering it
+SHUTDOWN_OP = "shutdown"
+
+
+def run_split_layers(args):
+    """Layer one raw panel DXF; args are the keyword arguments of split_layers()."""
+    split_layers.split_layers(**args)
+    return {'output_file': args.get('output_file'), 'template_file': args.get('template_file')}
+
+
+def run_analyze(args):
+    """Inventory of the DXF files below args["paths"], as written by analyze_dxf.py --format json."""
+    dxf_files = analyze_dxf.find_dxf_files(args['paths'])
+    results = sorted((r for r in map(analyze_dxf.analyze_dxf, dxf_files) if r is not None), key=lambda r: r['file'])
+    return {'files': results, 'summary': analyze_dxf.summarize(results)}
+
+
+def run_create_order(args):
+    """Write the orders of args["model_id"] for args["service"] in this process."""
+    # Imported on first use: it needs the customer data in order/PII.py
+    import create_order
+
+    model_ids = args['model_id'] if isinstance(args['model_id'], list) else [args['model_id']]
+    services = args['service'] if isinstance(args['service'], list) else [args['service']]
+    templates = create_order.resolve_templates(services, args.get('template'))
+    timings, batch_elapsed = create_order.create_orders(model_ids, templates, jobs=1, template_cache=args.get('template_cache'))
+    create_order.print_timing_summary(timings, batch_elapsed)
+    return {
+        'orders': [
+            {'service': service, 'model_id': model_id, 'files': output_files, 'elapsed_s': elapsed}
+            for service, model_id, output_files, elapsed in timings
+        ],
+    }
+
+
+OPERATIONS = {
+    'split_layers': run_split_layers,
+    'analyze': run_analyze,
+    'create_order': run_create_order,
+}
+
+
+def run_job(job):
+    """Run one job and return its response; failures are reported, not raised."""
+    response = {'id': job.get('id'), 'op': job.get('op'), 'ok': False}
+    output = io.StringIO()
+    # The split_layers log handler writes to the stream it was created with
+    handlers = [handler for handler in split_layers.logger.handlers if isinstance(handler, logging.StreamHandler)]
+    previous_streams = [handler.setStream(output) for handler in handlers]
+    start = time.perf_counter()
+    try:
+        if job.get('op') not in OPERATIONS:
+            raise ValueError(f"Unknown op: {job.get('op')}. Expected one of {sorted(OPERATIONS)}")
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            response['result'] = OPERATIONS[job['op']](dict(job.get('args', {})))
+        response['ok'] = True
+    # A failing job must not take the worker and the jobs queued behind it down;
+    # SystemExit comes from the fail-fast checks of the scripts
+    except (Exception, SystemExit) as e:
+        response['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        for handler, stream in zip(handlers, previous_streams):
+            handler.setStream(stream)
+    response['elapsed_s'] = time.perf_counter() - start
+    response['output'] = output.getvalue()
+    return response
+
+
+def serve_lines(lines, reply):
+    """Answer every JSON job line in lines through reply(); returns False after a shutdown job."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            reply({'id': None, 'op': None, 'ok': False, 'error': f"Invalid job line: {e}"})
+            continue
+        if job.get('op') == SHUTDOWN_OP:
+            reply({'id': job.get('id'), 'op': SHUTDOWN_OP, 'ok': True})
+            return False
+        reply(run_job(job))
+    return True
+
+
+def line_writer(stream):
+    """Return a reply function writing one flushed JSON line per response."""
+    def reply(response):
+        stream.write(json.dumps(response) + "\n")
+        stream.flush()
+    return reply
+
+
+def serve_stdin():
+    # Responses own stdout; job output is captured into the response
+    serve_lines(sys.stdin, line_writer(sys.stdout))
+
+
+def serve_socket(path):
+    """Serve the connections to a UNIX socket one after the other until a shutdown job."""
+    if not hasattr(socket, 'AF_UNIX'):
+        raise OSError("UNIX sockets are not available on this platform; pipe the jobs to standard input instead")
+    if os.path.exists(path):
+        os.remove(path)
+
+    class JobHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = io.TextIOWrapper(self.rfile, encoding='utf-8')
+            replies = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+            if not serve_lines(lines, line_writer(replies)):
+                self.server.stopping = True
+
+    with socketserver.UnixStreamServer(path, JobHandler) as server:
+        server.stopping = False
+        print(f"Serving jobs on {path}", file=sys.stderr)
+        while not server.stopping:
+            server.handle_request()
+    os.remove(path)
+
+
+def submit(path):
+    """Send the job lines on standard input to a worker socket and print its responses."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        for line in sys.stdin:
+            if line.strip():
+                client.sendall(line.strip().encode('utf-8') + b"\n")
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile('r', encoding='utf-8') as responses:
+            for response in responses:
+                print(response, end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run split_layers, analyze and create_order jobs in one long-lived process.')
+    parser.add_argument('command', choices=['serve', 'submit'], help='serve: run the worker; submit: send jobs from standard input to a worker socket.')
+    parser.add_argument('--socket', metavar='PATH', help='UNIX socket to serve on or submit to (default for serve: standard input/output).')
+    log_level = parser.add_mutually_exclusive_group()
+    log_level.add_argument('--quiet', action='store_true', help='Only capture split_layers warnings and errors.')
+    log_level.add_argument('--verbose', action='store_true', help='Also capture per-entity split_layers details.')
+    args = parser.parse_args()
+
+    if args.command == 'submit':
+        if not args.socket:
+            parser.error("submit needs --socket")
+        submit(args.socket)
+        return
+
+    split_layers.configure_logging(logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO)
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stdin()
+
+
+if __name__ == "__main__":
+    main()
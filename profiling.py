@@ -0,0 +1,163 @@
+"""
+Phase-level wall time and memory profiling for the pipeline scripts.
+
+split_layers.py and create_order.py mark the phases of their work with phase().
+When profiling is enabled (--profile <path.json>) every phase records its wall
+time and the tracemalloc peak reached while it ran, grouped into one record per
+processed file together with the counts reported by add_counts(). When profiling
+is disabled all calls are no-ops.
+
+Phases are sequential: starting a phase ends the previous one of the same record.
+tracemalloc slows Python allocations down noticeably, so compare profiled runs
+with profiled runs only.
+
+Usage:
+    profiling.enable()
+    profiling.begin_record("DrawerSideRight.dxf")
+    profiling.phase("readfile")
+    ...
+    profiling.phase("save", output="DrawerSideRight.dxf")
+    ...
+    profiling.end_record()
+    profiling.write_profile("profile.json")
+
+Records collected in worker processes are returned by take_records() and merged
+in the parent process with extend_records().
+"""
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Collected records; None while profiling is disabled
+_records = None
+
+# Record and phase currently being measured
+_current_record = None
+_current_phase = None
+_phase_start = None
+_phase_start_memory = None
+_record_start = None
+
+# Wall clock start of the profiled run
+_run_start = None
+
+
+def enable():
+    """Start collecting records and tracing memory allocations."""
+    global _records, _run_start
+    if _records is not None:
+        return
+    _records = []
+    _run_start = time.perf_counter()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def is_enabled():
+    return _records is not None
+
+
+def begin_record(name, **info):
+    """Start the record of one processed file; ends the previous record if still open."""
+    global _current_record, _record_start
+    if _records is None:
+        return
+    end_record()
+    _current_record = {'file': name, **info, 'counts': {}, 'phases': []}
+    _record_start = time.perf_counter()
+    _records.append(_current_record)
+
+
+def phase(name, **info):
+    """End the running phase and start measuring a new one."""
+    global _current_phase, _phase_start, _phase_start_memory
+    if _current_record is None:
+        return
+    end_phase()
+    _current_phase = {'name': name, **info}
+    tracemalloc.reset_peak()
+    _phase_start_memory = tracemalloc.get_traced_memory()[0]
+    _phase_start = time.perf_counter()
+
+
+def end_phase():
+    """Stop measuring the running phase, if any."""
+    global _current_phase
+    if _current_phase is None:
+        return
+    wall_time = time.perf_counter() - _phase_start
+    current_memory, peak_memory = tracemalloc.get_traced_memory()
+    _current_phase['wall_time_s'] = wall_time
+    _current_phase['peak_memory_bytes'] = peak_memory
+    _current_phase['memory_delta_bytes'] = current_memory - _phase_start_memory
+    _current_record['phases'].append(_current_phase)
+    _current_phase = None
+
+
+def end_record():
+    """Close the running phase and the current record."""
+    global _current_record
+    if _current_record is None:
+        return
+    end_phase()
+    _current_record['wall_time_s'] = time.perf_counter() - _record_start
+    _current_record = None
+
+
+def add_counts(**counts):
+    """Add entity, hole or row counts to the current record."""
+    if _current_record is None:
+        return
+    _current_record['counts'].update(counts)
+
+
+def take_records():
+    """Return the records collected so far and start a new list."""
+    global _records
+    if _records is None:
+        return []
+    end_record()
+    records, _records = _records, []
+    return records
+
+
+def extend_records(records):
+    """Add records collected elsewhere, e.g. in a worker process."""
+    if _records is None:
+        return
+    _records.extend(records)
+
+
+def summarize_phases(records):
+    """Total wall time and maximum peak memory per phase name across all records."""
+    totals = {}
+    for record in records:
+        for entry in record['phases']:
+            total = totals.setdefault(entry['name'], {'count': 0, 'wall_time_s': 0.0, 'peak_memory_bytes': 0})
+            total['count'] += 1
+            total['wall_time_s'] += entry['wall_time_s']
+            total['peak_memory_bytes'] = max(total['peak_memory_bytes'], entry['peak_memory_bytes'])
+    return totals
+
+
+def write_profile(path):
+    """Write all records and the per-phase totals to a JSON file."""
+    if _records is None:
+        return
+    end_record()
+    profile = {
+        'command': [os.path.basename(sys.argv[0])] + sys.argv[1:],
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'wall_time_s': time.perf_counter() - _run_start,
+        'phase_totals': summarize_phases(_records),
+        'records': _records,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    print(f"Profile written to {path}")
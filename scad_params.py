@@ -0,0 +1,652 @@
+"""
+Evaluates the top-level parameters of model.scad without rendering the model.
+
+The top-level assignments of the OpenSCAD file (corpus_height,
+melanine_thickness_main, drawer_*, front_*, bookcase_*, model_identifier,
+panel_names, ...) are parsed and evaluated with OpenSCAD semantics: numbers,
+strings, booleans, undef and lists, the arithmetic, comparison, logical and
+conditional operators, indexing, str() and the common built-in functions, and
+the functions defined in the file. -D overrides replace the expression of a
+variable the way OpenSCAD's -D option does, so every value derived from it
+follows. Values print like OpenSCAD's str() does.
+
+The cut list of the generate_cut_list module, which only echoes str()
+expressions, can be written as a CSV file in the format of generate-csv.ps1.
+
+This takes milliseconds where an OpenSCAD run takes seconds. Constructs the
+evaluator does not cover (list comprehensions, let, include/use, ...) raise a
+ValueError naming them; use OpenSCAD for those.
+
+Usage:
+    python scad_params.py [<model.scad>] [-D name=value ...] [--get <name> ...] [--format text|json] [--cut-list <cut_list.csv>]
+
+Arguments:
+    model.scad: OpenSCAD file to evaluate (default: model.scad).
+    -D: Override a top-level variable with an OpenSCAD expression, e.g. -D corpus_height=2100 -D 'export_type="svg"'.
+    --get: Print only the values of these variables; list elements are printed one per line.
+    --format: text (default) prints "name = value" lines, json an object of all values.
+    --cut-list: Write the cut list echoed by the generate_cut_list module to this CSV file.
+
+Example:
+    python scad_params.py --get model_identifier
+    python scad_params.py model.scad -D melanine_thickness_main=19 -D melanine_thickness_secondary=12 --get model_identifier panel_names
+    python scad_params.py --cut-list export/H2300xW600xD230_Mm18_Ms10/cut_list.csv
+"""
+import argparse
+import csv
+import json
+import math
+import re
+import sys
+
+DEFAULT_MODEL_FILE = "model.scad"
+
+# Module whose echo statements make up the cut list, and the prefix of its CSV lines
+CUT_LIST_MODULE = "generate_cut_list"
+CUT_LIST_PREFIX = "CSV: "
+
+# Significant digits OpenSCAD uses when converting numbers to text
+NUMBER_DIGITS = 6
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<string>"(?:\\.|[^"\\])*")
+  | (?P<name>\$?[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<operator><=|>=|==|!=|&&|\|\||[-+*/%^<>!?:=(){}\[\],;.#])
+""", re.VERBOSE | re.DOTALL)
+
+STRING_ESCAPES = {'n': "\n", 't': "\t", 'r': "\r", '"': '"', '\\': "\\"}
+
+KEYWORD_VALUES = {'true': True, 'false': False, 'undef': None, 'PI': math.pi}
+
+# Binary operators by precedence, lowest first; the conditional operator ?: binds weaker still
+BINARY_PRECEDENCE = [["||"], ["&&"], ["==", "!="], ["<", "<=", ">", ">="], ["+", "-"], ["*", "/", "%"]]
+
+# Expression syntax the evaluator does not implement
+UNSUPPORTED_NAMES = {'let', 'for', 'each', 'assert', 'function', 'include', 'use'}
+
+# Member access on vectors
+MEMBER_INDEX = {'x': 0, 'y': 1, 'z': 2}
+
+
+class Function:
+    """A function defined in the OpenSCAD file."""
+
+    def __init__(self, name, parameters, body):
+        self.name = name
+        self.parameters = parameters
+        self.body = body
+
+
+def tokenize(text):
+    """Split OpenSCAD source into (kind, value) tokens, dropping whitespace and comments."""
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            line = text.count("\n", 0, position) + 1
+            raise ValueError(f"Unexpected character {text[position]!r} on line {line}")
+        kind = match.lastgroup
+        value = match.group()
+        position = match.end()
+        if kind == 'number':
+            tokens.append((kind, float(value)))
+        elif kind == 'string':
+            tokens.append((kind, re.sub(r"\\(.)", lambda m: STRING_ESCAPES.get(m.group(1), m.group(1)), value[1:-1])))
+        elif kind != 'space':
+            tokens.append((kind, value))
+    return tokens
+
+
+class Parser:
+    """Recursive descent parser of OpenSCAD expressions into nested tuples."""
+
+    def __init__(self, tokens, position=0):
+        self.tokens = tokens
+        self.position = position
+
+    def peek(self):
+        """Value of the next operator or name token; None at the end or before a literal."""
+        if self.position >= len(self.tokens) or self.tokens[self.position][0] in ('number', 'string'):
+            return None
+        return self.tokens[self.position][1]
+
+    def take(self, expected=None):
+        if self.position >= len(self.tokens):
+            raise ValueError("Unexpected end of file")
+        kind, value = self.tokens[self.position]
+        if expected is not None and (kind in ('number', 'string') or value != expected):
+            raise ValueError(f"Expected {expected!r}, found {value!r}")
+        self.position += 1
+        return kind, value
+
+    def expression(self):
+        condition = self.binary(0)
+        if self.peek() != "?":
+            return condition
+        self.take("?")
+        if_true = self.expression()
+        self.take(":")
+        return ('?', condition, if_true, self.expression())
+
+    def binary(self, level):
+        if level == len(BINARY_PRECEDENCE):
+            return self.unary()
+        left = self.binary(level + 1)
+        while self.tokens_left() and self.tokens[self.position][0] == 'operator' and self.peek() in BINARY_PRECEDENCE[level]:
+            operator = self.take()[1]
+            left = ('binary', operator, left, self.binary(level + 1))
+        return left
+
+    def unary(self):
+        if self.tokens_left() and self.tokens[self.position][0] == 'operator' and self.peek() in ("-", "+", "!"):
+            operator = self.take()[1]
+            return ('unary', operator, self.unary())
+        return self.postfix(self.primary())
+
+    def postfix(self, node):
+        while True:
+            if self.peek() == "(":
+                node = ('call', node, self.arguments())
+            elif self.peek() == "[":
+                self.take("[")
+                index = self.expression()
+                self.take("]")
+                node = ('index', node, index)
+            elif self.peek() == ".":
+                self.take(".")
+                member = self.take()[1]
+                if member not in MEMBER_INDEX:
+                    raise ValueError(f"Unknown member .{member}")
+                node = ('index', node, ('literal', float(MEMBER_INDEX[member])))
+            else:
+                return node
+
+    def arguments(self):
+        """Parse "(a, name=b, ...)" into a list of (name or None, expression)."""
+        self.take("(")
+        arguments = []
+        while self.peek() != ")":
+            name = None
+            if self.tokens[self.position][0] == 'name' and self.position + 1 < len(self.tokens) and self.tokens[self.position + 1][1] == "=":
+                name = self.take()[1]
+                self.take("=")
+            arguments.append((name, self.expression()))
+            if self.peek() != ")":
+                self.take(",")
+        self.take(")")
+        return arguments
+
+    def primary(self):
+        kind, value = self.take()
+        if kind in ('number', 'string'):
+            return ('literal', value)
+        if kind == 'name':
+            if value in KEYWORD_VALUES:
+                return ('literal', KEYWORD_VALUES[value])
+            if value in UNSUPPORTED_NAMES:
+                raise ValueError(f"'{value}' expressions are not supported")
+            return ('name', value)
+        if value == "(":
+            node = self.expression()
+            self.take(")")
+            return node
+        if value == "[":
+            items = []
+            while self.peek() != "]":
+                if self.peek() in UNSUPPORTED_NAMES:
+                    raise ValueError(f"'{self.peek()}' list comprehensions are not supported")
+                items.append(self.expression())
+                if self.peek() == ":":
+                    raise ValueError("Ranges are only supported in for loops, which are not evaluated")
+                if self.peek() != "]":
+                    self.take(",")
+            self.take("]")
+            return ('list', items)
+        raise ValueError(f"Unexpected {value!r} in expression")
+
+    def tokens_left(self):
+        return self.position < len(self.tokens)
+
+
+def skip_statement(tokens, position):
+    """Return the position after the statement starting at position (module calls, if/else, blocks)."""
+    depth = 0
+    while position < len(tokens):
+        kind, value = tokens[position]
+        position += 1
+        if kind != 'operator':
+            continue
+        if value in ("(", "["):
+            depth += 1
+        elif value in (")", "]"):
+            depth -= 1
+        elif value == "{" and depth == 0:
+            position = skip_block(tokens, position - 1)
+            if position < len(tokens) and tokens[position] != ('name', "else"):
+                return position
+        elif value == ";" and depth == 0:
+            if position < len(tokens) and tokens[position] == ('name', "else"):
+                continue
+            return position
+    return position
+
+
+def skip_block(tokens, position):
+    """Return the position after the {...} block starting at position."""
+    depth = 0
+    for index in range(position, len(tokens)):
+        if tokens[index] == ('operator', "{"):
+            depth += 1
+        elif tokens[index] == ('operator', "}"):
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    raise ValueError("Unterminated block")
+
+
+def parse_parameters(parser):
+    """Parse "(a, b=default, ...)" of a function or module definition."""
+    parameters = []
+    for name, default in parser.arguments():
+        if name is None:
+            if default[0] != 'name':
+                raise ValueError("Invalid parameter list")
+            parameters.append((default[1], None))
+        else:
+            parameters.append((name, default))
+    return parameters
+
+
+def parse_model(text):
+    """Parse the top level of an OpenSCAD file.
+
+    Returns the assignments as an ordered dict of name -> expression (a
+    reassigned variable keeps its first position and takes its last
+    expression, like in OpenSCAD), the functions and the modules as
+    name -> (parameters, body tokens).
+    """
+    tokens = tokenize(text)
+    assignments = {}
+    functions = {}
+    modules = {}
+    position = 0
+    while position < len(tokens):
+        kind, value = tokens[position]
+        if kind == 'name' and value in ("include", "use"):
+            raise ValueError(f"'{value}' statements are not supported")
+        if kind == 'name' and value == "function":
+            parser = Parser(tokens, position + 1)
+            name = parser.take()[1]
+            parameters = parse_parameters(parser)
+            parser.take("=")
+            functions[name] = Function(name, parameters, parser.expression())
+            parser.take(";")
+            position = parser.position
+        elif kind == 'name' and value == "module":
+            parser = Parser(tokens, position + 1)
+            name = parser.take()[1]
+            parameters = parse_parameters(parser)
+            end = skip_statement(tokens, parser.position)
+            modules[name] = (parameters, tokens[parser.position:end])
+            position = end
+        elif kind == 'name' and position + 1 < len(tokens) and tokens[position + 1] == ('operator', "="):
+            parser = Parser(tokens, position + 2)
+            assignments[value] = parser.expression()
+            parser.take(";")
+            position = parser.position
+        else:
+            position = skip_statement(tokens, position)
+    return assignments, functions, modules
+
+
+def is_number(value):
+    return isinstance(value, float) and not isinstance(value, bool)
+
+
+def is_truthy(value):
+    """OpenSCAD truthiness: false, 0, "", [] and undef are false."""
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if is_number(value):
+        return value != 0
+    return len(value) > 0
+
+
+def values_equal(left, right):
+    """OpenSCAD ==: values of different types are never equal (true != 1)."""
+    if isinstance(left, bool) != isinstance(right, bool):
+        return False
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(values_equal(a, b) for a, b in zip(left, right))
+    return type(left) is type(right) and left == right
+
+
+def divide(left, right):
+    if right == 0:
+        return math.nan if left == 0 else math.copysign(math.inf, left)
+    return left / right
+
+
+ARITHMETIC = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': divide,
+    '%': lambda a, b: math.fmod(a, b) if b != 0 else math.nan,
+}
+
+
+def arithmetic(operator, left, right):
+    """Apply an arithmetic operator to numbers and vectors; other combinations are undef."""
+    if is_number(left) and is_number(right):
+        return ARITHMETIC[operator](left, right)
+    if operator in "+-" and isinstance(left, list) and isinstance(right, list):
+        if len(left) != len(right):
+            return None
+        return [arithmetic(operator, a, b) for a, b in zip(left, right)]
+    if operator in "*/" and isinstance(left, list) and is_number(right):
+        return [arithmetic(operator, a, right) for a in left]
+    if operator == "*" and is_number(left) and isinstance(right, list):
+        return [arithmetic(operator, left, b) for b in right]
+    return None
+
+
+def compare(operator, left, right):
+    if not ((is_number(left) and is_number(right)) or (isinstance(left, str) and isinstance(right, str))):
+        return None
+    if operator == "<":
+        return left < right
+    if operator == "<=":
+        return left <= right
+    if operator == ">":
+        return left > right
+    return left >= right
+
+
+def format_number(value):
+    """Format a number like OpenSCAD's str(): 6 significant digits, no trailing zeros."""
+    if math.isnan(value):
+        return "nan"
+    if math.isinf(value):
+        return "inf" if value > 0 else "-inf"
+    text = f"{value:.{NUMBER_DIGITS}g}"
+    return "0" if text == "-0" else text
+
+
+def format_value(value, quote_strings=False):
+    """Convert a value to text like OpenSCAD's str(); strings inside lists are quoted."""
+    if value is None:
+        return "undef"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if is_number(value):
+        return format_number(value)
+    if isinstance(value, str):
+        return json.dumps(value) if quote_strings else value
+    return "[" + ", ".join(format_value(item, quote_strings=True) for item in value) + "]"
+
+
+def builtin_str(*values):
+    return "".join(format_value(value) for value in values)
+
+
+def builtin_len(value):
+    return float(len(value)) if isinstance(value, (str, list)) else None
+
+
+def numeric(function):
+    """Wrap a math function so non-numeric arguments give undef, as in OpenSCAD."""
+    def wrapped(*values):
+        if not values or not all(is_number(value) for value in values):
+            return None
+        return float(function(*values))
+    return wrapped
+
+
+def builtin_min_max(function):
+    def wrapped(*values):
+        if len(values) == 1 and isinstance(values[0], list):
+            values = values[0]
+        if not values or not all(is_number(value) for value in values):
+            return None
+        return function(values)
+    return wrapped
+
+
+def builtin_concat(*values):
+    result = []
+    for value in values:
+        result.extend(value if isinstance(value, list) else [value])
+    return result
+
+
+BUILTINS = {
+    'str': builtin_str,
+    'len': builtin_len,
+    'concat': builtin_concat,
+    'abs': numeric(abs),
+    'sign': numeric(lambda x: (x > 0) - (x < 0)),
+    'floor': numeric(math.floor),
+    'ceil': numeric(math.ceil),
+    # OpenSCAD rounds halves away from zero
+    'round': numeric(lambda x: math.copysign(math.floor(abs(x) + 0.5), x)),
+    'sqrt': numeric(lambda x: math.sqrt(x) if x >= 0 else math.nan),
+    'pow': numeric(math.pow),
+    'exp': numeric(math.exp),
+    'ln': numeric(math.log),
+    'log': numeric(math.log10),
+    'sin': numeric(lambda x: math.sin(math.radians(x))),
+    'cos': numeric(lambda x: math.cos(math.radians(x))),
+    'tan': numeric(lambda x: math.tan(math.radians(x))),
+    'min': builtin_min_max(min),
+    'max': builtin_min_max(max),
+    'is_undef': lambda value: value is None,
+    'is_bool': lambda value: isinstance(value, bool),
+    'is_num': lambda value: is_number(value),
+    'is_string': lambda value: isinstance(value, str),
+    'is_list': lambda value: isinstance(value, list),
+}
+
+
+def evaluate(node, variables, functions):
+    """Evaluate a parsed expression; variables and functions are name -> value / Function."""
+    kind = node[0]
+    if kind == 'literal':
+        return node[1]
+    if kind == 'name':
+        # Like OpenSCAD, an unknown or not yet assigned variable is undef
+        return variables.get(node[1])
+    if kind == 'list':
+        return [evaluate(item, variables, functions) for item in node[1]]
+    if kind == '?':
+        branch = node[2] if is_truthy(evaluate(node[1], variables, functions)) else node[3]
+        return evaluate(branch, variables, functions)
+    if kind == 'unary':
+        value = evaluate(node[2], variables, functions)
+        if node[1] == "!":
+            return not is_truthy(value)
+        if node[1] == "-":
+            return arithmetic("*", -1.0, value)
+        return value if is_number(value) or isinstance(value, list) else None
+    if kind == 'binary':
+        operator = node[1]
+        if operator == "&&":
+            return is_truthy(evaluate(node[2], variables, functions)) and is_truthy(evaluate(node[3], variables, functions))
+        if operator == "||":
+            return is_truthy(evaluate(node[2], variables, functions)) or is_truthy(evaluate(node[3], variables, functions))
+        left = evaluate(node[2], variables, functions)
+        right = evaluate(node[3], variables, functions)
+        if operator == "==":
+            return values_equal(left, right)
+        if operator == "!=":
+            return not values_equal(left, right)
+        if operator in ARITHMETIC:
+            return arithmetic(operator, left, right)
+        return compare(operator, left, right)
+    if kind == 'index':
+        container = evaluate(node[1], variables, functions)
+        index = evaluate(node[2], variables, functions)
+        if not isinstance(container, (str, list)) or not is_number(index) or not 0 <= index < len(container):
+            return None
+        return container[int(index)]
+    if kind == 'call':
+        return call(node, variables, functions)
+    raise ValueError(f"Unknown expression node {kind}")
+
+
+def call(node, variables, functions):
+    if node[1][0] != 'name':
+        raise ValueError("Only named functions can be called")
+    name = node[1][1]
+    arguments = [(argument_name, evaluate(expression, variables, functions)) for argument_name, expression in node[2]]
+    if name in functions:
+        function = functions[name]
+        scope = dict(variables)
+        names = [parameter for parameter, _ in function.parameters]
+        for parameter, default in function.parameters:
+            scope[parameter] = None if default is None else evaluate(default, variables, functions)
+        for index, (argument_name, value) in enumerate(arguments):
+            if argument_name is not None:
+                scope[argument_name] = value
+            elif index < len(names):
+                scope[names[index]] = value
+        return evaluate(function.body, scope, functions)
+    if name in BUILTINS:
+        if any(argument_name is not None for argument_name, _ in arguments):
+            raise ValueError(f"Named arguments are not supported for {name}()")
+        return BUILTINS[name](*(value for _, value in arguments))
+    raise ValueError(f"Unknown or unsupported function {name}()")
+
+
+def parse_override(override):
+    """Split a -D "name=expression" override into its name and parsed expression."""
+    name, separator, expression = override.partition("=")
+    name = name.strip()
+    if not separator or not re.fullmatch(r"\$?[A-Za-z_][A-Za-z_0-9]*", name):
+        raise ValueError(f"Invalid override {override!r}, expected name=value")
+    parser = Parser(tokenize(expression))
+    node = parser.expression()
+    if parser.tokens_left():
+        raise ValueError(f"Invalid override {override!r}: unexpected {parser.peek()!r}")
+    return name, node
+
+
+def load_model(model_file=DEFAULT_MODEL_FILE, overrides=()):
+    """Parse model_file and evaluate its top-level variables.
+
+    overrides are "name=expression" strings applied like OpenSCAD's -D option.
+    Returns a dict with the evaluated 'variables' (in file order), their
+    parsed 'assignments', the 'functions' and the 'modules' of the file.
+    """
+    with open(model_file, 'r', encoding='utf-8') as f:
+        assignments, functions, modules = parse_model(f.read())
+    for override in overrides:
+        name, node = parse_override(override)
+        assignments[name] = node
+    variables = {}
+    for name, node in assignments.items():
+        variables[name] = evaluate(node, variables, functions)
+    return {'variables': variables, 'assignments': assignments, 'functions': functions, 'modules': modules}
+
+
+def module_echo_arguments(model, module_name):
+    """Parse the echo() statements of a parameterless module that contains nothing else.
+
+    Returns one list of argument expressions per echo statement.
+    """
+    if module_name not in model['modules']:
+        raise ValueError(f"Module {module_name} not found")
+    parameters, body = model['modules'][module_name]
+    if parameters:
+        raise ValueError(f"Module {module_name} has parameters; only parameterless modules are supported")
+    if body[:1] != [('operator', "{")]:
+        raise ValueError(f"Module {module_name} has no block body")
+    echoes = []
+    parser = Parser(body[:-1], 1)
+    while parser.tokens_left():
+        if parser.peek() != "echo":
+            raise ValueError(f"Module {module_name} contains {parser.peek()!r}; only echo() statements are supported")
+        parser.take("echo")
+        echoes.append([expression for _, expression in parser.arguments()])
+        parser.take(";")
+    return echoes
+
+
+def module_echoes(model, module_name):
+    """Evaluate the echo() statements of a module; returns one list of argument values per statement."""
+    return [
+        [evaluate(expression, model['variables'], model['functions']) for expression in arguments]
+        for arguments in module_echo_arguments(model, module_name)
+    ]
+
+
+def cut_list_rows(model):
+    """The rows of the cut list echoed by generate_cut_list, header first."""
+    lines = []
+    for values in module_echoes(model, CUT_LIST_MODULE):
+        if len(values) == 1 and isinstance(values[0], str) and values[0].startswith(CUT_LIST_PREFIX):
+            lines.append(values[0][len(CUT_LIST_PREFIX):])
+    return list(csv.reader(lines))
+
+
+def write_cut_list(model, csv_file):
+    """Write the cut list quoted like PowerShell's Export-Csv; returns the number of data rows."""
+    rows = cut_list_rows(model)
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f, quoting=csv.QUOTE_ALL).writerows(rows)
+    return len(rows) - 1
+
+
+def json_value(value):
+    """Integral numbers as JSON integers, the way they print in OpenSCAD."""
+    if is_number(value) and value.is_integer():
+        return int(value)
+    if isinstance(value, list):
+        return [json_value(item) for item in value]
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate the top-level parameters of an OpenSCAD model without rendering it.')
+    parser.add_argument('model_file', nargs='?', default=DEFAULT_MODEL_FILE, help=f'OpenSCAD file (default: {DEFAULT_MODEL_FILE}).')
+    parser.add_argument('-D', dest='overrides', action='append', default=[], metavar='NAME=VALUE', help='Override a top-level variable with an OpenSCAD expression.')
+    parser.add_argument('--get', nargs='+', metavar='NAME', help='Print only these variables; list elements one per line.')
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='Output format.')
+    parser.add_argument('--cut-list', metavar='CSV', help='Write the cut list echoed by the generate_cut_list module to this CSV file.')
+    args = parser.parse_args()
+
+    model = load_model(args.model_file, args.overrides)
+    variables = model['variables']
+
+    if args.cut_list:
+        count = write_cut_list(model, args.cut_list)
+        print(f"Cut list saved to: {args.cut_list} ({count} lines)")
+        if not args.get:
+            return
+
+    names = args.get or list(variables)
+    for name in names:
+        if name not in variables:
+            print(f"Error: variable {name} is not assigned at the top level of {args.model_file}")
+            sys.exit(1)
+
+    if args.format == 'json':
+        json.dump({name: json_value(variables[name]) for name in names}, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif args.get:
+        for name in names:
+            value = variables[name]
+            for item in (value if isinstance(value, list) else [value]):
+                print(format_value(item))
+    else:
+        for name in names:
+            print(f"{name} = {format_value(variables[name], quote_strings=True)}")
+
+
+if __name__ == "__main__":
+    main()
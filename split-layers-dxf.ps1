@@ -41,41 +41,17 @@ Write-Host "Python script: $splitLayersScript"
 Assert-DirectoryExists -Path $outputDir
 Assert-DirectoryExists -Path $outputDirTemplate
 
-# Get all DXF files from the input directory
-$dxfFiles = Get-ChildItem -Path $inputDir -Filter *.dxf -Recurse
-
-if ($dxfFiles.Count -eq 0) {
-    Write-Output "No DXF files found in '$inputDir'."
-    exit 0
-}
-
-Write-Output "Found $($dxfFiles.Count) DXF files to process."
-
-# Loop through each DXF file and process it
-foreach ($file in $dxfFiles) {
-    $inputFile = $file.FullName
-    $outputFile = Join-Path $outputDir $file.Name
-    Write-Output "Processing '$($file.Name)' ... "
-
-    # Execute the python script
-    # Write-Output "$pythonPath $splitLayersScript $inputFile $outputFile 2>&1"
-    & $pythonPath $splitLayersScript $inputFile $outputFile 2>&1
-
-    if ($LASTEXITCODE -ne 0) {
-        Write-Error "Failed to process '$($file.Name)'. Please check the split_layers.py script."
-        exit 1
-    }
-
-    # Create the template DXF file (no dimension, title, legend and no hole schedule)
-    $outputFile = Join-Path $outputDirTemplate $file.Name
-    # Execute the python script
-    # Write-Output "$pythonPath $splitLayersScript $inputFile $outputFile 2>&1"
-    & $pythonPath $splitLayersScript $inputFile $outputFile --template 2>&1
-
-    if ($LASTEXITCODE -ne 0) {
-        Write-Error "Failed to process '$($file.Name)'. Please check the split_layers.py script."
-        exit 1
-    }
+# Process all DXF files with a single Python invocation. The batch mode fans the
+# panels out over a pool of worker processes, largest file first, and creates
+# both the full drawing and the template DXF file (no dimension, title, legend
+# and no hole schedule) for every panel.
+Write-Output "Processing DXF files in '$inputDir' ... "
+# Write-Output "$pythonPath $splitLayersScript --input-dir $inputDir --output-dir $outputDir --template-dir $outputDirTemplate 2>&1"
+& $pythonPath $splitLayersScript --input-dir $inputDir --output-dir $outputDir --template-dir $outputDirTemplate 2>&1
+
+if ($LASTEXITCODE -ne 0) {
+    Write-Error "Failed to process DXF files in '$inputDir'. Please check the split_layers.py script."
+    exit 1
 }
 
 Write-Output "All DXF files processed successfully."
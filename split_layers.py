@@ -8,14 +8,48 @@ The script is designed to prepare DXF files for CNC machining, separating cuttin
 paths from drilling operations and providing clear annotations and dimensions.
 
 Usage:
-    python split_layers.py <input_dxf_file> <output_dxf_file>
+    python split_layers.py <input_dxf_file> <output_dxf_file> [--template | --template-file <template_dxf_file>]
+    python split_layers.py --input-dir <dxf_raw_dir> --output-dir <dxf_dir> [--template-dir <dxf_template_dir>] [--jobs N]
 
 Arguments:
     input_dxf_file: Path to the input DXF file.
     output_dxf_file: Path where the processed DXF file will be saved.
+    --template: Generate a clean drilling template (no dimensions, title, legend or hole schedule).
+    --template-file: Also write the drilling template of the input to this file; the input is parsed
+                     once for both drawings.
+    --input-dir: Batch mode. Process every DXF file found in this directory.
+    --output-dir: Batch mode. Directory for the processed DXF files.
+    --template-dir: Batch mode. Optional directory for the drilling template DXF files.
+    --jobs: Batch mode. Number of worker processes (defaults to the number of CPUs).
+    --weld-tolerance: Distance below which LINE endpoints are joined when looking for holes.
+    --profile: Write the wall time and tracemalloc peak of every processing phase, and the
+               entity and hole counts of every file, to this JSON file.
+    --dim-style: linear (default) adds a linear dimension for every hole coordinate on all four sides;
+                 ordinate adds one ordinate dimension per cluster of coordinates, measured from the panel origin.
+    --dim-cluster-tolerance: Ordinate mode. Hole coordinates within this distance of the first coordinate
+                             of their group share its dimension.
+    --hole-marks: blocks (default) places every drill mark with its labels as an INSERT of a shared
+                  BLOCK carrying the NAME, D, H and Z attributes; entities draws separate lines, circles and texts.
+    --hole-table: compact (default) groups identical holes into one MTEXT row with their count and positions,
+                  in columns of limited height; rows that do not fit go to extra "Hole schedule N" A4 layouts.
+                  cells writes one TEXT per cell and hole.
+    --hole-db, --model-id: Read the holes of the model from the hole database written by hole_db.py
+                           instead of the CSV next to each input DXF.
+    --quiet: Only print warnings and errors.
+    --verbose: Also print per-entity details (slots, recovered circles, annotations) and entity statistics.
+               By default one summary line with the slot, circle and retired entity counts is printed per file.
+    --verify: fast (default) streams the saved file and checks its layers and entity counts;
+              full reloads the saved file with ezdxf.
 
 Example:
     python split_layers.py "export/H2300xW600xD230_Mm18_Ms12/dxf-raw/DrawerSideRight.dxf" "export/H2300xW600xD230_Mm18_Ms12/dxf/DrawerSideRight.dxf"
+    python split_layers.py --input-dir "export/H2300xW600xD230_Mm18_Ms12/dxf-raw" --output-dir "export/H2300xW600xD230_Mm18_Ms12/dxf" --template-dir "export/H2300xW600xD230_Mm18_Ms12/dxf-template" --jobs 4
+
+In batch mode the panels are processed in a pool of worker processes, largest
+file first, so the total run time is bounded by the largest panel rather than by
+the sum of all panels. A per-file timing summary is printed at the end.
+Each panel is parsed once: the drilling template is written first and the
+annotated full drawing is built on top of the same layered geometry.
 
 The script expects an optional CSV file with the same base name as the input DXF
 (e.g., `panel_drawing.csv`) containing hole information. The CSV should have
@@ -28,13 +62,117 @@ import csv
 import os
 import ezdxf.units
 import math
+import inspect
+import numpy as np
+import argparse
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing
+from ezdxf.tools.text import ParagraphProperties
+import profiling
+from hole_db import connect as connect_hole_db, panel_hole_rows
+
+logger = logging.getLogger("split_layers")
+
+# Log records are printed as plain lines, like the output of the PowerShell wrappers
+LOG_FORMAT = "%(message)s"
 
 # Threshold for slot detection (in DXF units, e.g., mm)
 SLOT_MAX_SIZE = 10.0
 
+# Distance below which LINE endpoints are welded together (in DXF units, e.g., mm)
+LINE_WELD_TOLERANCE = 0.001
+
+# Offsets of the eight grid cells surrounding a cell
+NEIGHBOUR_CELLS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+
+# Minimum number of distinct points for a polyline or loop of lines to be fitted as a circle
+CIRCLE_FIT_MIN_POINTS = 5
+
+# Maximum RMS distance of the points from the fitted circle, relative to its radius
+CIRCLE_FIT_MAX_RMS_RATIO = 0.01
+
+# Hole marks: one INSERT of a shared hole BLOCK per hole, or separate entities
+HOLE_MARK_STYLES = ["blocks", "entities"]
+
+# Drill mark blocks and their geometry (mm): a cross with arms of the given
+# length and a small circle; side holes get a larger, blue cross
+FACE_MARK_BLOCK = "HOLE_FACE_MARK"
+SIDE_MARK_BLOCK = "HOLE_SIDE_MARK"
+FACE_MARK_SIZE = 3.0
+SIDE_MARK_SIZE = 6.0
+SIDE_MARK_COLOR = 5
+HOLE_MARK_RADIUS = 1.5
+
+# Hole labels: text height and offsets of the name and the d/h/z label above the hole (mm)
+HOLE_LABEL_HEIGHT = 2.5
+HOLE_NAME_OFFSET = 10
+HOLE_LABEL_OFFSET = 5
+HOLE_NAME_TAG = "NAME"
+
+# Dimensioning modes: one linear dimension per hole coordinate on all four
+# sides, or one ordinate dimension per coordinate cluster from the panel origin
+DIM_STYLES = ["linear", "ordinate"]
+
+# Hole coordinates within this distance of the first one of their group share its ordinate dimension (in DXF units, e.g., mm)
+DIM_CLUSTER_TOLERANCE = 1.0
+
+# Ordinate leader length and number of stagger levels for neighbouring texts (mm)
+DIM_ORDINATE_LEADER = 20.0
+DIM_ORDINATE_STAGGER_LEVELS = 3
+
+# Room taken by an ordinate text (horizontal, dimension text height 9): along
+# the text and across it (mm). X ordinates are spaced along the text and
+# staggered across it, Y ordinates the other way around.
+DIM_ORDINATE_TEXT_WIDTH = 45.0
+DIM_ORDINATE_TEXT_HEIGHT = 12.0
+
+# Hole schedule modes: one MTEXT row per group of identical holes, or one TEXT per cell and hole
+HOLE_TABLE_STYLES = ["compact", "cells"]
+
+# Text height of the hole schedule in modelspace and on the overflow page layouts (mm)
+HOLE_TABLE_TEXT_HEIGHT = 2.5
+HOLE_TABLE_PAGE_TEXT_HEIGHT = 2.0
+
+# Distance between schedule rows, as a multiple of the text height
+HOLE_TABLE_LINE_SPACING = 1.5
+
+# Compact schedule geometry in multiples of the text height, the unit of MTEXT tab
+# stops: tab stops of the Depth, Z, Qty and Positions cells, width of a schedule
+# column and gap between two columns
+HOLE_TABLE_TAB_STOPS = (5, 10, 15, 19)
+HOLE_TABLE_COLUMN_WIDTH = 60
+HOLE_TABLE_COLUMN_GAP = 4
+
+# Hole positions per schedule row; longer groups continue on further rows
+HOLE_TABLE_POSITIONS_PER_ROW = 3
+
+# Rows per schedule column and columns per page. The first page is drawn next to
+# the panel, the following pages on their own A4 layouts, so the modelspace
+# footprint of the schedule is bounded whatever the number of holes.
+HOLE_TABLE_MAX_ROWS = 40
+HOLE_TABLE_MAX_COLUMNS = 2
+
+# Name prefix of the layouts holding the overflow pages of the hole schedule
+HOLE_TABLE_LAYOUT = "Hole schedule"
+
+# Paper size and margins of the A4 landscape layouts (mm)
+A4_SIZE = (297, 210)
+A4_MARGIN = 10
+
+# Line pitch of multi-line MTEXT at the default line spacing, as a multiple of the text height
+MTEXT_LINE_PITCH = 5 / 3
+
+# Layers that must be present in every saved file
+VERIFY_REQUIRED_LAYERS = ["CUT", "DRILL", "ANNOTATION", "DIMENSION"]
+
+# Structure tags and entity types that belong to a preceding entity, not counted on their own
+VERIFY_SKIPPED_TYPES = {"SECTION", "VERTEX", "SEQEND", "ATTRIB"}
+
 
 def add_hole_table(msp, holes, position):
-    """Adds a table of hole information to the DXF."""
+    """Adds a table of hole information to the DXF, one TEXT per cell and hole."""
     if not holes:
         return position[1]
 
@@ -102,219 +240,494 @@ def add_hole_table(msp, holes, position):
     return y_start
 
 
-def add_hole_annotations_from_csv(msp, input_file):
-    """Read a CSV file with the same name as the input DXF and add hole annotations."""
+def group_hole_schedule_rows(holes, positions_per_row=HOLE_TABLE_POSITIONS_PER_ROW):
+    """Group identical holes and return the rows of the compact hole schedule.
+
+    Holes with the same diameter, depth and Z form one group. Each row is a list
+    of cell texts (diameter, depth, Z, count, positions); the count is given on
+    the first row of a group and its positions continue on further rows.
+    """
+    groups = {}
+    for hole in holes:
+        groups.setdefault((hole['diameter'], hole['depth'], hole['z']), []).append(hole)
+
+    rows = []
+    for (diameter, depth, z), group in sorted(groups.items()):
+        positions = [f"({hole['x']:g}, {hole['y']:g})" for hole in sorted(group, key=lambda h: (h['x'], h['y']))]
+        for start in range(0, len(positions), positions_per_row):
+            count = str(len(group)) if start == 0 else ""
+            rows.append([f"{diameter:g}", f"{depth:g}", f"{z:g}", count, "  ".join(positions[start:start + positions_per_row])])
+    return rows
+
+
+def add_hole_schedule_page(layout, rows, position, text_height, title):
+    """Write one page of the compact hole schedule to a layout.
+
+    The rows fill columns of up to HOLE_TABLE_MAX_ROWS side by side. Every row,
+    including the column header, is a single MTEXT whose cells are separated by
+    tabs. Returns the y coordinate below the tallest column.
+    """
+    x_start, y_start = position
+    line_height = text_height * HOLE_TABLE_LINE_SPACING
+    column_width = HOLE_TABLE_COLUMN_WIDTH * text_height
+    column_pitch = (HOLE_TABLE_COLUMN_WIDTH + HOLE_TABLE_COLUMN_GAP) * text_height
+    tab_stops = ParagraphProperties(tab_stops=HOLE_TABLE_TAB_STOPS).tostring()
+
+    def add_row(cells, x, y):
+        # MTEXT is attached at its top left corner, TEXT at its baseline
+        layout.add_mtext(
+            tab_stops + "\t".join(cells),
+            dxfattribs={
+                'layer': 'ANNOTATION',
+                'char_height': text_height,
+                'width': column_width,
+                'insert': (x, y + text_height)
+            }
+        )
+
+    layout.add_text(
+        title,
+        dxfattribs={
+            'layer': 'ANNOTATION',
+            'height': text_height * 1.5,
+            'insert': (x_start, y_start)
+        }
+    )
+    header_y = y_start - line_height * 2
+    first_row_y = header_y - line_height * 1.5  # Additional space to account for header underline
+
+    columns = [rows[i:i + HOLE_TABLE_MAX_ROWS] for i in range(0, len(rows), HOLE_TABLE_MAX_ROWS)]
+    for column_index, column_rows in enumerate(columns):
+        x = x_start + column_index * column_pitch
+        add_row(["Dia", "Depth", "Z", "Qty", "Positions (X, Y)"], x, header_y)
+        underline_y = header_y - text_height / 2
+        layout.add_line((x, underline_y), (x + column_width, underline_y), dxfattribs={'layer': 'ANNOTATION'})
+        for row_index, cells in enumerate(column_rows):
+            add_row(cells, x, first_row_y - row_index * line_height)
+
+    return first_row_y - max(len(column_rows) for column_rows in columns) * line_height
+
+
+def add_hole_schedule(doc, msp, holes, position):
+    """Adds a compact hole schedule with one row per group of identical holes.
+
+    The first HOLE_TABLE_MAX_ROWS x HOLE_TABLE_MAX_COLUMNS rows are drawn in
+    modelspace at position; further rows go to pages on extra A4 layouts named
+    "Hole schedule 2", "Hole schedule 3", ... so the drawing keeps a fixed
+    footprint. Returns the y coordinate below the modelspace part.
+    """
+    if not holes:
+        return position[1]
+
+    rows = group_hole_schedule_rows(holes)
+    page_size = HOLE_TABLE_MAX_ROWS * HOLE_TABLE_MAX_COLUMNS
+    pages = [rows[i:i + page_size] for i in range(0, len(rows), page_size)]
+
+    title = "Hole Schedule" if len(pages) == 1 else f"Hole Schedule (1/{len(pages)})"
+    bottom_y = add_hole_schedule_page(msp, pages[0], position, HOLE_TABLE_TEXT_HEIGHT, title)
+
+    page_position = (A4_MARGIN, A4_SIZE[1] - A4_MARGIN - HOLE_TABLE_PAGE_TEXT_HEIGHT * 1.5)
+    for number, page_rows in enumerate(pages[1:], start=2):
+        layout = new_a4_layout(doc, f"{HOLE_TABLE_LAYOUT} {number}")
+        add_hole_schedule_page(layout, page_rows, page_position, HOLE_TABLE_PAGE_TEXT_HEIGHT, f"Hole Schedule ({number}/{len(pages)})")
+
+    logger.debug("Hole schedule: %d holes in %d rows on %d pages", len(holes), len(rows), len(pages))
+    profiling.add_counts(hole_schedule_rows=len(rows), hole_schedule_pages=len(pages))
+    return bottom_y
+
+
+def format_hole_label(diameter, depth, z):
+    """Text of the second hole label: diameter, depth and, for side holes, the Z coordinate."""
+    if z != 0:
+        return f"d{diameter} h{depth} z{z}"
+    return f"d{diameter} h{depth}"
+
+
+def ensure_hole_mark_blocks(doc):
+    """Define the face and side drill mark BLOCKs once per document."""
+    for block_name, indicator_size, dxfattribs in [
+        (FACE_MARK_BLOCK, FACE_MARK_SIZE, {}),
+        (SIDE_MARK_BLOCK, SIDE_MARK_SIZE, {'color': SIDE_MARK_COLOR}),
+    ]:
+        if block_name in doc.blocks:
+            continue
+        # Entities on layer 0 take the layer of the INSERT (DRILL_MARKS)
+        block = doc.blocks.new(name=block_name)
+        block.add_line((-indicator_size / 2, 0), (indicator_size / 2, 0), dxfattribs=dxfattribs)
+        block.add_line((0, -indicator_size / 2), (0, indicator_size / 2), dxfattribs=dxfattribs)
+        block.add_circle((0, 0), HOLE_MARK_RADIUS, dxfattribs=dxfattribs)
+
+
+def get_hole_block(doc, diameter, depth, z):
+    """Return the name of the BLOCK for holes with this diameter, depth and Z, defining it on first use.
+
+    The block places the face or side drill mark, the fixed label text and the
+    constant, invisible D, H and Z attributes. Only the NAME attribute varies
+    per hole, so every hole costs a single INSERT with one ATTRIB.
+    """
+    label = format_hole_label(diameter, depth, z)
+    block_name = f"HOLE_{'SIDE' if z != 0 else 'FACE'}_{label}".replace(" ", "_").replace(".", "_")
+    if block_name in doc.blocks:
+        return block_name
+
+    ensure_hole_mark_blocks(doc)
+    block = doc.blocks.new(name=block_name)
+    block.add_blockref(SIDE_MARK_BLOCK if z != 0 else FACE_MARK_BLOCK, (0, 0))
+    block.add_text(label, dxfattribs={'layer': 'ANNOTATION', 'height': HOLE_LABEL_HEIGHT, 'insert': (0, HOLE_LABEL_OFFSET)})
+    block.add_attdef(HOLE_NAME_TAG, (0, HOLE_NAME_OFFSET), dxfattribs={'layer': 'ANNOTATION', 'height': HOLE_LABEL_HEIGHT})
+    for tag, value in [('D', diameter), ('H', depth), ('Z', z)]:
+        block.add_attdef(tag, (0, HOLE_LABEL_OFFSET), text=str(value), dxfattribs={
+            'layer': 'ANNOTATION',
+            'height': HOLE_LABEL_HEIGHT,
+            'flags': ezdxf.const.ATTRIB_CONST | ezdxf.const.ATTRIB_INVISIBLE,
+        })
+    return block_name
+
+
+def add_hole_mark_insert(msp, hole_name, x, y, z, diameter, depth):
+    """Place the drill mark and labels of a hole as an INSERT of its hole BLOCK."""
+    block_name = get_hole_block(msp.doc, diameter, depth, z)
+    insert = msp.add_blockref(block_name, (x, y), dxfattribs={'layer': 'DRILL_MARKS'})
+    insert.add_attrib(HOLE_NAME_TAG, hole_name, (x, y + HOLE_NAME_OFFSET), dxfattribs={'layer': 'ANNOTATION', 'height': HOLE_LABEL_HEIGHT})
+    # The bounds include the attributes, which are attached after the INSERT was added
+    msp.refresh(insert)
+
+
+def add_hole_mark_entities(msp, hole_name, x, y, z, diameter, depth):
+    """Draw the drill mark of a hole and its two labels as separate entities."""
+    if z != 0:
+        # Draw a small cross at the hole's (x,y) location
+        indicator_size = SIDE_MARK_SIZE # Length of each arm of the cross
+
+        # Horizontal line
+        msp.add_line(
+            start=(x - indicator_size / 2, y),
+            end=(x + indicator_size / 2, y),
+            dxfattribs={
+                'layer': 'DRILL_MARKS',
+                'color': SIDE_MARK_COLOR # Blue color for drill layer
+            }
+        )
+        # Vertical line
+        msp.add_line(
+            start=(x, y - indicator_size / 2),
+            end=(x, y + indicator_size / 2),
+            dxfattribs={
+                'layer': 'DRILL_MARKS',
+                'color': SIDE_MARK_COLOR # Blue color for drill layer
+            }
+        )
+        # Add a 3mm diameter circle
+        circle_radius = HOLE_MARK_RADIUS
+        msp.add_circle(
+            center=(x, y),
+            radius=circle_radius,
+            dxfattribs={
+                'layer': 'DRILL_MARKS',
+                'color': SIDE_MARK_COLOR # Blue color for drill layer
+            }
+        )
+        logger.debug("  - Added side hole indicator: d%s h%s z%s at (%s, %s)", diameter, depth, z, x, y)
+    else:
+        # Draw a small cross at the hole's (x,y) location on the DRILL_MARKS layer
+        indicator_size = FACE_MARK_SIZE # Length of each arm of the cross
+
+        # Horizontal line
+        msp.add_line(
+            start=(x - indicator_size / 2, y),
+            end=(x + indicator_size / 2, y),
+            dxfattribs={
+                'layer': 'DRILL_MARKS'
+            }
+        )
+        # Vertical line
+        msp.add_line(
+            start=(x, y - indicator_size / 2),
+            end=(x, y + indicator_size / 2),
+            dxfattribs={
+                'layer': 'DRILL_MARKS'
+            }
+        )
+        # Add a 3mm diameter circle
+        circle_radius = HOLE_MARK_RADIUS
+        msp.add_circle(
+            center=(x, y),
+            radius=circle_radius,
+            dxfattribs={
+                'layer': 'DRILL_MARKS'
+            }
+        )
+
+    # Create annotation text
+    hole_name_text = hole_name
+    dimension_text = format_hole_label(diameter, depth, z)
+
+    # Add hole name to the ANNOTATION layer
+    msp.add_text(
+        hole_name_text,
+        dxfattribs={
+            'layer': 'ANNOTATION',
+            'height': HOLE_LABEL_HEIGHT,
+            'insert': (x, y + HOLE_NAME_OFFSET)
+        }
+    )
+
+    # Add dimension text to the ANNOTATION layer
+    msp.add_text(
+        dimension_text,
+        dxfattribs={
+            'layer': 'ANNOTATION',
+            'height': HOLE_LABEL_HEIGHT,
+            'insert': (x, y + HOLE_LABEL_OFFSET)
+        }
+    )
+
+
+def read_hole_rows(input_file, hole_db=None, model_id=None):
+    """Return the hole rows (panel_name, hole_name, x, y, z, diameter, depth, nx, ny, nz) of the input DXF.
+
+    Without hole_db the rows come from the CSV file with the same name as the
+    input DXF; with hole_db they are queried from that hole database (see
+    hole_db.py) for the panel named like the input DXF in model model_id.
+    """
+    panel_name = os.path.splitext(os.path.basename(input_file))[0]
+    if hole_db:
+        if not os.path.exists(hole_db):
+            raise FileNotFoundError(f"Hole database not found: {hole_db}")
+        with closing(connect_hole_db(hole_db)) as connection:
+            rows = panel_hole_rows(connection, model_id, panel_name)
+        logger.info("Found %d holes of %s / %s in %s", len(rows), model_id, panel_name, hole_db)
+        return rows
+
     csv_file = os.path.splitext(input_file)[0] + ".csv"
-    annotations_added = 0
-    holes = []
     if not os.path.exists(csv_file):
-        print(f"No annotation file found at: {csv_file}")
-        return annotations_added, holes
+        logger.info("No annotation file found at: %s", csv_file)
+        return []
 
-    print(f"Found annotation file: {csv_file}")
-    with open(csv_file, mode='r', newline='') as f:
-        # Skip the header row
-        next(f)
+    logger.info("Found annotation file: %s", csv_file)
+    # utf-8-sig: PowerShell 5 writes the CSV with a BOM
+    with open(csv_file, mode='r', newline='', encoding='utf-8-sig') as f:
         reader = csv.reader(f)
-        for row in reader:
-            try:
-                # Unpack row data
-                panel_name, hole_name, x, y, z, diameter, depth, nx, ny, nz = row
-                
-                # Convert numeric values
-                x = float(x)
-                y = float(y)
-                z = float(z)
-                diameter = float(diameter)
-                depth = float(depth)
-                nx = float(nx)
-                ny = float(ny)
-                nz = float(nz)
-
-                holes.append({
-                    "name": hole_name,
-                    "x": round(x, 2),
-                    "y": round(y, 2),
-                    "z": round(z, 2),
-                    "diameter": diameter,
-                    "depth": depth,
-                    "nx": round(nx, 2),
-                    "ny": round(ny, 2),
-                    "nz": round(nz, 2)
-                })
+        # Skip the header row
+        next(reader, None)
+        return list(reader)
+
+
+def add_hole_annotations_from_csv(msp, input_file, hole_marks="blocks", hole_db=None, model_id=None):
+    """Read the holes of the input DXF and add hole annotations.
+
+    The holes come from a CSV file with the same name as the input DXF, or from
+    the hole database hole_db, see read_hole_rows().
+
+    hole_marks selects how each hole is drawn: "blocks" places one INSERT of a
+    shared hole BLOCK with the hole name as attribute, "entities" draws the
+    mark lines, circle and label texts as separate entities.
+    """
+    if hole_marks not in HOLE_MARK_STYLES:
+        raise ValueError(f"Unknown hole mark style: {hole_marks}. Expected one of {HOLE_MARK_STYLES}")
+    annotations_added = 0
+    holes = []
+    for row in read_hole_rows(input_file, hole_db=hole_db, model_id=model_id):
+        try:
+            # Unpack row data
+            panel_name, hole_name, x, y, z, diameter, depth, nx, ny, nz = row
                 
-                if z != 0:
-                    # Draw a small cross at the hole's (x,y) location
-                    indicator_size = 6.0 # Length of each arm of the cross
-                    
-                    # Horizontal line
-                    msp.add_line(
-                        start=(x - indicator_size / 2, y),
-                        end=(x + indicator_size / 2, y),
-                        dxfattribs={
-                            'layer': 'DRILL_MARKS',
-                            'color': 5 # Blue color for drill layer
-                        }
-                    )
-                    # Vertical line
-                    msp.add_line(
-                        start=(x, y - indicator_size / 2),
-                        end=(x, y + indicator_size / 2),
-                        dxfattribs={
-                            'layer': 'DRILL_MARKS',
-                            'color': 5 # Blue color for drill layer
-                        }
-                    )
-                    # Add a 3mm diameter circle
-                    circle_radius = 1.5
-                    msp.add_circle(
-                        center=(x, y),
-                        radius=circle_radius,
-                        dxfattribs={
-                            'layer': 'DRILL_MARKS',
-                            'color': 5 # Blue color for drill layer
-                        }
-                    )
-                    print(f"  - Added side hole indicator: d{diameter} h{depth} z{z} at ({x}, {y})")
-                else:
-                    # Draw a small cross at the hole's (x,y) location on the DRILL_MARKS layer
-                    indicator_size = 3.0 # Length of each arm of the cross
-                    
-                    # Horizontal line
-                    msp.add_line(
-                        start=(x - indicator_size / 2, y),
-                        end=(x + indicator_size / 2, y),
-                        dxfattribs={
-                            'layer': 'DRILL_MARKS'
-                        }
-                    )
-                    # Vertical line
-                    msp.add_line(
-                        start=(x, y - indicator_size / 2),
-                        end=(x, y + indicator_size / 2),
-                        dxfattribs={
-                            'layer': 'DRILL_MARKS'
-                        }
-                    )
-                    # Add a 3mm diameter circle
-                    circle_radius = 1.5
-                    msp.add_circle(
-                        center=(x, y),
-                        radius=circle_radius,
-                        dxfattribs={
-                            'layer': 'DRILL_MARKS'
-                        }
-                    )
-
-                # Create annotation text
-                hole_name_text = hole_name
-                if z != 0:
-                    dimension_text = f"d{diameter} h{depth} z{z}"
-                else:
-                    dimension_text = f"d{diameter} h{depth}"
-
-                # Add hole name to the ANNOTATION layer
-                msp.add_text(
-                    hole_name_text,
-                    dxfattribs={
-                        'layer': 'ANNOTATION',
-                        'height': 2.5,
-                        'insert': (x, y + 10)
-                    }
-                )
+            # Convert numeric values
+            x = float(x)
+            y = float(y)
+            z = float(z)
+            diameter = float(diameter)
+            depth = float(depth)
+            nx = float(nx)
+            ny = float(ny)
+            nz = float(nz)
+
+            holes.append({
+                "name": hole_name,
+                "x": round(x, 2),
+                "y": round(y, 2),
+                "z": round(z, 2),
+                "diameter": diameter,
+                "depth": depth,
+                "nx": round(nx, 2),
+                "ny": round(ny, 2),
+                "nz": round(nz, 2)
+            })
                 
-                # Add dimension text to the ANNOTATION layer
-                msp.add_text(
-                    dimension_text,
-                    dxfattribs={
-                        'layer': 'ANNOTATION',
-                        'height': 2.5,
-                        'insert': (x, y + 5)
-                    }
-                )
-                print(f"  - Added annotation: {hole_name_text} / {dimension_text} at ({x}, {y})")
-                annotations_added += 2
-            except (ValueError, KeyError) as e:
-                print(f"  - Warning: Skipping invalid row in CSV: {row} ({e})")
+            if hole_marks == "blocks":
+                add_hole_mark_insert(msp, hole_name, x, y, z, diameter, depth)
+            else:
+                add_hole_mark_entities(msp, hole_name, x, y, z, diameter, depth)
+            logger.debug("  - Added annotation: %s / %s at (%s, %s)", hole_name, format_hole_label(diameter, depth, z), x, y)
+            annotations_added += 2
+        except (ValueError, KeyError) as e:
+            logger.warning("Skipping invalid hole row: %s (%s)", row, e)
     return annotations_added, holes
 
 
-def is_small_slot(poly):
+def is_small_slot(points, closed):
     """Return True if polyline is closed and small enough to be considered a drill/slot."""
-    if not poly.closed:
+    if not closed:
         return False
-    points = poly.get_points()
     xs = [p[0] for p in points]
     ys = [p[1] for p in points]
     width = max(xs) - min(xs)
     height = max(ys) - min(ys)
-    print(f"is_small_slot: width={width}, height={height}, max_size={SLOT_MAX_SIZE}")
+    logger.debug("is_small_slot: width=%s, height=%s, max_size=%s", width, height, SLOT_MAX_SIZE)
     return width <= SLOT_MAX_SIZE and height <= SLOT_MAX_SIZE
 
 
-def get_polyline_center_and_radius(points, closed):
-    """Check if a polyline represents a circle."""
-    # Ignore the `closed` parameter because it does not represent the reality (to be investigated why)
-    # print(f"get_polyline_center_and_radius: points[{len(points)}]={points}, closed={closed}")
-        
-    # Calculate the geometric center (centroid) of the points
-    sum_x = sum(p[0] for p in points)
-    sum_y = sum(p[1] for p in points)
-    center_x = sum_x / len(points)
-    center_y = sum_y / len(points)
-    center = (center_x, center_y)
-
-    # Calculate the distance of the first point from the center to get a candidate radius
-    radius = math.sqrt((points[0][0] - center_x)**2 + (points[0][1] - center_y)**2)
-    if radius >= SLOT_MAX_SIZE:
-        print(f"Polyline to big to consider as hole, radius={radius} > {SLOT_MAX_SIZE}")
-        return None, None
-
-    # Check if all other points are at a similar distance from the center
-    # Use a tolerance to account for floating-point inaccuracies
-    tolerance = 0.1  # Adjust as needed
-    for p in points:
-        dist = math.sqrt((p[0] - center_x)**2 + (p[1] - center_y)**2)
-        if not math.isclose(dist, radius, rel_tol=tolerance):
-            print(f"Polyline points not at the radius, dist={dist}, radius={radius}")
-            return None, None
-
-    return center, radius
-
-
-def group_lines_into_polylines(lines):
-    """Group connected LINE entities into polylines."""
+def fit_circles(point_lists):
+    """Fit a circle to every candidate point list in one batched least-squares solve.
+
+    The candidates are packed into a padded array and fitted with the algebraic
+    (Kasa) method. A fit is accepted when the candidate has at least
+    CIRCLE_FIT_MIN_POINTS points, its radius is below SLOT_MAX_SIZE and the RMS
+    distance of the points from the fitted circle is within
+    CIRCLE_FIT_MAX_RMS_RATIO of the radius. Returns a (center, radius) tuple per
+    candidate, with (None, None) for rejected candidates.
+    """
+    results = [(None, None)] * len(point_lists)
+
+    candidates = []
+    for i, points in enumerate(point_lists):
+        # A closed polyline may repeat its first point at the end
+        if len(points) > 1 and tuple(points[0][:2]) == tuple(points[-1][:2]):
+            points = points[:-1]
+        if len(points) >= CIRCLE_FIT_MIN_POINTS:
+            candidates.append((i, points))
+    if not candidates:
+        return results
+
+    # Pack the candidates into a zero padded (candidates x points x 2) array
+    max_points = max(len(points) for _, points in candidates)
+    xy = np.zeros((len(candidates), max_points, 2))
+    mask = np.zeros((len(candidates), max_points), dtype=bool)
+    for row, (_, points) in enumerate(candidates):
+        xy[row, :len(points)] = [(p[0], p[1]) for p in points]
+        mask[row, :len(points)] = True
+    counts = mask.sum(axis=1)
+
+    # Work relative to each candidate's centroid to keep the normal equations well conditioned
+    centroid = xy.sum(axis=1) / counts[:, None]
+    x = np.where(mask, xy[:, :, 0] - centroid[:, 0, None], 0.0)
+    y = np.where(mask, xy[:, :, 1] - centroid[:, 1, None], 0.0)
+    z = x * x + y * y
+
+    # Solve x^2 + y^2 = a*x + b*y + c for every candidate
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, syy, sxy = (x * x).sum(axis=1), (y * y).sum(axis=1), (x * y).sum(axis=1)
+    normal = np.stack([
+        np.stack([sxx, sxy, sx], axis=1),
+        np.stack([sxy, syy, sy], axis=1),
+        np.stack([sx, sy, counts.astype(float)], axis=1),
+    ], axis=1)
+    rhs = np.stack([(x * z).sum(axis=1), (y * z).sum(axis=1), z.sum(axis=1)], axis=1)
+    # The pseudo-inverse copes with degenerate (collinear) candidates; their residual rejects them
+    solution = (np.linalg.pinv(normal) @ rhs[:, :, None])[:, :, 0]
+    cx, cy = solution[:, 0] / 2, solution[:, 1] / 2
+    radius_squared = solution[:, 2] + cx * cx + cy * cy
+    radius = np.sqrt(np.maximum(radius_squared, 0.0))
+
+    distance = np.sqrt((x - cx[:, None]) ** 2 + (y - cy[:, None]) ** 2)
+    residual = np.where(mask, distance - radius[:, None], 0.0)
+    rms = np.sqrt((residual * residual).sum(axis=1) / counts)
+
+    accepted = (radius_squared > 0) & (radius < SLOT_MAX_SIZE) & (rms <= CIRCLE_FIT_MAX_RMS_RATIO * radius)
+    for row, (i, _) in enumerate(candidates):
+        if accepted[row]:
+            center = (float(centroid[row, 0] + cx[row]), float(centroid[row, 1] + cy[row]))
+            results[i] = (center, float(radius[row]))
+    return results
+
+
+def find_root(parent, i):
+    """Return the union-find root of i, compressing the path on the way."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def group_lines_into_polylines(lines, weld_tolerance=LINE_WELD_TOLERANCE):
+    """Group connected LINE entities into ordered polylines.
+
+    Endpoints closer than weld_tolerance are welded into a single vertex using a
+    grid of weld_tolerance sized cells, so floating-point noise from OpenSCAD's
+    tessellation does not break the connectivity. Connected components are found
+    with a union-find and each component is returned as a dict with its 'points'
+    in walking order, a 'closed' flag that is True for simple loops and the
+    'handles' of the LINE entities it was built from.
+    """
     from collections import defaultdict
-    from ezdxf.math import Vec3
 
-    # Create a graph where keys are points and values are lists of connected points
-    connections = defaultdict(list)
+    cells = defaultdict(list)  # Grid cell -> vertex ids
+    vertices = []  # Vertex id -> (x, y)
+
+    def vertex_id(point):
+        x, y = point[0], point[1]
+        cell_x = round(x / weld_tolerance)
+        cell_y = round(y / weld_tolerance)
+        # Look in the point's own cell first; a point near a cell border may
+        # have been welded into a neighbouring cell
+        for vid in cells.get((cell_x, cell_y), ()):
+            vx, vy = vertices[vid]
+            if abs(vx - x) <= weld_tolerance and abs(vy - y) <= weld_tolerance:
+                return vid
+        for dx, dy in NEIGHBOUR_CELLS:
+            for vid in cells.get((cell_x + dx, cell_y + dy), ()):
+                vx, vy = vertices[vid]
+                if abs(vx - x) <= weld_tolerance and abs(vy - y) <= weld_tolerance:
+                    return vid
+        vid = len(vertices)
+        vertices.append((x, y))
+        cells[(cell_x, cell_y)].append(vid)
+        return vid
+
+    # Build the vertex graph and the union-find forest in one pass
+    edges = []
     for line in lines:
-        start, end = Vec3(line['start']), Vec3(line['end'])
-        connections[start].append(end)
-        connections[end].append(start)
+        a = vertex_id(line['start'])
+        b = vertex_id(line['end'])
+        if a != b:  # Skip degenerate lines shorter than the weld tolerance
+            edges.append((a, b, line.get('handle')))
+
+    parent = list(range(len(vertices)))
+    adjacency = [[] for _ in vertices]
+    for a, b, _ in edges:
+        adjacency[a].append(b)
+        adjacency[b].append(a)
+        root_a, root_b = find_root(parent, a), find_root(parent, b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    components = defaultdict(list)
+    component_handles = defaultdict(list)
+    for vid in range(len(vertices)):
+        if adjacency[vid]:
+            components[find_root(parent, vid)].append(vid)
+    for a, _, handle in edges:
+        component_handles[find_root(parent, a)].append(handle)
 
     polylines = []
-    visited_points = set()
-
-    for start_point in connections:
-        if start_point in visited_points:
-            continue        
-        polyline = []
-        q = [start_point]
-        visited_points.add(start_point)
-
-        while q:
-            current_point = q.pop(0)
-            polyline.append(current_point)
-
-            for neighbor in connections[current_point]:
-                if neighbor not in visited_points:
-                    visited_points.add(neighbor)
-                    q.append(neighbor)
-        
-        if polyline:
-            polylines.append(polyline)
+    for root, component in components.items():
+        # Start an open chain at one of its ends, a loop anywhere
+        start = next((vid for vid in component if len(adjacency[vid]) == 1), component[0])
+        visited = set()
+        order = []
+        remaining = iter(component)
+        current = start
+        while current is not None:
+            visited.add(current)
+            order.append(vertices[current])
+            current = next((n for n in adjacency[current] if n not in visited), None)
+            if current is None:
+                # Branching component: continue with the next unvisited vertex
+                current = next((vid for vid in remaining if vid not in visited), None)
+
+        handles = component_handles[root]
+        closed = len(handles) == len(component) and all(len(adjacency[vid]) == 2 for vid in component)
+        polylines.append({'points': order, 'closed': closed, 'handles': handles})
 
     return polylines
 
@@ -363,31 +776,39 @@ def extract_entity_data(entity):
 def create_new_entity(msp, data, target_layer):
     """Create a new entity from extracted data."""
     dtype = data['type']
+
+    # Set the target layer and copy other attributes
+    dxfattribs = {'layer': target_layer}
+    if 'color' in data and data['color'] != 256:  # Not BYLAYER
+        dxfattribs['color'] = data['color']
     
     if dtype == "CIRCLE":
         new_entity = msp.add_circle(
             center=data['center'],
-            radius=data['radius']
+            radius=data['radius'],
+            dxfattribs=dxfattribs
         )
     elif dtype == "LINE":
         new_entity = msp.add_line(
             start=data['start'],
-            end=data['end']
+            end=data['end'],
+            dxfattribs=dxfattribs
         )
     elif dtype == "ARC":
         new_entity = msp.add_arc(
             center=data['center'],
             radius=data['radius'],
             start_angle=data['start_angle'],
-            end_angle=data['end_angle']
+            end_angle=data['end_angle'],
+            dxfattribs=dxfattribs
         )
     elif dtype in ["LWPOLYLINE", "POLYLINE"]:
-        new_entity = msp.add_lwpolyline(data['points'])
-        new_entity.closed = data['closed']
+        new_entity = msp.add_lwpolyline(data['points'], close=data['closed'], dxfattribs=dxfattribs)
     elif dtype == "TEXT":
         new_entity = msp.add_text(
             text=data['text'],
             dxfattribs={
+                **dxfattribs,
                 'insert': data['insert'],
                 'height': data['height'],
                 'rotation': data['rotation']
@@ -397,6 +818,7 @@ def create_new_entity(msp, data, target_layer):
         new_entity = msp.add_mtext(
             text=data['text'],
             dxfattribs={
+                **dxfattribs,
                 'insert': data['insert'],
                 'char_height': data['char_height'],
                 'rotation': data['rotation']
@@ -405,13 +827,6 @@ def create_new_entity(msp, data, target_layer):
     else:
         raise ValueError(f"Unsupported entity type for creation: {dtype}")
     
-    # Set the target layer
-    new_entity.dxf.layer = target_layer
-    
-    # Copy other attributes
-    if 'color' in data and data['color'] != 256:  # Not BYLAYER
-        new_entity.dxf.color = data['color']
-    
     return new_entity
 
 
@@ -477,22 +892,53 @@ def get_entity_bounds(entity):
         ys = [p[1] for p in points]
         return min(xs), min(ys), max(xs), max(ys)
         
-    elif dtype in ["TEXT", "MTEXT"]:
+    elif dtype in ["TEXT", "ATTRIB"]:
         # For text, we'll use the insertion point and estimate bounds
         x, y = entity.dxf.insert.x, entity.dxf.insert.y
-        
-        if dtype == "TEXT":
-            height = entity.dxf.height
-            text = entity.dxf.text
-        else:  # MTEXT
-            height = entity.dxf.char_height
-            text = entity.dxf.text
-        
+        height = entity.dxf.height
+        text = entity.dxf.text
+
         # Rough estimation: assume average character width is 0.7 * height
         width = len(str(text)) * height * 0.7
-        
+
         return x, y, x + width, y + height
-        
+
+    elif dtype == "MTEXT":
+        # Measure the plain text without inline formatting codes; a fixed column
+        # width takes precedence over the estimated text width
+        x, y = entity.dxf.insert.x, entity.dxf.insert.y
+        height = entity.dxf.char_height
+        lines = entity.plain_text().split("\n")
+        if entity.dxf.hasattr('width') and entity.dxf.width > 0:
+            width = entity.dxf.width
+        else:
+            width = max(len(line) for line in lines) * height * 0.7
+        total_height = height * (1 + (len(lines) - 1) * MTEXT_LINE_PITCH)
+
+        # Attachment points 1-3 are at the top, 4-6 in the middle and 7-9 at the
+        # bottom of the text; 1, 4, 7 at its left, 2, 5, 8 at its center
+        row, column = divmod(entity.dxf.attachment_point - 1, 3)
+        min_x = x - width * column / 2
+        min_y = y - total_height * (2 - row) / 2
+        return min_x, min_y, min_x + width, min_y + total_height
+
+    elif dtype == "INSERT":
+        # Block references are placed without scaling or rotation: the bounds of the
+        # block content moved to the insertion point, plus the attached attributes
+        x, y = entity.dxf.insert.x, entity.dxf.insert.y
+        parts = []
+        for block_entity in entity.doc.blocks.get(entity.dxf.name):
+            if block_entity.dxftype() == "ATTDEF":
+                continue
+            b = get_entity_bounds(block_entity)
+            parts.append((b[0] + x, b[1] + y, b[2] + x, b[3] + y))
+        for attrib in entity.attribs:
+            if not attrib.is_invisible:
+                parts.append(get_entity_bounds(attrib))
+        if not parts:
+            raise ValueError(f"Block {entity.dxf.name} has no visible entities")
+        return min(b[0] for b in parts), min(b[1] for b in parts), max(b[2] for b in parts), max(b[3] for b in parts)
+
     elif dtype == "DIMENSION":
         # For dimension entities, try the generic bbox method first
         if hasattr(entity, 'bbox') and callable(entity.bbox):
@@ -557,13 +1003,144 @@ def calculate_bounding_box(msp, layer_filter=None):
         raise RuntimeError(f"No valid entities found for bounding box calculation{layer_info} - cannot proceed without valid geometry")
     
     layer_info = f" from layers {layer_filter}" if layer_filter else ""
-    print(f"Bounding box calculated from {entity_count} entities{layer_info}: ({min_x:.2f}, {min_y:.2f}) to ({max_x:.2f}, {max_y:.2f})")
+    logger.debug("Bounding box calculated from %d entities%s: (%.2f, %.2f) to (%.2f, %.2f)", entity_count, layer_info, min_x, min_y, max_x, max_y)
     return min_x, min_y, max_x, max_y
 
 
-def add_dimensions(msp, holes, bounding_box, doc):
-    """Adds dimension lines for the panel and holes, optimizing for clarity."""
-    # Ensure a dimension style exists
+def get_ordinate_dimension_bounds(feature_location, offset):
+    """Get the bounding box of an ordinate dimension from its feature location and leader offset."""
+    x1, y1 = feature_location[0], feature_location[1]
+    x2, y2 = x1 + offset[0], y1 + offset[1]
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+
+def get_linear_dimension_bounds(base, p1, p2, angle):
+    """Get the bounding box of a linear dimension from its definition points.
+
+    Matches what get_entity_bounds returns for the rendered DIMENSION entity
+    without rendering or inspecting it: the extension line origins p1 and p2 and
+    the dimension line definition point (p1 projected onto the dimension line).
+    """
+    direction_x = math.cos(math.radians(angle))
+    direction_y = math.sin(math.radians(angle))
+    distance = (p1[0] - base[0]) * direction_x + (p1[1] - base[1]) * direction_y
+    defpoint = (base[0] + distance * direction_x, base[1] + distance * direction_y)
+    xs = [defpoint[0], p1[0], p2[0]]
+    ys = [defpoint[1], p1[1], p2[1]]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+class ExtentsTracker:
+    """Modelspace wrapper that keeps running per-layer bounding boxes and entity counts.
+
+    All msp.add_* calls made through the tracker record the new entity's layer
+    and bounds, so the placement of the hole table, legend, title and viewport
+    and the per-layer statistics are lookups instead of modelspace rescans.
+    Entities that change layer after creation must be moved with move_to_layer(),
+    and entities changed in place with refresh().
+    """
+
+    def __init__(self, msp):
+        self.msp = msp
+        self.entity_bounds = {}  # Entity handle -> (layer, bounds)
+        self.layer_counts = {}
+        self.layer_bboxes = {}
+        self.stale_layers = set()  # Layers whose bbox may have shrunk after a move
+
+    def __getattr__(self, name):
+        attr = getattr(self.msp, name)
+        if name.startswith('add_') and callable(attr):
+            def add_and_track(*args, **kwargs):
+                result = attr(*args, **kwargs)
+                if name in ('add_linear_dim', 'add_ordinate_x_dim', 'add_ordinate_y_dim'):
+                    # Dimensions return a DimStyleOverride, their bounds follow from the definition points,
+                    # passed positionally or by keyword
+                    arguments = inspect.signature(attr).bind(*args, **kwargs)
+                    arguments.apply_defaults()
+                    arguments = arguments.arguments
+                    if name == 'add_linear_dim':
+                        bounds = get_linear_dimension_bounds(arguments['base'], arguments['p1'], arguments['p2'], arguments['angle'])
+                    else:
+                        bounds = get_ordinate_dimension_bounds(arguments['feature_location'], arguments['offset'])
+                    self.track(result.dimension, bounds)
+                else:
+                    self.track(result)
+                return result
+            return add_and_track
+        return attr
+
+    def __iter__(self):
+        return iter(self.msp)
+
+    def __len__(self):
+        return len(self.msp)
+
+    def track(self, entity, bounds=None):
+        """Record the layer and bounds of a new entity."""
+        if bounds is None:
+            bounds = get_entity_bounds(entity)
+        layer = entity.dxf.layer
+        self.entity_bounds[entity.dxf.handle] = (layer, bounds)
+        self.layer_counts[layer] = self.layer_counts.get(layer, 0) + 1
+        # Entities with all-zero bounds are ignored, as in calculate_bounding_box()
+        if all(v == 0 for v in bounds):
+            return
+        bbox = self.layer_bboxes.get(layer)
+        if bbox is None:
+            self.layer_bboxes[layer] = list(bounds)
+        else:
+            bbox[0] = min(bbox[0], bounds[0])
+            bbox[1] = min(bbox[1], bounds[1])
+            bbox[2] = max(bbox[2], bounds[2])
+            bbox[3] = max(bbox[3], bounds[3])
+
+    def untrack(self, entity):
+        """Forget an entity; the bbox of its layer is recomputed lazily."""
+        layer, bounds = self.entity_bounds.pop(entity.dxf.handle)
+        self.layer_counts[layer] -= 1
+        self.stale_layers.add(layer)
+
+    def move_to_layer(self, entity, layer):
+        """Move an entity to another layer and update the counters."""
+        self.untrack(entity)
+        entity.dxf.layer = layer
+        self.track(entity)
+
+    def refresh(self, entity):
+        """Update the bounds of an entity that was changed in place."""
+        self.untrack(entity)
+        self.track(entity)
+
+    def count(self, layer):
+        """Return the number of entities on a layer."""
+        return self.layer_counts.get(layer, 0)
+
+    def bounding_box(self, layer_filter=None):
+        """Return the bounding box of the tracked entities, optionally filtered by layer."""
+        for layer in self.stale_layers:
+            self.layer_bboxes.pop(layer, None)
+            for entity_layer, bounds in self.entity_bounds.values():
+                if entity_layer == layer and not all(v == 0 for v in bounds):
+                    bbox = self.layer_bboxes.setdefault(layer, list(bounds))
+                    bbox[0] = min(bbox[0], bounds[0])
+                    bbox[1] = min(bbox[1], bounds[1])
+                    bbox[2] = max(bbox[2], bounds[2])
+                    bbox[3] = max(bbox[3], bounds[3])
+        self.stale_layers.clear()
+
+        bboxes = [bbox for layer, bbox in self.layer_bboxes.items() if layer_filter is None or layer in layer_filter]
+        if not bboxes:
+            layer_info = f" for layers {layer_filter}" if layer_filter else ""
+            raise RuntimeError(f"No valid entities found for bounding box calculation{layer_info} - cannot proceed without valid geometry")
+        min_x = min(b[0] for b in bboxes)
+        min_y = min(b[1] for b in bboxes)
+        max_x = max(b[2] for b in bboxes)
+        max_y = max(b[3] for b in bboxes)
+        return min_x, min_y, max_x, max_y
+
+
+def ensure_dimension_style(doc):
+    """Create the "Standard" dimension style used for all dimensions and make it active."""
     if "Standard" not in doc.dimstyles:
         style = doc.dimstyles.new(
             "Standard",
@@ -588,6 +1165,11 @@ def add_dimensions(msp, holes, bounding_box, doc):
         )
         doc.dimstyles.set_active("Standard")
 
+
+def add_dimensions(msp, holes, bounding_box, doc):
+    """Adds dimension lines for the panel and holes, optimizing for clarity."""
+    ensure_dimension_style(doc)
+
     min_x, min_y, max_x, max_y = bounding_box
     offset = 15
 
@@ -658,6 +1240,84 @@ def add_dimensions(msp, holes, bounding_box, doc):
         dim_offset += 8  # Increased spacing between dimension lines
 
 
+def cluster_coordinates(values, tolerance):
+    """Group sorted coordinates lying within tolerance of the first one of their group.
+
+    Returns the first (smallest) coordinate of each group, so every dimension
+    shows a coordinate a hole really has. A group never spans more than
+    tolerance, however many coordinates lie in between.
+    """
+    clusters = []
+    for value in sorted(set(values)):
+        if clusters and value - clusters[-1][0] <= tolerance:
+            clusters[-1].append(value)
+        else:
+            clusters.append([value])
+    return [cluster[0] for cluster in clusters]
+
+
+def stagger_levels(positions, spacing, levels=DIM_ORDINATE_STAGGER_LEVELS):
+    """Assign each sorted text position a stagger level so neighbouring texts do not overlap.
+
+    A position takes the first level whose previous text is at least spacing
+    away; if there is none, the level that was used least recently.
+    """
+    last_positions = [float('-inf')] * levels
+    assigned = []
+    for position in positions:
+        level = next((i for i, last in enumerate(last_positions) if position - last >= spacing), None)
+        if level is None:
+            level = min(range(levels), key=lambda i: last_positions[i])
+        last_positions[level] = position
+        assigned.append(level)
+    return assigned
+
+
+def add_ordinate_dimensions(msp, holes, bounding_box, doc, tolerance=DIM_CLUSTER_TOLERANCE):
+    """Adds one ordinate dimension per cluster of hole coordinates, measured from the panel origin.
+
+    X ordinates are placed below the panel and Y ordinates to its left. Hole
+    coordinates within tolerance of the first coordinate of their group share
+    the dimension of that first coordinate, the panel edges are always
+    dimensioned exactly, and the leaders of neighbouring dimensions alternate
+    in length so their texts do not overlap.
+    """
+    ensure_dimension_style(doc)
+
+    min_x, min_y, max_x, max_y = bounding_box
+    origin = (min_x, min_y)
+
+    # The panel edges are datums: they are dimensioned exactly, never merged with holes
+    x_clusters = sorted(set(cluster_coordinates([h['x'] for h in holes], tolerance) + [min_x, max_x]))
+    y_clusters = sorted(set(cluster_coordinates([h['y'] for h in holes], tolerance) + [min_y, max_y]))
+
+    # X ordinates below the panel
+    for x_coord, level in zip(x_clusters, stagger_levels(x_clusters, DIM_ORDINATE_TEXT_WIDTH)):
+        leader = DIM_ORDINATE_LEADER + level * DIM_ORDINATE_TEXT_HEIGHT
+        dim = msp.add_ordinate_x_dim(
+            feature_location=(x_coord, min_y),
+            offset=(0, -leader),
+            origin=origin,
+            dimstyle="Standard",
+            dxfattribs={"layer": "DIMENSION"}
+        )
+        dim.render()
+
+    # Y ordinates left of the panel
+    for y_coord, level in zip(y_clusters, stagger_levels(y_clusters, DIM_ORDINATE_TEXT_HEIGHT)):
+        leader = DIM_ORDINATE_LEADER + level * DIM_ORDINATE_TEXT_WIDTH
+        dim = msp.add_ordinate_y_dim(
+            feature_location=(min_x, y_coord),
+            offset=(-leader, 0),
+            origin=origin,
+            dimstyle="Standard",
+            dxfattribs={"layer": "DIMENSION"}
+        )
+        dim.render()
+
+    logger.debug("Added %d X and %d Y ordinate dimensions", len(x_clusters), len(y_clusters))
+
+
 def add_legend(msp, position):
     """Add a legend to the DXF file."""
     legend_x, legend_y = position
@@ -703,7 +1363,7 @@ def add_legend(msp, position):
 def add_title(msp, panel_name, bounding_box):
     """Adds a title with the panel name to the DXF."""
     if not panel_name:
-        return
+        return None
 
     # Import the alignment enum
     from ezdxf.enums import TextEntityAlignment
@@ -727,51 +1387,19 @@ def add_title(msp, panel_name, bounding_box):
     # Use set_placement to properly center the text
     # MIDDLE_CENTER centers both horizontally and vertically at the insertion point
     title_text.set_placement((title_x, title_y), align=TextEntityAlignment.MIDDLE_CENTER)
+    return title_text
 
 
-def map_polyline_to_line_segments(polyline, line_entities):
-    from ezdxf.math import Vec3
-    # Find the original LINE entities that form this polyline and delete them
-    lines = []
-    tolerance = 0.2
-    are_points_matched = lambda start, end, p1, p2: \
-        (start.isclose(p1, rel_tol=tolerance) and end.isclose(p2, rel_tol=tolerance)) or \
-        (start.isclose(p2, rel_tol=tolerance) and end.isclose(p1, rel_tol=tolerance))
-    for point_index in range(len(polyline) - 1):
-        p1 = Vec3(polyline[point_index])
-        p2 = Vec3(polyline[point_index+1])
-        for line_entity in line_entities:
-            line_start = line_entity.dxf.start
-            line_end = line_entity.dxf.end
-            if are_points_matched(line_start, line_end, p1, p2):
-                if line_entity not in lines:
-                    lines.append(line_entity)
-    return lines
-
-
-def split_layers(input_file, output_file, template_mode=False):
-    doc = ezdxf.readfile(input_file)
-    
-    # Check DXF version and create a new R2000 document if needed
-    if doc.dxfversion < 'AC1015':  # R2000 is AC1015
-        print(f"Converting from DXF version {doc.dxfversion} to R2000 for LWPOLYLINE support")
-        # Create a new R2000 document
-        new_doc = ezdxf.new('R2000')
-        
-        # Copy entities from old document to new document
-        old_msp = doc.modelspace()
-        new_msp = new_doc.modelspace()
-        
-        # We'll use the new document from here on
-        doc = new_doc
-        msp = new_msp
-        
-        # Copy entities to the new document (we'll process them in the main loop)
-        original_entities = list(old_msp)
-    else:
-        msp = doc.modelspace()
-        original_entities = list(msp)
+def map_polyline_to_line_segments(polyline, line_index):
+    """Return the LINE entities a polyline from group_lines_into_polylines was built from.
+
+    line_index maps entity handles to LINE entities and is built once per document.
+    """
+    return [line_index[handle] for handle in polyline['handles']]
 
+
+def log_entity_statistics(original_entities):
+    """Log the number and size range of the raw entities per type."""
     stats = {
         "CIRCLE": {"count": 0, "radii": []},
         "ARC": {"count": 0, "radii": []},
@@ -809,27 +1437,65 @@ def split_layers(input_file, output_file, template_mode=False):
             elif dtype == "MTEXT":
                 stats[dtype]["heights"].append(e.dxf.char_height)
 
-    print("\n--- DXF Entity Statistics ---")
+    logger.debug("--- DXF Entity Statistics ---")
     for dtype, data in stats.items():
         if data["count"] > 0:
-            print(f"{dtype}: {data['count']}")
+            logger.debug(f"{dtype}: {data['count']}")
             if "radii" in data and data["radii"]:
-                print(f"  - Radii: min={min(data['radii']):.2f}, max={max(data['radii']):.2f}, avg={sum(data['radii'])/len(data['radii']):.2f}")
+                logger.debug(f"  - Radii: min={min(data['radii']):.2f}, max={max(data['radii']):.2f}, avg={sum(data['radii'])/len(data['radii']):.2f}")
             if "lengths" in data and data["lengths"]:
-                print(f"  - Lengths: min={min(data['lengths']):.2f}, max={max(data['lengths']):.2f}, avg={sum(data['lengths'])/len(data['lengths']):.2f}")
+                logger.debug(f"  - Lengths: min={min(data['lengths']):.2f}, max={max(data['lengths']):.2f}, avg={sum(data['lengths'])/len(data['lengths']):.2f}")
             if "widths" in data and data["widths"]:
-                print(f"  - Widths: min={min(data['widths']):.2f}, max={max(data['widths']):.2f}, avg={sum(data['widths'])/len(data['widths']):.2f}")
+                logger.debug(f"  - Widths: min={min(data['widths']):.2f}, max={max(data['widths']):.2f}, avg={sum(data['widths'])/len(data['widths']):.2f}")
             if "heights" in data and "widths" in data and data["heights"]:
-                print(f"  - Heights: min={min(data['heights']):.2f}, max={max(data['heights']):.2f}, avg={sum(data['heights'])/len(data['heights']):.2f}")
+                logger.debug(f"  - Heights: min={min(data['heights']):.2f}, max={max(data['heights']):.2f}, avg={sum(data['heights'])/len(data['heights']):.2f}")
             elif "heights" in data and data["heights"]:
-                print(f"  - Heights: min={min(data['heights']):.2f}, max={max(data['heights']):.2f}, avg={sum(data['heights'])/len(data['heights']):.2f}")
+                logger.debug(f"  - Heights: min={min(data['heights']):.2f}, max={max(data['heights']):.2f}, avg={sum(data['heights'])/len(data['heights']):.2f}")
+
+    logger.debug("---------------------------")
+
+
+def build_layered_document(input_file, weld_tolerance=LINE_WELD_TOLERANCE, hole_marks="blocks", hole_db=None, model_id=None):
+    """Read the raw DXF, classify its entities onto layers and recover the holes.
+
+    The hole annotations come from the CSV next to input_file or, with hole_db,
+    from the hole database, see read_hole_rows().
+    """
+    profiling.phase("readfile")
+    doc = ezdxf.readfile(input_file)
+    
+    # Check DXF version and create a new R2000 document if needed
+    if doc.dxfversion < 'AC1015':  # R2000 is AC1015
+        logger.debug("Converting from DXF version %s to R2000 for LWPOLYLINE support", doc.dxfversion)
+        # Create a new R2000 document
+        new_doc = ezdxf.new('R2000')
+        
+        # Copy entities from old document to new document
+        old_msp = doc.modelspace()
+        new_msp = new_doc.modelspace()
+        
+        # We'll use the new document from here on
+        doc = new_doc
+        msp = new_msp
+        
+        # Copy entities to the new document (we'll process them in the main loop)
+        original_entities = list(old_msp)
+    else:
+        msp = doc.modelspace()
+        original_entities = list(msp)
 
-    print("---------------------------\n")
+    profiling.phase("stats")
+    if logger.isEnabledFor(logging.DEBUG):
+        log_entity_statistics(original_entities)
         
+    profiling.phase("layers")
     # Clear existing entities
     entities_to_delete = list(msp)
     for entity in entities_to_delete:
         msp.delete_entity(entity)
+
+    # From here on all new entities go through the extents tracker
+    msp = ExtentsTracker(msp)
     
     # Set units to millimeters
     doc.header['$INSUNITS'] = ezdxf.units.MM
@@ -898,13 +1564,16 @@ def split_layers(input_file, output_file, template_mode=False):
         doc.linetypes.new("CONTINUOUS")
 
     # Add hole annotations from CSV file
-    annotations_added, holes = add_hole_annotations_from_csv(msp, input_file)
+    profiling.phase("hole_annotations")
+    annotations_added, holes = add_hole_annotations_from_csv(msp, input_file, hole_marks=hole_marks, hole_db=hole_db, model_id=model_id)
     
     allowed = {"LWPOLYLINE", "POLYLINE", "LINE", "ARC", "CIRCLE", "TEXT", "MTEXT"}
-    print(f"Processing file: {input_file}")
+    logger.info("Processing file: %s", input_file)
     
     # Step 1: Collect entities and extract their data
+    profiling.phase("classify")
     entity_specs = []
+    slots_detected = 0
     for e in original_entities:
         dtype = e.dxftype()
         
@@ -912,19 +1581,24 @@ def split_layers(input_file, output_file, template_mode=False):
         if dtype not in allowed:
             raise ValueError(f"Unexpected entity type: {dtype}. Only {allowed} are supported.")
         
+        # Extract entity data before deletion
+        data = extract_entity_data(e)
+
         # Determine target layer
         if dtype == "CIRCLE":
             target_layer = "DRILL"
         elif dtype == "ARC":
             if e.dxf.radius <= (SLOT_MAX_SIZE / 2):
                 target_layer = "DRILL"
-                print(f"Small slot detected: {dtype}")
+                slots_detected += 1
+                logger.debug("Small slot detected: %s", dtype)
             else:
                 target_layer = "CUT"
         elif dtype in ["LWPOLYLINE", "POLYLINE"]:
-            if is_small_slot(e):
+            if is_small_slot(data['points'], data['closed']):
                 target_layer = "DRILL"
-                print(f"Small slot detected: {dtype}")
+                slots_detected += 1
+                logger.debug("Small slot detected: %s", dtype)
             else:
                 target_layer = "CUT"
         elif dtype in ["TEXT", "MTEXT"]:
@@ -934,13 +1608,12 @@ def split_layers(input_file, output_file, template_mode=False):
         else:
             raise ValueError(f"Unknown entity type: {dtype}")
         
-        # Extract entity data before deletion
-        data = extract_entity_data(e)
         entity_specs.append((data, target_layer, dtype))
     
     # Step 2: Entities are already cleared or we're using a new document
     
     # Step 3: Create new entities with correct layers
+    profiling.phase("create_entities")
     entities_created = 0
     created_entities = []
     for data, target_layer, dtype in entity_specs:
@@ -952,118 +1625,142 @@ def split_layers(input_file, output_file, template_mode=False):
         except Exception as ex:
             raise RuntimeError(f"Failed to create {dtype} entity on {target_layer} layer: {ex}")
     
-    # Post-processing step: Convert circle-like polylines to actual circles
-    polylines_to_delete = []
-    circles_to_add = []
+    # Post-processing step: Collect circle-like candidates from polylines and closed loops of LINEs
+    profiling.phase("circle_detection")
+    candidates = []  # (points, entities the circle replaces)
+    for entity, (data, target_layer, dtype) in zip(created_entities, entity_specs):
+        # Ignore the `closed` flag because it does not represent the reality (to be investigated why)
+        if dtype in ["LWPOLYLINE", "POLYLINE"]:
+            candidates.append((data['points'], [entity]))
 
-    for entity in created_entities:
-        if entity.dxftype() in ["LWPOLYLINE", "POLYLINE"]:
-            points = list(entity.get_points())
-            center, radius = get_polyline_center_and_radius([(p[0], p[1]) for p in points], entity.closed)
-            if center and radius:
-                polylines_to_delete.append(entity)
-                circles_to_add.append((center, radius))
-                print(f"Found hole at {center} with radius {radius}")
-    print(f"Found {len(polylines_to_delete)} polylines to delete")
-
-    # Post-processing step: Convert circle-like groups of LINEs to actual circles
     line_entities = [e for e in created_entities if e.dxftype() == 'LINE']
     if len(line_entities) > 8: # Heuristic: only run this complex check if there are enough lines
-        print(f"Processing {len(line_entities)} LINE entities")
-        line_specs = [extract_entity_data(e) for e in line_entities]
-        polylines_from_lines = group_lines_into_polylines(line_specs)
-        print(f"Found {len(polylines_from_lines)} polylines from lines")
+        logger.debug("Processing %d LINE entities", len(line_entities))
+        line_specs = []
+        line_index = {}
+        for e in line_entities:
+            data = extract_entity_data(e)
+            data['handle'] = e.dxf.handle
+            line_specs.append(data)
+            line_index[e.dxf.handle] = e
+        polylines_from_lines = group_lines_into_polylines(line_specs, weld_tolerance=weld_tolerance)
+        logger.debug("Found %d polylines from lines", len(polylines_from_lines))
 
         for polyline in polylines_from_lines:
-            # Check if the polyline is closed by checking if the start and end points are close
-            closed = ezdxf.math.Vec3(polyline[0]).isclose(ezdxf.math.Vec3(polyline[-1]))
-            center, radius = get_polyline_center_and_radius(polyline, closed)
-
-            if center and radius:
-                print(f"polyline: points[{len(polyline)}], closed={closed}")
-                lines = map_polyline_to_line_segments(polyline, line_entities)
-                print(f"mapped to lines[{len(lines)}]")
-                polylines_to_delete.extend(lines)
-                print(f"Add circle at {center} with radius {radius}")
-                circles_to_add.append((center, radius))
-        print(f"Found {len(polylines_to_delete)} LINE entities to delete")
+            # Only closed loops of lines can form a hole
+            if polyline['closed']:
+                candidates.append((polyline['points'], map_polyline_to_line_segments(polyline, line_index)))
+
+    # Convert circle-like candidates to actual circles, fitting all of them in one call
+    polylines_to_delete = []
+    circles_to_add = []
+    fits = fit_circles([points for points, _ in candidates])
+    for (points, entities), (center, radius) in zip(candidates, fits):
+        if center is not None:
+            polylines_to_delete.extend(entities)
+            circles_to_add.append((center, radius))
+            logger.debug("Found hole at %s with radius %s (%d entities)", center, radius, len(entities))
+    logger.debug("Found %d holes in %d candidates", len(circles_to_add), len(candidates))
 
     # Move the old polylines and lines to the DELETED layer
-    print(f"Moving {len(polylines_to_delete)} entities to DELETED layer")
+    logger.debug("Moving %d entities to DELETED layer", len(polylines_to_delete))
     for entity_to_move in polylines_to_delete:
-        entity_to_move.dxf.layer = "DELETED"
+        msp.move_to_layer(entity_to_move, "DELETED")
 
     for center, radius in circles_to_add:
         msp.add_circle(center, round(radius, 1), dxfattribs={'layer': 'DRILL'})
-        print(f"Converted polyline/lines to circle at {center} with radius {radius}")
+        logger.debug("Converted polyline/lines to circle at %s with radius %s", center, radius)
+
+    logger.debug("Created %d entities", entities_created)
+    counters = {
+        'input_entities': len(original_entities),
+        'line_entities': len(line_entities),
+        'slots_detected': slots_detected,
+        'circle_candidates': len(candidates),
+        'holes_recovered': len(circles_to_add),
+        'lines_retired': sum(1 for e in polylines_to_delete if e.dxftype() == 'LINE'),
+        'polylines_retired': sum(1 for e in polylines_to_delete if e.dxftype() != 'LINE'),
+        'annotations': annotations_added,
+        'holes_csv': len(holes),
+    }
+    profiling.add_counts(**counters)
+
+    return doc, msp, holes, counters
 
-    print(f"Created {entities_created} entities")
-    
-    if not template_mode:
-        # Add dimensions using the CUT and DRILL layer geometry bounding box only
-        geometry_bbox = calculate_bounding_box(msp, layer_filter=['CUT'])
-        add_dimensions(msp, holes, geometry_bbox, doc)
 
-        # Add hole table - calculate bounding box from CUT and DRILL layers only
-        min_x, min_y, max_x, max_y = calculate_bounding_box(msp)
-        table_pos = (max_x + 20, max_y)
+def add_drawing_annotations(doc, msp, holes, input_file, dim_style="linear", dim_cluster_tolerance=DIM_CLUSTER_TOLERANCE,
+                            hole_table="compact"):
+    """Add dimensions, hole schedule, legend and title to a layered document."""
+    # Add dimensions using the CUT and DRILL layer geometry bounding box only
+    profiling.phase("dimensions", dim_style=dim_style)
+    geometry_bbox = msp.bounding_box(layer_filter=['CUT'])
+    if dim_style == "ordinate":
+        add_ordinate_dimensions(msp, holes, geometry_bbox, doc, tolerance=dim_cluster_tolerance)
+    elif dim_style == "linear":
+        add_dimensions(msp, holes, geometry_bbox, doc)
+    else:
+        raise ValueError(f"Unknown dimension style: {dim_style}. Expected one of {DIM_STYLES}")
+
+    # Add hole table - calculate bounding box from CUT and DRILL layers only
+    profiling.phase("hole_table", hole_table=hole_table)
+    min_x, min_y, max_x, max_y = msp.bounding_box()
+    table_pos = (max_x + 20, max_y)
+    if hole_table == "compact":
+        table_bottom_y = add_hole_schedule(doc, msp, holes, table_pos)
+    elif hole_table == "cells":
         table_bottom_y = add_hole_table(msp, holes, table_pos)
-        
-        # Add legend
-        legend_pos = (table_pos[0], table_bottom_y - 20)
-        add_legend(msp, legend_pos)
-        
-        # Create a text style for the title
-        if "Title" not in doc.styles:
-            doc.styles.new("Title", dxfattribs={"font": "ISOCPEUR.ttf"})
+    else:
+        raise ValueError(f"Unknown hole table style: {hole_table}. Expected one of {HOLE_TABLE_STYLES}")
 
-        # Add title
-        panel_name = os.path.basename(os.path.splitext(input_file)[0])
-        final_bbox_before_title = calculate_bounding_box(msp)
-        add_title(msp, panel_name, final_bbox_before_title)
+    # Add legend
+    profiling.phase("legend_title")
+    legend_pos = (table_pos[0], table_bottom_y - 20)
+    add_legend(msp, legend_pos)
 
-    # Verify entities were created
-    cut_count = sum(1 for e in msp if hasattr(e.dxf, 'layer') and e.dxf.layer == "CUT")
-    drill_count = sum(1 for e in msp if hasattr(e.dxf, 'layer') and e.dxf.layer == "DRILL")
-    annotation_count = sum(1 for e in msp if hasattr(e.dxf, 'layer') and e.dxf.layer == "ANNOTATION")
-    dimension_count = sum(1 for e in msp if hasattr(e.dxf, 'layer') and e.dxf.layer == "DIMENSION")
-    
-    print(f"Entities on CUT layer: {cut_count}")
-    print(f"Entities on DRILL layer: {drill_count}")
-    print(f"Entities on ANNOTATION layer: {annotation_count}")
-    print(f"Entities on DIMENSION layer: {dimension_count}")
-    
-    # Debug: Check entities before saving
-    print("Before saving - checking entities:")
-    remaining_entities = list(msp)
-    print(f"  Total entities in modelspace: {len(remaining_entities)}")
-    
-    for e in remaining_entities:
-        # print(f"  Entity {e.dxftype()}: layer='{e.dxf.layer}', handle='{e.dxf.handle}'")
-        pass
+    # Create a text style for the title
+    if "Title" not in doc.styles:
+        doc.styles.new("Title", dxfattribs={"font": "ISOCPEUR.ttf"})
 
-    # Calculate final bounding box for layout viewport
-    final_min_x, final_min_y, final_max_x, final_max_y = calculate_bounding_box(msp)
-    
-    # Create A4 landscape layout
-    layout = doc.layouts.new('A4 landscape')
+    # Add title
+    panel_name = os.path.basename(os.path.splitext(input_file)[0])
+    final_bbox_before_title = msp.bounding_box()
+    title = add_title(msp, panel_name, final_bbox_before_title)
+    if title is not None:
+        # The title was moved by set_placement() after it was added
+        msp.refresh(title)
+
+
+def new_a4_layout(doc, name):
+    """Create an empty A4 landscape paperspace layout."""
+    layout = doc.layouts.new(name)
     layout.page_setup(
-        size=(297, 210),  # A4 landscape paper size in mm
-        margins=(10, 10, 10, 10),  # 10mm margins
+        size=A4_SIZE,  # A4 landscape paper size in mm
+        margins=(A4_MARGIN, A4_MARGIN, A4_MARGIN, A4_MARGIN),
         units='mm'
     )
+    return layout
+
+
+def add_a4_layout(doc):
+    """Create the A4 landscape layout and return its viewport."""
+    layout = new_a4_layout(doc, 'A4 landscape')
 
     # Add a viewport to the layout
     # The viewport is centered on the page
     # The size of the viewport is the paper size minus the margins
+    paper_width, paper_height = A4_SIZE
     viewport = layout.add_viewport(
-        center=(297 / 2, 210 / 2),
-        size=(297 - 20, 210 - 20),
+        center=(paper_width / 2, paper_height / 2),
+        size=(paper_width - 2 * A4_MARGIN, paper_height - 2 * A4_MARGIN),
         view_center_point=(0, 0),  # Initial view center
         view_height=100  # Initial view height
     )
-    
-    # Fit the viewport to the modelspace extents
+    return viewport
+
+
+def fit_viewport(viewport, bounding_box):
+    """Fit the viewport to the modelspace extents."""
+    final_min_x, final_min_y, final_max_x, final_max_y = bounding_box
     if final_min_x != final_max_x or final_min_y != final_max_y:
         # get viewport size in paper space
         vp_width = viewport.dxf.width
@@ -1090,13 +1787,67 @@ def split_layers(input_file, output_file, template_mode=False):
     else:
         raise RuntimeError("Invalid final bounding box - cannot set viewport")
 
-    # Save the file
-    try:
-        doc.saveas(output_file)
-    except Exception as e:
-        raise RuntimeError(f"Failed to save file: {e}")
-    
-    # FAIL EARLY: Verify the saved file
+
+def scan_saved_dxf(output_file, encoding):
+    """Stream a saved DXF file tag by tag without building a document.
+
+    Returns the layer names from the LAYER table and the number of modelspace
+    entities per layer found in the ENTITIES section.
+    """
+    from collections import Counter
+    from ezdxf.lldxf.tagger import ascii_tags_loader
+
+    layer_names = set()
+    layer_counts = Counter()
+    section = None
+    expect_section_name = False
+    entity_type = None
+    entity_layer = "0"
+    paperspace = False
+
+    with open(output_file, mode='r', encoding=encoding, errors='ignore') as stream:
+        for tag in ascii_tags_loader(stream):
+            code, value = tag.code, tag.value
+            if code == 0:
+                # A new structure starts: count the entity that just ended
+                if section == "ENTITIES" and entity_type not in VERIFY_SKIPPED_TYPES and not paperspace:
+                    layer_counts[entity_layer] += 1
+                expect_section_name = value == "SECTION"
+                if value == "ENDSEC":
+                    section = None
+                entity_type = value
+                entity_layer = "0"
+                paperspace = False
+            elif code == 2 and expect_section_name:
+                section = value
+                expect_section_name = False
+            elif code == 2 and section == "TABLES" and entity_type == "LAYER":
+                layer_names.add(value)
+            elif code == 8:
+                entity_layer = value
+            elif code == 67:
+                paperspace = value.strip() == "1"
+
+    return layer_names, layer_counts
+
+
+def verify_saved_file_fast(output_file, msp, encoding):
+    """Check the saved file's LAYER table and per-layer entity counts against the tracker."""
+    layer_names, layer_counts = scan_saved_dxf(output_file, encoding)
+
+    for layer_name in VERIFY_REQUIRED_LAYERS:
+        if layer_name not in layer_names:
+            raise RuntimeError(f"Layer {layer_name} missing from saved file")
+
+    expected_counts = {layer: count for layer, count in msp.layer_counts.items() if count}
+    if dict(layer_counts) != expected_counts:
+        raise RuntimeError(f"Saved file verification failed - entities per layer {dict(layer_counts)} do not match {expected_counts}")
+
+    logger.debug("Verification: Saved file contains %d entities", sum(layer_counts.values()))
+
+
+def verify_saved_file_full(output_file):
+    """Re-read the saved file with ezdxf and check its layers."""
     try:
         verify_doc = ezdxf.readfile(output_file)
         verify_msp = verify_doc.modelspace()
@@ -1104,37 +1855,257 @@ def split_layers(input_file, output_file, template_mode=False):
         saved_entities = list(verify_msp)
         total_entities = len(saved_entities)
         
-        # print("After saving - entities found:")
-        for e in saved_entities:
-            # print(f"  Entity {e.dxftype()}: layer='{e.dxf.layer}', handle='{e.dxf.handle}'")
-            pass
-        
         # Verify layers exist in saved file
-        for layer_name in ["CUT", "DRILL", "ANNOTATION", "DIMENSION"]:
+        for layer_name in VERIFY_REQUIRED_LAYERS:
             if layer_name not in verify_doc.layers:
                 raise RuntimeError(f"Layer {layer_name} missing from saved file")
         
-        print(f"Verification: Saved file contains {total_entities} entities")
+        logger.debug("Verification: Saved file contains %d entities", total_entities)
         
     except ezdxf.DXFError as e:
         raise RuntimeError(f"Saved file verification failed - DXF error: {e}")
     except Exception as e:
         raise RuntimeError(f"Saved file verification failed: {e}")
+
+
+def save_layered_document(doc, msp, viewport, output_file, verify="fast"):
+    """Fit the layout viewport, save the document and verify the saved file."""
+    # Verify entities were created
+    cut_count = msp.count("CUT")
+    drill_count = msp.count("DRILL")
+    annotation_count = msp.count("ANNOTATION")
+    dimension_count = msp.count("DIMENSION")
     
-    print(f"Layered DXF saved as {output_file}")
+    logger.debug("Entities on CUT layer: %d", cut_count)
+    logger.debug("Entities on DRILL layer: %d", drill_count)
+    logger.debug("Entities on ANNOTATION layer: %d", annotation_count)
+    logger.debug("Entities on DIMENSION layer: %d", dimension_count)
+    
+    # Debug: Check entities before saving
+    logger.debug("Before saving - checking entities:")
+    logger.debug("  Total entities in modelspace: %d", len(msp))
 
+    # Final bounding box for layout viewport
+    profiling.phase("save", output=output_file, entities=len(msp), layer_counts={layer: n for layer, n in msp.layer_counts.items() if n})
+    fit_viewport(viewport, msp.bounding_box())
 
-def main():
-    if len(sys.argv) < 3:
-        print("Usage: python split_layers.py input.dxf output.dxf [--template]")
-        sys.exit(1)
+    # Save the file
+    try:
+        doc.saveas(output_file)
+    except Exception as e:
+        raise RuntimeError(f"Failed to save file: {e}")
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-    template_mode = "--template" in sys.argv
+    # FAIL EARLY: Verify the saved file
+    profiling.phase("verify", output=output_file, mode=verify)
+    if verify == "full":
+        verify_saved_file_full(output_file)
+    else:
+        verify_saved_file_fast(output_file, msp, doc.output_encoding)
     
+    profiling.end_phase()
+    logger.info("Layered DXF saved as %s", output_file)
+
+
+def split_layers(input_file, output_file=None, template_file=None, weld_tolerance=LINE_WELD_TOLERANCE, verify="fast",
+                 dim_style="linear", dim_cluster_tolerance=DIM_CLUSTER_TOLERANCE, hole_marks="blocks", hole_table="compact",
+                 hole_db=None, model_id=None):
+    """Layer the input DXF once and write the template and/or the full drawing.
+
+    The raw DXF is read, classified and reconstructed a single time. The clean
+    drilling template (no dimensions, title, legend or hole schedule) is saved
+    first; the annotations for the full drawing are then added on top of the
+    same geometry and saved to output_file.
+
+    verify selects how the saved files are checked: "fast" streams the file and
+    compares the entities per layer with the in-memory counters, "full" reloads
+    it with ezdxf.
+
+    dim_style selects "linear" dimensions for every hole coordinate on all four
+    sides or "ordinate" dimensions from the panel origin, one per group of hole
+    coordinates within dim_cluster_tolerance of the group's first coordinate.
+
+    hole_marks selects whether the drill marks and hole labels are INSERTs of
+    shared BLOCKs ("blocks") or separate lines, circles and texts ("entities").
+
+    hole_table selects the "compact" hole schedule, grouping identical holes
+    into MTEXT rows and moving overflowing rows to extra layouts, or the
+    "cells" table with one TEXT per cell and hole.
+
+    hole_db reads the holes of model model_id from a hole database written by
+    hole_db.py instead of the CSV file next to input_file.
+    """
+    if output_file is None and template_file is None:
+        raise ValueError("At least one of output_file and template_file must be given")
+
+    start = time.perf_counter()
+    profiling.begin_record(input_file, size_bytes=os.path.getsize(input_file))
+    doc, msp, holes, counters = build_layered_document(input_file, weld_tolerance=weld_tolerance, hole_marks=hole_marks, hole_db=hole_db, model_id=model_id)
+    profiling.phase("layout")
+    viewport = add_a4_layout(doc)
+
+    if template_file:
+        save_layered_document(doc, msp, viewport, template_file, verify=verify)
+
+    if output_file:
+        add_drawing_annotations(doc, msp, holes, input_file, dim_style=dim_style, dim_cluster_tolerance=dim_cluster_tolerance,
+                                hole_table=hole_table)
+        save_layered_document(doc, msp, viewport, output_file, verify=verify)
+
+    profiling.add_counts(entities=len(msp))
+    profiling.end_record()
+
+    logger.info(
+        "%s: %d entities in, %d out; %d slots, %d circles recovered from %d candidates, %d lines and %d polylines retired to DELETED, %d annotations (%.2fs)",
+        os.path.basename(input_file), counters['input_entities'], len(msp), counters['slots_detected'],
+        counters['holes_recovered'], counters['circle_candidates'], counters['lines_retired'],
+        counters['polylines_retired'], counters['annotations'], time.perf_counter() - start,
+    )
+
+
+def configure_logging(level):
+    """Print the split_layers log records at or above level to stdout."""
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(level)
+
+
+def find_dxf_files(input_dir):
+    """Return all DXF files below input_dir, largest first."""
+    dxf_files = []
+    for root, _, files in os.walk(input_dir):
+        for file in files:
+            if file.lower().endswith(".dxf"):
+                dxf_files.append(os.path.join(root, file))
+    # Schedule the largest panels first so they do not end up as the tail of the run
+    dxf_files.sort(key=lambda f: (-os.path.getsize(f), f))
+    return dxf_files
+
+
+def run_split_layers_job(input_file, output_file, template_file, options, profile, log_level):
+    """Worker entry point for the batch mode; returns the elapsed wall time and the profile records."""
+    configure_logging(log_level)
+    if profile:
+        profiling.enable()
+    start = time.perf_counter()
+    split_layers(input_file, output_file, template_file=template_file, **options)
+    return time.perf_counter() - start, profiling.take_records()
+
+
+def split_layers_batch(input_dir, output_dir, template_dir=None, jobs=None, **options):
+    """Process every DXF file in input_dir using a pool of worker processes.
+
+    options are passed on to split_layers() for every file.
+
+    When profiling is enabled in this process the workers profile their files
+    and send the records back to be merged here.
+    """
+    dxf_files = find_dxf_files(input_dir)
+    if not dxf_files:
+        logger.warning("No DXF files found in '%s'.", input_dir)
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    if template_dir:
+        os.makedirs(template_dir, exist_ok=True)
+
+    # Build the job list, largest input first. Each job parses its panel once and
+    # writes both the full drawing and, if requested, the drilling template.
+    job_list = []
+    for input_file in dxf_files:
+        file_name = os.path.basename(input_file)
+        output_file = os.path.join(output_dir, file_name)
+        template_file = os.path.join(template_dir, file_name) if template_dir else None
+        job_list.append((input_file, output_file, template_file))
+
+    logger.info("Found %d DXF files to process.", len(dxf_files))
+    timings = []
+    batch_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(run_split_layers_job, *job, options, profiling.is_enabled(), logger.getEffectiveLevel()): job for job in job_list}
+        for future in as_completed(futures):
+            input_file, output_file, template_file = futures[future]
+            # Let worker exceptions propagate - fail early and clearly
+            elapsed, records = future.result()
+            profiling.extend_records(records)
+            timings.append((input_file, output_file, template_file, elapsed))
+    batch_elapsed = time.perf_counter() - batch_start
+
+    logger.info("--- Split Layers Timing Summary ---")
+    timings.sort(key=lambda t: t[3], reverse=True)
+    for input_file, output_file, template_file, elapsed in timings:
+        size_kb = os.path.getsize(input_file) / 1024
+        outputs = output_file if not template_file else f"{output_file}, {template_file}"
+        logger.info("%8.2fs  %8.1f KB  %s -> %s", elapsed, size_kb, os.path.basename(input_file), outputs)
+    total_cpu = sum(t[3] for t in timings)
+    logger.info("Total: %d files, %.2fs summed, %.2fs wall", len(timings), total_cpu, batch_elapsed)
+    logger.info("-----------------------------------")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Split DXF geometry into CUT/DRILL layers and add annotations.')
+    parser.add_argument('input_file', nargs='?', help='Path to the input DXF file.')
+    parser.add_argument('output_file', nargs='?', help='Path where the processed DXF file will be saved.')
+    parser.add_argument('--template', action='store_true', help='Generate a drilling template without dimensions, title, legend or hole schedule.')
+    parser.add_argument('--template-file', help='Also write the drilling template to this file, from the same parse of the input.')
+    parser.add_argument('--input-dir', help='Batch mode: directory with the raw DXF files.')
+    parser.add_argument('--output-dir', help='Batch mode: directory for the processed DXF files.')
+    parser.add_argument('--template-dir', help='Batch mode: directory for the drilling template DXF files.')
+    parser.add_argument('--jobs', type=int, default=None, help='Batch mode: number of worker processes (default: number of CPUs).')
+    parser.add_argument('--weld-tolerance', type=float, default=LINE_WELD_TOLERANCE, help=f'Distance below which LINE endpoints are joined (default: {LINE_WELD_TOLERANCE}).')
+    parser.add_argument('--dim-style', choices=DIM_STYLES, default='linear', help='Linear dimensions for every hole coordinate on all sides, or ordinate dimensions per coordinate cluster.')
+    parser.add_argument('--dim-cluster-tolerance', type=float, default=DIM_CLUSTER_TOLERANCE, help=f'Ordinate mode: hole coordinates within this distance of the first of their group share its dimension (default: {DIM_CLUSTER_TOLERANCE}).')
+    parser.add_argument('--hole-marks', choices=HOLE_MARK_STYLES, default='blocks', help='Draw drill marks and hole labels as INSERTs of shared BLOCKs or as separate entities.')
+    parser.add_argument('--hole-table', choices=HOLE_TABLE_STYLES, default='compact', help='Compact hole schedule with one MTEXT row per group of identical holes, or one TEXT per cell and hole.')
+    parser.add_argument('--hole-db', metavar='PATH', help='Read the holes from this hole database (see hole_db.py) instead of the CSV next to each DXF.')
+    parser.add_argument('--model-id', help='Model whose holes are read from --hole-db.')
+    parser.add_argument('--profile', metavar='PATH', help='Write per-file, per-phase wall time and peak memory to this JSON file.')
+    parser.add_argument('--verify', choices=['fast', 'full'], default='fast', help='Check saved files by streaming their tags (fast) or by reloading them with ezdxf (full).')
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('--quiet', action='store_true', help='Only print warnings and errors.')
+    verbosity.add_argument('--verbose', action='store_true', help='Also print per-entity details and entity statistics.')
+    args = parser.parse_args()
+
+    if args.hole_db and not args.model_id:
+        parser.error("--model-id is required with --hole-db")
+
+    configure_logging(logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO)
+
+    if args.profile:
+        profiling.enable()
+
+    options = {
+        'weld_tolerance': args.weld_tolerance,
+        'verify': args.verify,
+        'dim_style': args.dim_style,
+        'dim_cluster_tolerance': args.dim_cluster_tolerance,
+        'hole_marks': args.hole_marks,
+        'hole_table': args.hole_table,
+        'hole_db': args.hole_db,
+        'model_id': args.model_id,
+    }
+
     # Let all exceptions propagate - fail early and clearly
-    split_layers(input_file, output_file, template_mode=template_mode)
+    if args.input_dir:
+        if not args.output_dir:
+            parser.error("--output-dir is required with --input-dir")
+        split_layers_batch(args.input_dir, args.output_dir, template_dir=args.template_dir, jobs=args.jobs, **options)
+    else:
+        if not args.input_file or not args.output_file:
+            parser.error("input_file and output_file are required unless --input-dir is given")
+        if args.template:
+            if args.template_file:
+                parser.error("--template-file cannot be combined with --template")
+            split_layers(args.input_file, template_file=args.output_file, **options)
+        else:
+            split_layers(args.input_file, args.output_file, template_file=args.template_file, **options)
+
+    if args.profile:
+        profiling.write_profile(args.profile)
+
 
 if __name__ == "__main__":
     main()
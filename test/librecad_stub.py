@@ -0,0 +1,92 @@
+"""
+Stand-in for LibreCAD's dxf2pdf that behaves like the real tool on Windows.
+
+It accepts the arguments convert-dxf-to-pdf.ps1 and pipeline.py pass,
+
+    librecad_stub.py dxf2pdf [--fit] [--paper WxH] [--margins ...] [--pages CxR] --outfile <file.pdf> <file.dxf>
+
+and, like LibreCAD, exits with status 1 right away while the PDF is written
+afterwards by a detached process: first a partial file, then, a moment later,
+the rest up to the %%EOF marker. The PDF holds an empty A4 landscape page.
+
+The environment tunes it:
+    LIBRECAD_STUB_SECONDS   delay before the detached process starts writing (default 0.5)
+
+Usage:
+    python pipeline.py --tool librecad=test/librecad_stub.py ...
+
+Example:
+    python test/librecad_stub.py dxf2pdf --fit --outfile build/Shelf.pdf build/export-stub/dxf/Shelf.dxf
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_DELAY = 0.5
+
+# Pause between the two halves of the PDF (seconds)
+PARTIAL_WRITE_PAUSE = 0.05
+
+# A4 landscape in points
+PAGE_SIZE = (842, 595)
+
+
+def pdf_bytes(title):
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_SIZE[0]} {PAGE_SIZE[1]}] >>",
+        f"<< /Title ({title}) >>",
+    ]
+    body = "%PDF-1.4\n"
+    offsets = []
+    for number, content in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{content}\nendobj\n"
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R /Info 4 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return body.encode('ascii')
+
+
+def write_later(pdf_file, title, delay):
+    time.sleep(delay)
+    content = pdf_bytes(title)
+    with open(pdf_file, 'wb') as f:
+        f.write(content[:len(content) // 2])
+        f.flush()
+        time.sleep(PARTIAL_WRITE_PAUSE)
+        f.write(content[len(content) // 2:])
+
+
+def main():
+    if sys.argv[1:2] == ['--write-later']:
+        write_later(sys.argv[2], sys.argv[3], float(sys.argv[4]))
+        return
+
+    parser = argparse.ArgumentParser(description='Canned stand-in for librecad dxf2pdf.')
+    parser.add_argument('command', choices=['dxf2pdf'])
+    parser.add_argument('--fit', action='store_true')
+    parser.add_argument('--paper')
+    parser.add_argument('--margins')
+    parser.add_argument('--pages')
+    parser.add_argument('--outfile', required=True)
+    parser.add_argument('dxf_file')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dxf_file):
+        print(f"Cannot open {args.dxf_file}", file=sys.stderr)
+        sys.exit(2)
+    os.makedirs(os.path.dirname(os.path.abspath(args.outfile)), exist_ok=True)
+    delay = os.environ.get('LIBRECAD_STUB_SECONDS', str(DEFAULT_DELAY))
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), '--write-later', args.outfile, os.path.basename(args.dxf_file), delay],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    print(f"Printing {args.dxf_file} to {args.outfile}")
+    # LibreCAD returns 1 on success
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Stand-in for the ODA File Converter that writes canned DWG files.
+
+It accepts the arguments convert-dxf-to-dwg.ps1 and pipeline.py pass,
+
+    oda_stub.py <input_dir> <output_dir> <version> DWG <recurse> <audit> <filter>
+
+and writes <output_dir>/<name>.dwg for every file in input_dir matching the
+filter. The DWG holds the version code and the name of its source instead of a
+drawing.
+
+The environment tunes it like test/openscad_stub.py:
+    ODA_STUB_SECONDS   sleep this long per call
+
+Usage:
+    python pipeline.py --tool oda=test/oda_stub.py ...
+
+Example:
+    python test/oda_stub.py build/export-stub/dxf build/export-stub/dwg ACAD2000 DWG 0 1 "*.dxf"
+"""
+import argparse
+import fnmatch
+import os
+import sys
+import time
+
+# DWG version codes written at the start of the file, see convert-dxf-to-dwg.ps1
+VERSION_CODES = {"ACAD12": "AC1009", "ACAD14": "AC1014", "ACAD2000": "AC1015", "ACAD2004": "AC1018", "ACAD2007": "AC1021"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Canned stand-in for the ODA File Converter.')
+    parser.add_argument('input_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('version', choices=list(VERSION_CODES))
+    parser.add_argument('output_type', choices=['DWG', 'DXF'])
+    parser.add_argument('recurse')
+    parser.add_argument('audit')
+    parser.add_argument('filter')
+    args = parser.parse_args()
+
+    time.sleep(float(os.environ.get('ODA_STUB_SECONDS', 0)))
+    names = sorted(name for name in os.listdir(args.input_dir) if fnmatch.fnmatch(name, args.filter))
+    if not names:
+        print(f"No files matching {args.filter} in {args.input_dir}", file=sys.stderr)
+        sys.exit(1)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name in names:
+        output_file = os.path.join(args.output_dir, os.path.splitext(name)[0] + "." + args.output_type.lower())
+        with open(output_file, 'w', encoding='ascii') as f:
+            f.write(f"{VERSION_CODES[args.version]} converted from {name}\n")
+        print(f"Converted {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Stand-in for the OpenSCAD binary that answers export calls with canned output.
+
+It accepts the command line export_panels.py builds,
+
+    openscad_stub.py -o <file.dxf|.stl|.svg> -D name=value ... model.scad
+
+echoes the DEFINITIONS line, a model_info line and the hole metadata of a
+400 x 300 mm panel in the format model.scad uses, and writes the outline of
+that panel as DXF, STL or SVG. The model file is not read.
+
+The environment tunes it for trying the parallel export:
+    OPENSCAD_STUB_SECONDS      sleep this long per call, like a render would take
+    OPENSCAD_STUB_FAIL_PANEL   exit with status 1 when exporting this panel
+
+Usage:
+    python export_panels.py --openscad test/openscad_stub.py --export-dir build/export-stub
+
+Example:
+    $env:OPENSCAD_STUB_SECONDS = 2; python export_panels.py --openscad test/openscad_stub.py --type dxf stl svg --export-dir build/export-stub
+"""
+import argparse
+import os
+import sys
+import time
+
+# Canned panel outline (mm) and holes: name, x, y, z, diameter, depth, nx, ny, nz
+PANEL_SIZE = (400, 300)
+HOLES = [
+    ("confirmat_1", 9.5, 50, 0, 4, 18, 0, 0, 1),
+    ("confirmat_2", 9.5, 250, 0, 4, 18, 0, 0, 1),
+    ("dowel_1", 390.5, 150, 9, 6, 20, 0, 0, 1),
+]
+MODEL_INFO = "model_info={corpus_height:400, corpus_depth:300, corpus_width:600, melanine_thickness_main:18, melanine_thickness_secondary:10}"
+
+
+def outline():
+    length, width = PANEL_SIZE
+    return [(0, 0), (length, 0), (length, width), (0, width)]
+
+
+def dxf_text():
+    corners = outline()
+    lines = ["0", "SECTION", "2", "ENTITIES"]
+    for (x1, y1), (x2, y2) in zip(corners, corners[1:] + corners[:1]):
+        lines += ["0", "LINE", "8", "0", "10", str(x1), "20", str(y1), "11", str(x2), "21", str(y2)]
+    lines += ["0", "ENDSEC", "0", "EOF"]
+    return "\n".join(lines) + "\n"
+
+
+def svg_text():
+    length, width = PANEL_SIZE
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{length}mm" height="{width}mm" viewBox="0 0 {length} {width}">\n'
+            f'<path d="M0,0 H{length} V{width} H0 Z" stroke="black" fill="lightgray"/>\n</svg>\n')
+
+
+def stl_text():
+    corners = outline()
+    facets = []
+    for a, b, c in [(0, 1, 2), (0, 2, 3)]:
+        facets.append("facet normal 0 0 1\nouter loop\n" + "".join(f"vertex {corners[i][0]} {corners[i][1]} 0\n" for i in (a, b, c)) + "endloop\nendfacet\n")
+    return "solid OpenSCAD_Model\n" + "".join(facets) + "endsolid OpenSCAD_Model\n"
+
+
+WRITERS = {'.dxf': dxf_text, '.svg': svg_text, '.stl': stl_text}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Canned stand-in for openscad -o.')
+    parser.add_argument('-o', dest='output_file', required=True)
+    parser.add_argument('-D', dest='definitions', action='append', default=[])
+    parser.add_argument('model_file')
+    args = parser.parse_args()
+
+    definitions = dict(definition.split("=", 1) for definition in args.definitions)
+    panel_name = definitions.get('export_panel_name', '""').strip('"')
+    time.sleep(float(os.environ.get('OPENSCAD_STUB_SECONDS', 0)))
+
+    # OpenSCAD prints its echo output to stderr
+    print("Parsing design (AST generation)...", file=sys.stderr)
+    print(f'ECHO: "DEFINITIONS: export_panel_name={panel_name}, export_type={definitions.get("export_type", "").strip(chr(34))}"', file=sys.stderr)
+    print(f'ECHO: "{MODEL_INFO}"', file=sys.stderr)
+    if panel_name == os.environ.get('OPENSCAD_STUB_FAIL_PANEL'):
+        print(f"ERROR: canned failure for {panel_name}", file=sys.stderr)
+        sys.exit(1)
+    for hole in HOLES:
+        print(f'ECHO: "Hole,{panel_name},{",".join(str(value) for value in hole)}"', file=sys.stderr)
+
+    with open(args.output_file, 'w', encoding='utf-8') as f:
+        f.write(WRITERS[os.path.splitext(args.output_file)[1]]())
+    print("Total rendering time: 0:00:00.000", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Runs export_panels.py with test/openscad_stub.py as OpenSCAD and checks its outputs.
+
+Every run goes to its own temporary export directory, which is removed afterwards.
+
+    complete run   DXF and SVG of every panel with two parallel jobs: one log per
+                   job, the final files with the default (umask) permissions, no
+                   .partial.* files left, and <panel>.csv holding the stub's holes
+    failing run    with OPENSCAD_STUB_FAIL_PANEL the driver exits non-zero and
+                   leaves no DXF and no partial file for the failed panel
+
+The script exits with status 1 at the first failed check; the checks are plain
+test_* functions, so pytest can run them as well.
+
+Usage:
+    python test/test_export_panels.py
+
+Example:
+    python test/test_export_panels.py
+"""
+import csv
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TEST_DIR)
+sys.path[:0] = [TEST_DIR, ROOT_DIR]
+
+import openscad_stub
+import scad_params
+
+EXPORT_TYPES = ["dxf", "svg"]
+JOBS = 2
+FAILING_PANEL = "Shelf"
+
+# Output directory of every export type, below the export directory
+OUTPUT_DIRS = {"dxf": "dxf-raw", "svg": "svg"}
+
+
+def run_export(export_dir, **environment):
+    """Run export_panels.py with the stub into export_dir; returns the completed process."""
+    command = [sys.executable, os.path.join(ROOT_DIR, "export_panels.py"), "--openscad", os.path.join(TEST_DIR, "openscad_stub.py"),
+               "--type", *EXPORT_TYPES, "--jobs", str(JOBS), "--export-dir", export_dir]
+    return subprocess.run(command, cwd=ROOT_DIR, env=dict(os.environ, **environment), stdin=subprocess.DEVNULL, capture_output=True, text=True)
+
+
+def check(condition, message, result=None):
+    if not condition:
+        output = "" if result is None else f"\n--- stdout ---\n{result.stdout}\n--- stderr ---\n{result.stderr}"
+        raise AssertionError(message + output)
+
+
+def partial_files(export_dir):
+    return [os.path.join(directory, name) for directory, _, names in os.walk(export_dir) for name in names if ".partial" in name]
+
+
+def default_file_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def test_complete_run():
+    panels = scad_params.load_model(os.path.join(ROOT_DIR, scad_params.DEFAULT_MODEL_FILE))['variables']['panel_names']
+    export_dir = tempfile.mkdtemp(prefix="export-panels-")
+    try:
+        result = run_export(export_dir)
+        check(result.returncode == 0, f"export_panels.py exited with {result.returncode}", result)
+
+        for export_type in EXPORT_TYPES:
+            logs = sorted(os.listdir(os.path.join(export_dir, "log", export_type)))
+            check(logs == sorted(f"{panel}.log" for panel in panels), f"Expected one {export_type} log per panel, found {logs}")
+            for panel in panels:
+                path = os.path.join(export_dir, OUTPUT_DIRS[export_type], f"{panel}.{export_type}")
+                check(os.path.isfile(path) and os.path.getsize(path) > 0, f"Output missing or empty: {path}", result)
+                mode = stat.S_IMODE(os.stat(path).st_mode)
+                check(mode == default_file_mode(), f"{path} has mode {mode:o}, expected {default_file_mode():o}")
+        check(not partial_files(export_dir), f"Partial files left: {partial_files(export_dir)}")
+
+        expected = [[name, *map(float, values)] for name, *values in openscad_stub.HOLES]
+        for panel in panels:
+            with open(os.path.join(export_dir, "dxf-raw", f"{panel}.csv"), newline='', encoding='utf-8') as f:
+                rows = list(csv.reader(f))[1:]
+            check([row[0] for row in rows] == [panel] * len(expected), f"{panel}.csv names other panels: {rows}")
+            check([[row[1], *map(float, row[2:])] for row in rows] == expected, f"{panel}.csv does not hold the stub's holes: {rows}")
+    finally:
+        shutil.rmtree(export_dir)
+
+
+def test_failing_export():
+    export_dir = tempfile.mkdtemp(prefix="export-panels-")
+    try:
+        result = run_export(export_dir, OPENSCAD_STUB_FAIL_PANEL=FAILING_PANEL)
+        check(result.returncode != 0, "export_panels.py succeeded although an export failed", result)
+        check(not os.path.exists(os.path.join(export_dir, "dxf-raw", f"{FAILING_PANEL}.dxf")), f"DXF written for {FAILING_PANEL}", result)
+        check(not partial_files(export_dir), f"Partial files left: {partial_files(export_dir)}", result)
+    finally:
+        shutil.rmtree(export_dir)
+
+
+def main():
+    for test in (test_complete_run, test_failing_export):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAILED: {test.__name__}: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"ok: {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Runs pipeline.py end to end with the stand-in tools and checks its outputs.
+
+test/openscad_stub.py, test/oda_stub.py and test/librecad_stub.py replace
+OpenSCAD, the ODA File Converter and LibreCAD, so the whole task graph runs on
+any machine with Python and ezdxf. Every run goes to its own temporary export
+directory, which is removed afterwards.
+
+    complete run   every panel has its raw DXF, hole CSV, drawing, template, DWG
+                   and both PDFs (polled until LibreCAD's detached writer has
+                   finished them), and the hole CSVs and the hole database hold
+                   the stub's holes
+    failing run    with OPENSCAD_STUB_FAIL_PANEL the pipeline exits non-zero,
+                   leaves no .partial.dxf behind and never starts the tasks that
+                   need the failed export
+
+The script exits with status 1 at the first failed check; the checks are plain
+test_* functions, so pytest can run them as well.
+
+Usage:
+    python test/test_pipeline.py
+
+Example:
+    python test/test_pipeline.py
+"""
+import csv
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TEST_DIR)
+sys.path.insert(0, TEST_DIR)
+
+import openscad_stub
+
+# A few panels keep the run short; every step runs for each of them
+PANELS = ["CorpusSideLeft", "Shelf", "DrawerFrontStandard"]
+FAILING_PANEL = "Shelf"
+
+TOOL_OPTIONS = [
+    "--tool", f"openscad={os.path.join(TEST_DIR, 'openscad_stub.py')}",
+    "--tool", f"oda={os.path.join(TEST_DIR, 'oda_stub.py')}",
+    "--tool", f"librecad={os.path.join(TEST_DIR, 'librecad_stub.py')}",
+]
+
+# Short delay of the detached PDF writer, still long enough to be polled for
+LIBRECAD_STUB_SECONDS = "0.2"
+
+# Output directory and extension of every step, below the export directory
+OUTPUTS = {
+    "export": ("dxf-raw", ".dxf"),
+    "split": ("dxf", ".dxf"),
+    "template": ("dxf-template", ".dxf"),
+    "dwg": ("dwg", ".dwg"),
+    "pdf": ("pdf", ".pdf"),
+    "template-pdf": ("pdf-template", ".pdf"),
+}
+
+# Steps that need the export of their panel, directly or through split
+DEPENDENT_STEPS = ["split", "dwg", "pdf", "template-pdf"]
+
+
+def run_pipeline(export_dir, **environment):
+    """Run pipeline.py for PANELS into export_dir; returns the completed process."""
+    command = [sys.executable, os.path.join(ROOT_DIR, "pipeline.py"), "--export-dir", export_dir, "--panel", *PANELS, *TOOL_OPTIONS]
+    env = dict(os.environ, LIBRECAD_STUB_SECONDS=LIBRECAD_STUB_SECONDS, **environment)
+    return subprocess.run(command, cwd=ROOT_DIR, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+
+
+def check(condition, message, result=None):
+    if not condition:
+        output = "" if result is None else f"\n--- stdout ---\n{result.stdout}\n--- stderr ---\n{result.stderr}"
+        raise AssertionError(message + output)
+
+
+def partial_files(export_dir):
+    return [os.path.join(directory, name) for directory, _, names in os.walk(export_dir) for name in names if ".partial" in name]
+
+
+def test_complete_run():
+    export_dir = tempfile.mkdtemp(prefix="pipeline-")
+    try:
+        result = run_pipeline(export_dir)
+        check(result.returncode == 0, f"pipeline.py exited with {result.returncode}", result)
+
+        for panel in PANELS:
+            for step, (directory, extension) in OUTPUTS.items():
+                path = os.path.join(export_dir, directory, panel + extension)
+                check(os.path.isfile(path) and os.path.getsize(path) > 0, f"{step} output missing or empty: {path}", result)
+            for directory in ("pdf", "pdf-template"):
+                with open(os.path.join(export_dir, directory, f"{panel}.pdf"), 'rb') as f:
+                    check(f.read().rstrip().endswith(b"%%EOF"), f"{directory}/{panel}.pdf is incomplete")
+
+            with open(os.path.join(export_dir, "dxf-raw", f"{panel}.csv"), newline='', encoding='utf-8') as f:
+                rows = list(csv.reader(f))[1:]
+            expected = [[panel, name, *map(float, values)] for name, *values in openscad_stub.HOLES]
+            check([[row[0], row[1], *map(float, row[2:])] for row in rows] == expected, f"{panel}.csv does not hold the stub's holes: {rows}")
+        check(not partial_files(export_dir), f"Partial files left: {partial_files(export_dir)}")
+
+        with sqlite3.connect(os.path.join(export_dir, "holes.sqlite")) as connection:
+            counts = dict(connection.execute("SELECT panel_name, COUNT(*) FROM holes GROUP BY panel_name"))
+        check(counts == {panel: len(openscad_stub.HOLES) for panel in PANELS}, f"Unexpected hole database rows: {counts}")
+    finally:
+        shutil.rmtree(export_dir)
+
+
+def test_failing_export():
+    export_dir = tempfile.mkdtemp(prefix="pipeline-")
+    try:
+        result = run_pipeline(export_dir, OPENSCAD_STUB_FAIL_PANEL=FAILING_PANEL)
+        check(result.returncode != 0, "pipeline.py succeeded although an export failed", result)
+        check(f"FAILED: export {FAILING_PANEL}" in result.stderr, "The failed export is not reported", result)
+        check(not partial_files(export_dir), f"Partial files left: {partial_files(export_dir)}", result)
+        check(not os.path.exists(os.path.join(export_dir, "dxf-raw", f"{FAILING_PANEL}.dxf")), f"Raw DXF written for {FAILING_PANEL}", result)
+        for step in DEPENDENT_STEPS:
+            # A task that started has written its log
+            log_file = os.path.join(export_dir, "log", step, f"{FAILING_PANEL}.log")
+            check(not os.path.exists(log_file), f"{step} of {FAILING_PANEL} ran although its export failed", result)
+            directory, extension = OUTPUTS[step]
+            check(not os.path.exists(os.path.join(export_dir, directory, FAILING_PANEL + extension)), f"{step} output written for {FAILING_PANEL}", result)
+    finally:
+        # The detached LibreCAD stand-ins of cancelled tasks may still be writing
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+
+def main():
+    for test in (test_complete_run, test_failing_export):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAILED: {test.__name__}: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"ok: {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,15 +34,23 @@ $exportDir = Join-Path $scriptDir "export/$modelIdentifier"
 .\generate-csv.ps1 -exportDir $exportDir
 
 # Generate cuting services order files
-& $pythonPath create_order.py --model-id "$modelIdentifier" --service iverpan --template "order/template/iverpan_tablica_za_narudzbu.xlsx" 2>&1
-& $pythonPath create_order.py --model-id "$modelIdentifier" --service elgrad --template "order/template/elgrad_tablica_za_narudzbu.xlsx" 2>&1
-& $pythonPath create_order.py --model-id "$modelIdentifier" --service sizekupres --template "order/template/sizekupres_tablica_za_narudzbu.xlsx" 2>&1
+# (iverpan, elgrad and sizekupres in parallel, templates from order/template)
+& $pythonPath create_order.py --model-id "$modelIdentifier" --service all 2>&1
 # TODO manually run furnir order generator to avoid runtime error
 # & $pythonPath create_order.py --model-id "$modelIdentifier" --service furnir --template "order/template/furnir_tablica_za_narudzbu.xlsx" 2>&1
 
 # Generate DXF, DWG and PDF exports
-.\export-all.ps1 -exportDir $exportDir
-.\run-split-layers.ps1 -exportDir $exportDir
-.\convert-dxf-to-dwg.ps1 -exportDir $exportDir
-.\convert-dxf-to-pdf.ps1 -exportDir $exportDir -dxfDir dxf-template -pdfDir pdf-template
-.\convert-dxf-to-pdf.ps1 -exportDir $exportDir -dxfDir dxf -pdfDir pdf
+# Every panel goes through export, split, DWG and PDF on its own, overlapping with the other panels
+# python pipeline.py --export-dir "export/H2300xW600xD230_Mm18_Ms12" --tool openscad=openscad
+& $pythonPath pipeline.py --export-dir "$exportDir" --tool openscad="$openscadPath" 2>&1
+if ($LASTEXITCODE -ne 0) {
+    Write-Error "Failed to run the export pipeline. pipeline.py exited with $LASTEXITCODE status."
+    exit 1
+}
+
+# The same stages one after the other for all panels
+# .\export-all.ps1 -exportDir $exportDir
+# .\run-split-layers.ps1 -exportDir $exportDir
+# .\convert-dxf-to-dwg.ps1 -exportDir $exportDir
+# .\convert-dxf-to-pdf.ps1 -exportDir $exportDir -dxfDir dxf-template -pdfDir pdf-template
+# .\convert-dxf-to-pdf.ps1 -exportDir $exportDir -dxfDir dxf -pdfDir pdf